@@ -0,0 +1,139 @@
+"""
+Benchmark of the broadcaster against a local fake Telegram Bot API.
+
+Queues a bulk broadcast to many chats followed by a few interactive replies,
+and reports the throughput, the latency of both priorities, flood control retries,
+and violations of the Bot API limits seen by the fake server.
+
+Usage (from the repository root):
+    python -m benchmarks.broadcast_benchmark [--chats 200] [--per-chat 2] [--interactive 20]
+                                             [--flood 0.01] [--global-rate 30] [--chat-rate 1]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict, deque
+
+from aiogram import Bot
+from aiogram.bot.api import TelegramAPIServer
+from aiohttp import web
+
+from schedulebot.broadcaster import Broadcaster, Priority
+
+
+TOKEN = '123456:BENCHMARK'
+
+
+class FakeBotAPI:
+    """
+    A fake Bot API answering `sendMessage` and recording the limits violations.
+    """
+
+    def __init__(self, flood: float, global_rate: float, chat_rate: float, *, seed: int = 0):
+        self.flood = flood
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.rnd = random.Random(seed)
+        self.requests = 0
+        self.global_violations = 0
+        self.chat_violations = 0
+        self._recent = deque()
+        self._last_by_chat = defaultdict(lambda: float('-inf'))
+
+    async def handle(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        chat_id = int(data['chat_id'])
+        now = time.monotonic()
+        self.requests += 1
+
+        if self.rnd.random() < self.flood:
+            return web.json_response({'ok': False, 'error_code': 429,
+                                      'description': 'Too Many Requests: retry after 1',
+                                      'parameters': {'retry_after': 1}}, status=429)
+
+        # 5% tolerance for timer jitter
+        self._recent.append(now)
+        while self._recent[0] < now - 1:
+            self._recent.popleft()
+        if len(self._recent) > self.global_rate * 1.05 + 1:
+            self.global_violations += 1
+        if now - self._last_by_chat[chat_id] < 0.95 / self.chat_rate:
+            self.chat_violations += 1
+        self._last_by_chat[chat_id] = now
+
+        message = {'message_id': self.requests, 'date': int(time.time()),
+                   'chat': {'id': chat_id, 'type': 'private'}, 'text': data.get('text', '')}
+        return web.json_response({'ok': True, 'result': message}, dumps=json.dumps)
+
+
+def percentile(values, q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+async def run(args: argparse.Namespace) -> None:
+    api = FakeBotAPI(args.flood, args.global_rate, args.chat_rate)
+    app = web.Application()
+    app.router.add_post('/bot{token}/{method}', api.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    bot = Bot(TOKEN, server=TelegramAPIServer.from_base(f'http://127.0.0.1:{port}'))
+    broadcaster = Broadcaster(bot, workers=args.workers,
+                              global_rate=args.global_rate, chat_rate=args.chat_rate)
+    broadcaster.start()
+
+    latencies = {Priority.BULK: [], Priority.INTERACTIVE: []}
+
+    async def send(chat_id: int, priority: Priority):
+        submitted = time.monotonic()
+        try:
+            await broadcaster.send_message(chat_id, 'Твій розклад змінено', priority)
+        except Exception:
+            return
+        latencies[priority].append(time.monotonic() - submitted)
+
+    started = time.monotonic()
+    jobs = [send(chat_id, Priority.BULK)
+            for _ in range(args.per_chat) for chat_id in range(1, args.chats + 1)]
+    jobs += [send(100_000 + n, Priority.INTERACTIVE) for n in range(args.interactive)]
+    await asyncio.gather(*jobs)
+    elapsed = time.monotonic() - started
+
+    stats = broadcaster.stats
+    await broadcaster.close()
+    await (await bot.get_session()).close()
+    await runner.cleanup()
+
+    total = args.chats * args.per_chat + args.interactive
+    print(f'messages:        {total} to {args.chats + args.interactive} chats')
+    print(f'sent / failed:   {stats["sent"]} / {stats["failed"]} ({stats["retried"]} flood retries)')
+    print(f'elapsed:         {elapsed:.2f} s')
+    print(f'throughput:      {stats["sent"] / elapsed:.1f} msg/s (limit {args.global_rate:g})')
+    for priority, values in latencies.items():
+        if values:
+            print(f'{priority.name.lower():<12} p50 {percentile(values, 50):6.2f} s   '
+                  f'p95 {percentile(values, 95):6.2f} s   max {max(values):6.2f} s')
+    print(f'limit violations: global {api.global_violations}, per chat {api.chat_violations}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--per-chat', type=int, default=2)
+    parser.add_argument('--interactive', type=int, default=20)
+    parser.add_argument('--flood', type=float, default=0.01, help='a share of 429 responses')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--global-rate', type=float, default=30)
+    parser.add_argument('--chat-rate', type=float, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
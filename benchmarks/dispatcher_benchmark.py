@@ -0,0 +1,434 @@
+"""
+End-to-end benchmark of the update dispatcher.
+
+Boots the real dispatcher of `schedulebot.bot` with the middlewares, filters and handlers,
+replays an update stream through it and routes all outbound Bot API requests to a local fake server.
+The stream is a JSONL file of recorded updates (one `Update` object per line) or a synthetic one
+covering `/start`, the membership flow (an applicant's role, the contact, the Superuser's decision)
+and the staff menu, mixed with junk updates of strangers.
+
+It reports the throughput, the latency percentiles, DB queries and Bot API requests per update,
+so throughput regressions are caught before the release. The latency is measured from the moment
+an update is fed to the dispatcher until it's processed, so it includes waiting in the update scheduler
+for the previous updates of the chat and for a free slot, but not the replay dependencies
+(`after` and placeholders below) that stand for the time a user takes to answer.
+
+It requires a local PostgreSQL and Redis configured as for the bot (`.env`); use a scratch database
+created by `python -m schedulebot.database.db` and a spare Redis DB (`REDIS_DB`), because
+the benchmark resets FSM states and deletes DB records of the users of the stream.
+
+A line of a synthetic stream may carry `"after": [update_id, ...]`: the update is fed only when those
+updates are processed. Callback data may refer to the FSM data of the sender as `$application_id`,
+the update is fed when the data has the value.
+
+Usage (from the repository root):
+    python -m benchmarks.dispatcher_benchmark [--updates stream.jsonl] [--save stream.jsonl]
+                                              [--applicants 100] [--accept 0.5] [--staff-views 50]
+                                              [--noise 300] [--rate 0] [--api-latency 0]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import time
+from string import Template
+from typing import Dict, Iterable, List, Set
+
+from aiogram import Bot, Dispatcher, types
+from aiogram.bot.api import TelegramAPIServer
+from aiohttp import web
+
+
+TOKEN = '123456:BENCHMARK'
+# The bot refuses to start without a token, the fake server accepts any
+os.environ.setdefault('TELEGRAM_TOKEN', TOKEN)
+
+from schedulebot import database, filters, googledrive, handlers, metrics, middlewares  # noqa: E402
+from schedulebot.bot import create_dispatcher  # noqa: E402
+from schedulebot.broadcaster import Broadcaster  # noqa: E402
+from schedulebot.config import Role, SUPERUSER_ID  # noqa: E402
+from schedulebot.keyboards import ButtonText, MembershipMenuMarkup  # noqa: E402
+from schedulebot.pipeline import OrderedDispatcher  # noqa: E402
+
+
+FIRST_USER_ID = 7_000_000_000
+NAMES = ['Олена', 'Ірина', 'Марія', 'Оксана', 'Наталія', 'Юлія', 'Світлана', 'Андрій', 'Тарас']
+NOISE_TEXTS = ['привіт', 'hello', '/help', 'що тут?', '👍']
+STICKER = {'file_id': 'CAACAgIAAxkBAAJId2Ru', 'file_unique_id': 'AgADdwUAAj-VzAo',
+           'type': 'regular', 'width': 512, 'height': 512, 'is_animated': False, 'is_video': False}
+
+
+class FakeBotAPI:
+    """
+    A fake Bot API answering any method: sending and editing methods return a message, the others True.
+    """
+
+    MESSAGE_METHODS = ('send', 'forward', 'copy', 'edit')
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.methods: Dict[str, int] = {}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        data = await request.post()
+        self.requests += 1
+        self.methods[method] = self.methods.get(method, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method.lower() == 'getme':
+            result = {'id': int(TOKEN.split(':')[0]), 'is_bot': True,
+                      'first_name': 'Benchmark', 'username': 'BenchmarkBot'}
+        elif method.lower().startswith(self.MESSAGE_METHODS) and 'chat_id' in data:
+            result = {'message_id': int(data.get('message_id') or self.requests), 'date': int(time.time()),
+                      'chat': {'id': int(data['chat_id']), 'type': 'private'}, 'text': data.get('text', '')}
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result}, dumps=json.dumps)
+
+
+class StreamBuilder:
+    """
+    Builds a synthetic update stream, updates of every chat are kept in order.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.rnd = random.Random(seed)
+        self.flows: List[List[dict]] = []
+        self._update_id = 0
+        self._message_ids: Dict[int, int] = {}
+
+    def _next_update(self, after: Iterable[int]) -> dict:
+        self._update_id += 1
+        update = {'update_id': self._update_id}
+        if after := [update_id for update_id in after if update_id]:
+            update['after'] = after
+        return update
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': NAMES[user_id % len(NAMES)]}
+
+    def _message(self, user_id: int, **content) -> dict:
+        self._message_ids[user_id] = message_id = self._message_ids.get(user_id, 0) + 1
+        return {'message_id': message_id, 'date': int(time.time()), 'from': self._user(user_id),
+                'chat': {'id': user_id, 'type': 'private'}, **content}
+
+    def message(self, user_id: int, after: Iterable[int] = (), **content) -> dict:
+        update = self._next_update(after)
+        update['message'] = self._message(user_id, **content)
+        return update
+
+    def edited_message(self, user_id: int, **content) -> dict:
+        update = self._next_update(())
+        update['edited_message'] = {**self._message(user_id, **content), 'edit_date': int(time.time())}
+        return update
+
+    def callback(self, user_id: int, data: str, after: Iterable[int] = ()) -> dict:
+        update = self._next_update(after)
+        # The callback button is attached to the latest message of the bot
+        menu = self._message(user_id, text='menu')
+        menu['from'] = {'id': int(TOKEN.split(':')[0]), 'is_bot': True, 'first_name': 'Benchmark'}
+        update['callback_query'] = {'id': str(update['update_id']), 'chat_instance': str(user_id),
+                                    'from': self._user(user_id), 'message': menu, 'data': data}
+        return update
+
+    def merge(self) -> List[dict]:
+        """
+        Interleaves the flows randomly, keeping the order of updates within every flow.
+        Update IDs are renumbered in the order of the stream.
+        """
+        flows = [list(reversed(flow)) for flow in self.flows if flow]
+        stream = []
+        while flows:
+            flow = self.rnd.choice(flows)
+            stream.append(flow.pop())
+            if not flow:
+                flows.remove(flow)
+
+        renumbered = {update['update_id']: number for number, update in enumerate(stream, start=1)}
+        for update in stream:
+            update['update_id'] = renumbered[update['update_id']]
+            if 'after' in update:
+                update['after'] = [renumbered[update_id] for update_id in update['after']]
+        return stream
+
+
+def generate_stream(applicants: int, accept: float, staff_views: int, noise: int, *,
+                    seed: int = 0, first_user_id: int = FIRST_USER_ID) -> List[dict]:
+    """
+    Generates a stream of the membership flow, the staff menu and junk updates.
+
+    :param applicants: The quantity of applicants, every one of them is decided by Superuser.
+    :param accept: A share of accepted applicants, the others are rejected (blacklisted).
+    :param staff_views: How many times Superuser opens the staff menu before deciding applications.
+    :param noise: The quantity of junk updates of strangers (stickers, texts, edited messages).
+    :param seed: A seed of the random generator, so the streams are reproducible.
+    :param first_user_id: The ID of the first applicant, the IDs must not belong to real users.
+    :return: The updates in the order of the stream.
+    """
+    builder = StreamBuilder(seed)
+    rnd = builder.rnd
+
+    superuser = [builder.message(SUPERUSER_ID, text='/start')]
+    superuser += [builder.message(SUPERUSER_ID, text=ButtonText.STAFF.value) for _ in range(staff_views)]
+    # Applications are presented to Superuser after the staff menu, so the menu isn't interrupted
+    staff_viewed = superuser[-1]['update_id']
+    builder.flows.append(superuser)
+
+    decision = MembershipMenuMarkup.application_callback
+    for number in range(applicants):
+        user_id = first_user_id + number
+        role = rnd.choice([Role.ADMIN.value, Role.EMPLOYEE.value])
+        contact = {'phone_number': f'380{user_id % 10**9:09d}', 'first_name': NAMES[user_id % len(NAMES)],
+                   'user_id': user_id}
+        flow = [builder.message(user_id, text='/start'),
+                builder.callback(user_id, role),
+                builder.callback(user_id, f'confirmed:{role}'),
+                builder.message(user_id, after=[staff_viewed], contact=contact)]
+        builder.flows.append(flow)
+
+        # The decided application is the presented one, the oldest pending application. The decision waits
+        # for the contact, and every next update of Superuser waits for the previous one, so it isn't overtaken
+        verdict = 'accepted' if rnd.random() < accept else 'rejected'
+        superuser.append(builder.callback(SUPERUSER_ID, decision.new(decision=verdict, id='$application_id'),
+                                          after=[flow[-1]['update_id'], superuser[-1]['update_id']]))
+        superuser.append(builder.callback(SUPERUSER_ID, f'confirmed:{verdict}', after=[superuser[-1]['update_id']]))
+        if verdict == 'accepted':
+            superuser.append(builder.message(SUPERUSER_ID, after=[superuser[-1]['update_id']],
+                                             text=f'Member {number}'))
+            superuser.append(builder.callback(SUPERUSER_ID, 'confirmed:', after=[superuser[-1]['update_id']]))
+
+    for number in range(noise):
+        user_id = first_user_id + applicants + number
+        kind = rnd.random()
+        if kind < 0.4:
+            update = builder.message(user_id, sticker=STICKER)
+        elif kind < 0.8:
+            update = builder.message(user_id, text=rnd.choice(NOISE_TEXTS))
+        else:
+            update = builder.edited_message(user_id, text=rnd.choice(NOISE_TEXTS))
+        builder.flows.append([update])
+
+    return builder.merge()
+
+
+def load_stream(path: str) -> List[dict]:
+    with open(path, encoding='utf-8') as stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+def save_stream(path: str, updates: List[dict]) -> None:
+    with open(path, 'w', encoding='utf-8') as stream:
+        for update in updates:
+            stream.write(json.dumps(update, ensure_ascii=False) + '\n')
+
+
+def stream_users(updates: List[dict]) -> Set[int]:
+    """
+    Returns IDs of the users of the stream (senders and contacts) except Superuser.
+    """
+    users = set()
+    for update in updates:
+        for kind in ('message', 'edited_message', 'callback_query'):
+            if obj := update.get(kind):
+                users.add(obj['from']['id'])
+                if contact := obj.get('contact'):
+                    users.add(contact.get('user_id'))
+    users.discard(None)
+    users.discard(SUPERUSER_ID)
+    return users
+
+
+async def reset_users(dp: Dispatcher, pool, users: Set[int]) -> None:
+    """
+    Resets FSM states of the stream users and Superuser, and deletes their applications, members
+    and blacklist records, so the stream may be replayed again.
+    """
+    for user_id in users | {SUPERUSER_ID}:
+        await dp.storage.finish(chat=user_id, user=user_id)
+    tg_ids = list(users)
+    async with pool.acquire() as db_conn:
+        async with db_conn.transaction():
+            for table in ('applications', 'members', 'blacklist'):
+                await db_conn.execute(f"DELETE FROM {table} WHERE tg_id = ANY($1::bigint[]);", tg_ids)
+    for tg_id in tg_ids:
+        database.role_cache.invalidate(tg_id)
+        database.blacklist_cache.discard(tg_id)
+
+
+async def unchanged_folder() -> googledrive.SyncDelta:
+    return googledrive.SyncDelta()
+
+
+def percentile(values, q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+class Replay:
+    """
+    Feeds updates to the dispatcher as Telegram does, every update in its own task.
+    """
+
+    # Seconds to wait for the FSM data referred by a placeholder
+    PLACEHOLDER_TIMEOUT = 10
+
+    def __init__(self, dp: Dispatcher):
+        self.dp = dp
+        self.latencies: List[float] = []
+        self.errors = 0
+        self._done: Dict[int, asyncio.Event] = {}
+
+    async def _substitute(self, text: str, chat_id: int, user_id: int) -> str:
+        """
+        Substitutes placeholders with the FSM data of the user. The value may appear a bit later
+        (e.g. an application is being presented to Superuser in another update), so it's awaited.
+        """
+        template = Template(text)
+        deadline = time.perf_counter() + self.PLACEHOLDER_TIMEOUT
+        while True:
+            data = await self.dp.storage.get_data(chat=chat_id, user=user_id)
+            try:
+                return template.substitute(data)
+            except ValueError:
+                # Not a placeholder, e.g. a recorded text
+                return text
+            except KeyError:
+                if time.perf_counter() > deadline:
+                    raise
+                await asyncio.sleep(0.001)
+
+    async def _resolve(self, raw: dict) -> types.Update:
+        raw = dict(raw)
+        for update_id in raw.pop('after', ()):
+            await self._done[update_id].wait()
+
+        if (callback := raw.get('callback_query')) and '$' in callback.get('data', ''):
+            data = await self._substitute(callback['data'], callback['message']['chat']['id'], callback['from']['id'])
+            raw['callback_query'] = {**callback, 'data': data}
+        return types.Update(**raw)
+
+    async def feed(self, raw: dict) -> None:
+        try:
+            update = await self._resolve(raw)
+            # The update is fed to the dispatcher only now, when the user could have sent it
+            started = time.perf_counter()
+            # The entry point of polling and webhooks: the update middlewares, then `dp.process_update`
+            await self.dp.updates_handler.notify(update)
+            self.latencies.append(time.perf_counter() - started)
+        except Exception:
+            self.errors += 1
+            logging.exception(f"The update #{raw['update_id']} failed")
+        finally:
+            self._done[raw['update_id']].set()
+
+    async def run(self, updates: List[dict], rate: float) -> float:
+        self._done = {raw['update_id']: asyncio.Event() for raw in updates}
+        started = time.perf_counter()
+        tasks = []
+        for number, raw in enumerate(updates):
+            if rate:
+                await asyncio.sleep(max(0.0, started + number / rate - time.perf_counter()))
+            tasks.append(asyncio.create_task(self.feed(raw)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.updates:
+        updates = load_stream(args.updates)
+    else:
+        updates = generate_stream(args.applicants, args.accept, args.staff_views, args.noise, seed=args.seed)
+    if args.save:
+        save_stream(args.save, updates)
+
+    api = FakeBotAPI(args.api_latency)
+    app = web.Application()
+    app.router.add_post('/bot{token}/{method}', api.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    dp = create_dispatcher(background_jobs=False, metrics_port=0)
+    # Updates are fed by `updates_handler.notify`, so it must lead to the update scheduler
+    if not isinstance(dp, OrderedDispatcher) or dp.updates_handler.handlers[0].handler != dp.process_update:
+        raise RuntimeError("Updates don't pass through OrderedDispatcher.process_update")
+    dp.bot.server = TelegramAPIServer.from_base(f'http://127.0.0.1:{port}')
+    Bot.set_current(dp.bot)
+    Dispatcher.set_current(dp)
+
+    # Google Drive is out of the scope: the working folder is never changed, so free files are taken
+    # from the database mirror (applicants are accepted without a file in a scratch database)
+    googledrive.drive_sync.refresh = unchanged_folder
+
+    pool = await database.create_pool()
+    async with pool.acquire() as db_conn:
+        await database.load_blacklist(db_conn)
+    middlewares.setup(dp, pool)
+    filters.setup(dp)
+    handlers.setup(dp)
+    broadcaster = Broadcaster(dp.bot)
+    broadcaster.start()
+    dp['broadcaster'] = broadcaster
+
+    users = stream_users(updates)
+    await reset_users(dp, pool, users)
+
+    replay = Replay(dp)
+    queries = metrics.DB_QUERIES.value()
+    dropped = {reason: metrics.UPDATES_DROPPED.value(reason=reason) for reason in ('blacklist', 'no_handler')}
+    elapsed = await replay.run(updates, args.rate)
+    queries = metrics.DB_QUERIES.value() - queries
+    dropped = {reason: metrics.UPDATES_DROPPED.value(reason=reason) - value for reason, value in dropped.items()}
+    api_requests = api.requests
+
+    await broadcaster.close()
+    await reset_users(dp, pool, users)
+    await pool.close()
+    await dp.storage.close()
+    await dp.storage.wait_closed()
+    await (await dp.bot.get_session()).close()
+    await runner.cleanup()
+
+    total = len(updates)
+    handled = total - sum(dropped.values())
+    latencies = replay.latencies
+    print(f'updates:         {total} ({handled} passed to the handlers, {dropped["no_handler"]} without a handler, '
+          f'{dropped["blacklist"]} blacklisted, {replay.errors} failed)')
+    print(f'elapsed:         {elapsed:.2f} s')
+    print(f'throughput:      {total / elapsed:.1f} updates/s')
+    if latencies:
+        print(f'latency:         p50 {percentile(latencies, 50) * 1000:.1f} ms   '
+              f'p95 {percentile(latencies, 95) * 1000:.1f} ms   p99 {percentile(latencies, 99) * 1000:.1f} ms')
+    print(f'DB queries:      {queries:g} ({queries / total:.2f} per update, '
+          f'{queries / max(handled, 1):.2f} per update passed to the handlers)')
+    print(f'Bot API calls:   {api_requests} ({api_requests / total:.2f} per update)')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', help='a JSONL file of updates to replay instead of a synthetic stream')
+    parser.add_argument('--save', help='a JSONL file to save the replayed stream to')
+    parser.add_argument('--applicants', type=int, default=100)
+    parser.add_argument('--accept', type=float, default=0.5, help='a share of accepted applicants')
+    parser.add_argument('--staff-views', type=int, default=50)
+    parser.add_argument('--noise', type=int, default=300, help='junk updates of strangers')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rate', type=float, default=0, help='updates per second, 0 feeds them at once')
+    parser.add_argument('--api-latency', type=float, default=0, help='seconds of every Bot API response')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(args.log_level)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of the schedule document parser.
+
+Generates synthetic schedule documents of 1k–100k entries and measures
+the parse throughput of `schedulebot.schedule.parse_schedule_text`.
+
+Usage (from the repository root):
+    python -m benchmarks.parser_benchmark [--sizes 1000 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from schedulebot.schedule import parse_schedule_text
+
+
+WEEKDAYS = ["Понеділок", "Вівторок", "Середа", "Четвер", "П'ятниця", "Субота", "Неділя"]
+CLIENTS = ['Олена', 'Ірина', 'Марія', 'Оксана', 'Наталія', 'Юлія', 'Світлана']
+SERVICES = ['манікюр', 'педикюр', 'стрижка', 'фарбування', 'укладка', 'брови']
+
+
+def generate_document(entries: int, *, seed: int = 0) -> str:
+    """
+    Generates a document with the given quantity of shift and appointment entries.
+
+    :param entries: The quantity of entries.
+    :param seed: A seed of the random generator, so the documents are reproducible.
+    :return: The text of the document.
+    """
+    rnd = random.Random(seed)
+    lines = ['Графік роботи', '']
+    day = date(2023, 1, 1)
+    produced = 0
+    while produced < entries:
+        lines.append(f'{WEEKDAYS[day.weekday()]} {day:%d.%m.%Y}')
+        lines.append('Зміна 09:00 - 20:00')
+        produced += 1
+        hour = 9
+        while hour < 20 and produced < entries:
+            length = rnd.choice([1, 1, 2])
+            client = f'{rnd.choice(CLIENTS)}, {rnd.choice(SERVICES)}'
+            if rnd.random() < 0.8:
+                lines.append(f'{hour:02}:00 - {hour + length:02}:{rnd.choice([0, 30]):02} {client}')
+            else:
+                lines.append(f'{hour:02}:00 {client}')
+            if rnd.random() < 0.1:
+                lines.append('Примітка: передзвонити клієнту')
+            produced += 1
+            hour += length
+        lines.append('')
+        day += timedelta(days=1)
+    return '\n'.join(lines)
+
+
+def run(size: int, repeat: int) -> None:
+    document = generate_document(size)
+    lines = document.count('\n') + 1
+
+    best = float('inf')
+    parsed = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parsed = sum(1 for _ in parse_schedule_text(document))
+        best = min(best, time.perf_counter() - started)
+
+    print(f'{size:>8} {parsed:>8} {lines:>8} {len(document) / 1024:>9.0f} '
+          f'{best * 1000:>9.1f} {parsed / best:>12,.0f} {len(document) / best / 2**20:>8.1f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"size":>8} {"entries":>8} {"lines":>8} {"KiB":>9} {"best ms":>9} {"entries/s":>12} {"MiB/s":>8}')
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
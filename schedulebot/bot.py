@@ -1,10 +1,21 @@
+import asyncio
 import logging
+import multiprocessing
+from functools import partial
 
 from aiogram import Bot, Dispatcher, executor
 from aiogram.contrib.fsm_storage.redis import RedisStorage2
 
-from schedulebot import handlers, database, middlewares, filters
-from schedulebot.config import TELEGRAM_TOKEN, BASE_DIR, LOG_CONFIG
+from schedulebot import handlers, database, middlewares, filters, googledrive, schedule
+from schedulebot.config import TELEGRAM_TOKEN, BASE_DIR, LOG_CONFIG, REDIS_CONNECT_SET, \
+    RUN_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_MAX_CONNECTIONS, WEBAPP_HOST, WEBAPP_PORT, WEBHOOK_WORKERS, \
+    SCHEDULE_POLL_INTERVAL, SCHEDULE_ALERT_DEBOUNCE, \
+    BROADCAST_WORKERS, BROADCAST_GLOBAL_RATE, BROADCAST_CHAT_RATE, BROADCAST_MAX_RETRIES, \
+    UPDATE_CONCURRENCY_LIMIT, BLACKLIST_RELOAD_INTERVAL, METRICS_HOST, METRICS_PORT
+from schedulebot import metrics
+from schedulebot.broadcaster import Broadcaster
+from schedulebot.handlers.helpers import notify_schedule_changes, restore_presented_application
+from schedulebot.pipeline import OrderedDispatcher
 
 
 logging.basicConfig(**LOG_CONFIG)
@@ -19,28 +30,162 @@ if not TELEGRAM_TOKEN:
 
 
 async def on_startup(dp: Dispatcher) -> None:
+    if RUN_MODE == 'polling':
+        # getUpdates doesn't work while a webhook is set
+        await dp.bot.delete_webhook()
     pool = await database.create_pool()
+    async with pool.acquire() as db_conn:
+        blacklisted = await database.load_blacklist(db_conn)
+    logging.info(f"{blacklisted} blacklisted users loaded")
+    dp['blacklist_reloader'] = asyncio.create_task(middlewares.reload_blacklist(pool, BLACKLIST_RELOAD_INTERVAL))
+    await googledrive.drive_client.start()
     middlewares.setup(dp, pool)
     filters.setup(dp)
     handlers.setup(dp)
 
+    broadcaster = Broadcaster(dp.bot,
+                              workers=BROADCAST_WORKERS,
+                              global_rate=BROADCAST_GLOBAL_RATE,
+                              chat_rate=BROADCAST_CHAT_RATE,
+                              max_retries=BROADCAST_MAX_RETRIES)
+    broadcaster.start()
+    dp['broadcaster'] = broadcaster
+
+    metrics.DB_POOL_SIZE.set_function(pool.get_size)
+    metrics.DB_POOL_IN_USE.set_function(lambda: pool.get_size() - pool.get_idle_size())
+    metrics.BROADCAST_QUEUE_DEPTH.set_function(lambda: broadcaster.queue_depth)
+    if dp['metrics_port']:
+        dp['metrics_server'] = await metrics.start_server(METRICS_HOST, dp['metrics_port'])
+
+    # With several webhook workers only one of them syncs the folder and detects schedule changes,
+    # so alerts aren't duplicated; handlers of the other workers read the database mirror
+    if dp['background_jobs']:
+        detector = schedule.ScheduleChangeDetector(
+            load=schedule.load_schedule,
+            notify=partial(notify_schedule_changes, broadcaster, pool),
+            debounce=SCHEDULE_ALERT_DEBOUNCE,
+        )
+        googledrive.drive_sync.subscribe(detector.changes_listener)
+        googledrive.drive_sync.subscribe(schedule.removed_files_listener)
+        dp['schedule_detector'] = detector
+        dp['folder_watcher'] = asyncio.create_task(schedule.watch_folder(pool, SCHEDULE_POLL_INTERVAL))
+        db = database.LazyConnection(pool)
+        try:
+            await restore_presented_application(dp.bot, dp.storage, db)
+        except Exception:
+            logging.exception("The application queue isn't restored")
+        finally:
+            await db.release()
+
 
 async def on_shutdown(dp: Dispatcher) -> None:
     logging.warning('Shutting down...')
+    for task_name in ('folder_watcher', 'blacklist_reloader'):
+        if task := dp.get(task_name):
+            task.cancel()
+    if detector := dp.get('schedule_detector'):
+        await detector.close()
+    await dp['broadcaster'].close()
+    if metrics_server := dp.get('metrics_server'):
+        await metrics_server.cleanup()
     await dp.bot.session.close()
-    await dp.storage.reset_all()
+    await googledrive.drive_client.close()
+    # The FSM storage is shared by the webhook workers and keeps the conversations across restarts
     await dp.storage.close()
     await dp.storage.wait_closed()
     logging.warning('Bot stopped!')
 
 
-def main() -> None:
+def create_dispatcher(background_jobs: bool = True, metrics_port: int = METRICS_PORT) -> Dispatcher:
+    """
+    Creates the bot and its dispatcher with the FSM storage.
+
+    :param background_jobs: If true, the dispatcher runs the background jobs (the Google folder watcher).
+    :type background_jobs: :obj:`bool`.
+    :param metrics_port: The port of the metrics endpoint, 0 disables the endpoint.
+    :type metrics_port: :obj:`int`.
+    :return: The update dispatcher.
+    :rtype: :obj:`aiogram.Dispatcher`
+    """
+    bot = metrics.InstrumentedBot(token=TELEGRAM_TOKEN)
+    storage: RedisStorage2 = RedisStorage2(**REDIS_CONNECT_SET)
+    dp = OrderedDispatcher(bot, storage=storage, concurrency_limit=UPDATE_CONCURRENCY_LIMIT)
+    dp['background_jobs'] = background_jobs
+    dp['metrics_port'] = metrics_port
+    return dp
+
+
+async def set_webhook() -> None:
     bot = Bot(token=TELEGRAM_TOKEN)
-    storage: RedisStorage2 = RedisStorage2('localhost', 6379, db=1) # todo config
-    dp = Dispatcher(bot, storage=storage)
-    executor.start_polling(dispatcher=dp,
+    try:
+        await bot.set_webhook(WEBHOOK_URL, max_connections=WEBHOOK_MAX_CONNECTIONS)
+        logging.info(f"Webhook is set to <{WEBHOOK_URL}>")
+    finally:
+        await (await bot.get_session()).close()
+
+
+def run_webhook_worker(index: int) -> None:
+    """
+    Serves updates pushed by Telegram in the current process.
+
+    Handlers may return a Bot API method (e.g. :obj:`aiogram.types.SendMessage`),
+    it's sent back in the webhook response, saving a request to the Bot API.
+
+    :param index: The worker number, the first worker runs the background jobs.
+    :type index: :obj:`int`.
+    :return:
+    """
+    logging.basicConfig(**LOG_CONFIG)
+    dispatcher = create_dispatcher(background_jobs=index == 0,
+                                   metrics_port=METRICS_PORT + index if METRICS_PORT else 0)
+    executor.start_webhook(dispatcher=dispatcher,
+                           webhook_path=WEBHOOK_PATH,
                            on_startup=on_startup,
-                           on_shutdown=on_shutdown)
+                           on_shutdown=on_shutdown,
+                           host=WEBAPP_HOST,
+                           port=WEBAPP_PORT,
+                           reuse_port=WEBHOOK_WORKERS > 1)
+
+
+def start_webhook() -> None:
+    """
+    Sets the webhook once and starts the worker processes sharing the same port.
+
+    :return:
+    """
+    if not WEBHOOK_URL:
+        raise ValueError('The webhook mode requires WEBHOOK_HOST=https://... in file <.env>')
+    asyncio.run(set_webhook())
+
+    if WEBHOOK_WORKERS == 1:
+        run_webhook_worker(0)
+        return
+
+    logging.warning(f"Updates of a chat are ordered within a worker only, "
+                    f"{WEBHOOK_WORKERS} workers may process updates of the same chat concurrently")
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=run_webhook_worker, args=(index,), name=f'webhook-worker-{index}')
+               for index in range(WEBHOOK_WORKERS)]
+    for worker in workers:
+        worker.start()
+    logging.info(f"{WEBHOOK_WORKERS} webhook workers listen on {WEBAPP_HOST}:{WEBAPP_PORT}")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.join()
+
+
+def main() -> None:
+    if RUN_MODE == 'webhook':
+        start_webhook()
+    elif RUN_MODE == 'polling':
+        executor.start_polling(dispatcher=create_dispatcher(),
+                               on_startup=on_startup,
+                               on_shutdown=on_shutdown)
+    else:
+        raise ValueError(f"Unknown RUN_MODE <{RUN_MODE}>, expected 'polling' or 'webhook'")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,326 @@
+"""
+The module broadcaster:
+Sends outbound messages through a queue that respects the Telegram Bot API limits
+(about 30 messages per second overall and 1 message per second to the same chat).
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Deque, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.utils.exceptions import RetryAfter, TelegramAPIError
+
+
+class Priority(IntEnum):
+    """
+    Priorities of outbound messages, the lower value is sent first.
+    """
+    INTERACTIVE = 0
+    BULK = 10
+
+
+class TokenBucket:
+    """
+    This object represents a token bucket rate limiter.
+
+    Tokens are reserved in advance: a reservation never fails,
+    it returns the delay after which the caller may proceed.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        :param rate: Tokens added per second.
+        :type rate: :obj:`float`.
+        :param capacity: The maximum quantity of tokens, i.e. the allowed burst.
+        :type capacity: :obj:`float`.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Takes a token.
+
+        :return: Seconds to wait before the token may be used.
+        :rtype: :obj:`float`
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    @property
+    def is_idle(self) -> bool:
+        return self.tokens + (time.monotonic() - self.updated_at) * self.rate >= self.capacity
+
+
+def _retrieve_exception(future: asyncio.Future) -> None:
+    # Failures are logged by the broadcaster, nobody may be waiting for the future
+    if not future.cancelled():
+        future.exception()
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    chat_id: Any = field(compare=False)
+    method: str = field(compare=False)
+    kwargs: Dict = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    chat_reserved: bool = field(default=False, compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class Broadcaster:
+    """
+    This object represents an outbound message queue with rate limiting.
+
+    Messages are sent by a fixed number of workers in the priority order
+    (and in the submission order within a priority), so interactive replies
+    go ahead of bulk notifications. Each message takes a token of its chat bucket
+    and of the global bucket. A message whose chat is over the limit is put back
+    to the queue when its token is ready, so it doesn't occupy a worker.
+
+    On `RetryAfter` (flood control) all workers pause for the requested time
+    and the message is retried. A chat has a single message in flight: later messages
+    to the chat are held back until the message being sent (or retried) is sent or fails,
+    so they can't overtake it.
+
+    Returned futures may be dropped by fire-and-forget callers: failures are logged
+    by the broadcaster and their exceptions are retrieved anyway.
+    """
+
+    def __init__(self, bot: Bot, *,
+                 workers: int = 8,
+                 global_rate: float = 30,
+                 chat_rate: float = 1,
+                 max_retries: int = 3,
+                 max_chat_buckets: int = 10_000):
+        """
+        :param bot: The bot instance.
+        :type bot: :obj:`aiogram.Bot`.
+        :param workers: The quantity of concurrent API requests.
+        :type workers: :obj:`int`.
+        :param global_rate: Messages per second to all chats.
+        :type global_rate: :obj:`float`.
+        :param chat_rate: Messages per second to a single chat.
+        :type chat_rate: :obj:`float`.
+        :param max_retries: Attempts to send a message after flood control errors.
+        :type max_retries: :obj:`int`.
+        :param max_chat_buckets: Idle chat buckets are dropped when there are more of them.
+        :type max_chat_buckets: :obj:`int`.
+        """
+        self.bot = bot
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.max_chat_buckets = max_chat_buckets
+        # No bursts: Telegram counts messages in a sliding window
+        self.global_bucket = TokenBucket(global_rate)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+        # chat_id -> the message being sent or retried after flood control, and messages to the chat waiting for it
+        self._sending: Dict[Any, _Job] = {}
+        self._held: Dict[Any, List[_Job]] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: list = []
+        self._delayed = 0
+        self._paused_until = 0.0
+        self._seq = itertools.count()
+        self._sent_at: Deque[float] = deque(maxlen=1000)
+
+    def start(self) -> None:
+        """
+        Starts the workers, must be called inside the running event loop.
+
+        :return:
+        """
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self, timeout: Optional[float] = 10) -> None:
+        """
+        Waits until the queued messages are sent (at most `timeout` seconds) and stops the workers.
+
+        :param timeout: Seconds to wait for the queue, if None waits without a limit.
+        :type timeout: :obj:`typing.Optional[float]`.
+        :return:
+        """
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Broadcaster stopped with {self.queue_depth} unsent messages")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def join(self) -> None:
+        """
+        Waits until all submitted messages are processed.
+
+        :return:
+        """
+        await self._queue.join()
+        # Messages waiting for their chat token or after flood control aren't in the queue
+        while self._delayed:
+            await asyncio.sleep(0.05)
+            await self._queue.join()
+
+    def submit(self, chat_id, method: str, priority: Priority = Priority.BULK, **kwargs) -> asyncio.Future:
+        """
+        Queues a call of the Bot API method addressed to the chat.
+
+        :param chat_id: The target chat.
+        :type chat_id: :obj:`typing.Union[int, str]`.
+        :param method: A name of the :obj:`aiogram.Bot` method, e.g. `send_message`.
+        :type method: :obj:`str`.
+        :param priority: A priority of the message.
+        :type priority: :obj:`schedulebot.broadcaster.Priority`.
+        :param kwargs: Other arguments of the method.
+        :return: A future with the result of the method.
+        :rtype: :obj:`asyncio.Future`
+        """
+        if not self._workers:
+            raise RuntimeError("The broadcaster isn't started")
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve_exception)
+        self._queue.put_nowait(_Job(int(priority), next(self._seq), chat_id, method, kwargs, future))
+        return future
+
+    def send_message(self, chat_id, text: str, priority: Priority = Priority.BULK, **kwargs) -> asyncio.Future:
+        return self.submit(chat_id, 'send_message', priority, text=text, **kwargs)
+
+    def send_sticker(self, chat_id, sticker: str, priority: Priority = Priority.BULK, **kwargs) -> asyncio.Future:
+        return self.submit(chat_id, 'send_sticker', priority, sticker=sticker, **kwargs)
+
+    @property
+    def queue_depth(self) -> int:
+        return (self._queue.qsize() if self._queue else 0) + self._delayed
+
+    @property
+    def throughput(self) -> float:
+        """
+        Messages sent per second over the recent messages (up to the last 1000).
+        """
+        if len(self._sent_at) < 2:
+            return 0.0
+        elapsed = time.monotonic() - self._sent_at[0]
+        return len(self._sent_at) / elapsed if elapsed else 0.0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {'sent': self.sent, 'failed': self.failed, 'retried': self.retried,
+                'queue_depth': self.queue_depth, 'throughput': round(self.throughput, 1),
+                'workers': len(self._workers)}
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        if (bucket := self._chat_buckets.get(chat_id)) is None:
+            if len(self._chat_buckets) >= self.max_chat_buckets:
+                self._chat_buckets = {key: bucket for key, bucket in self._chat_buckets.items()
+                                      if not bucket.is_idle}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return bucket
+
+    def _requeue_later(self, delay: float, job: _Job) -> None:
+        self._delayed += 1
+
+        def requeue():
+            self._delayed -= 1
+            self._queue.put_nowait(job)
+
+        asyncio.get_running_loop().call_later(delay, requeue)
+
+    def _release_chat(self, job: _Job) -> None:
+        if self._sending.get(job.chat_id) is not job:
+            return
+        del self._sending[job.chat_id]
+        for held_job in self._held.pop(job.chat_id):
+            self._delayed -= 1
+            self._queue.put_nowait(held_job)
+
+    async def _work(self) -> None:
+        while True:
+            job: _Job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as error:
+                logging.exception(f"Broadcaster failed to process a message to <{job.chat_id}>")
+                if not job.future.done():
+                    job.future.set_exception(error)
+            finally:
+                if job.future.done():
+                    self._release_chat(job)
+                self._queue.task_done()
+
+    async def _process(self, job: _Job) -> None:
+        if job.future.cancelled():
+            return
+
+        if (sending := self._sending.get(job.chat_id)) is not None and sending is not job:
+            # Held messages are put back to the queue together, so they keep the priority and submission order
+            self._delayed += 1
+            self._held[job.chat_id].append(job)
+            return
+
+        # The chat token is reserved once, so later messages to the chat keep their order
+        if not job.chat_reserved:
+            job.chat_reserved = True
+            if delay := self._chat_bucket(job.chat_id).reserve():
+                self._requeue_later(delay, job)
+                return
+
+        if job.chat_id not in self._sending:
+            self._sending[job.chat_id] = job
+            self._held[job.chat_id] = []
+
+        while True:
+            if (pause := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(pause)
+            await asyncio.sleep(self.global_bucket.reserve())
+            # Flood control may be hit by another worker while the global token is awaited,
+            # then the token is taken again after the pause, so the paused messages aren't sent at once
+            if self._paused_until <= time.monotonic():
+                break
+
+        job.attempts += 1
+        try:
+            result = await getattr(self.bot, job.method)(job.chat_id, **job.kwargs)
+        except RetryAfter as error:
+            self._paused_until = max(self._paused_until, time.monotonic() + error.timeout)
+            if job.attempts <= self.max_retries:
+                self.retried += 1
+                logging.warning(f"Flood control, messages are paused for {error.timeout} s")
+                self._requeue_later(error.timeout, job)
+                return
+            self._fail(job, error)
+        except TelegramAPIError as error:
+            self._fail(job, error)
+        else:
+            self.sent += 1
+            self._sent_at.append(time.monotonic())
+            if not job.future.done():
+                job.future.set_result(result)
+
+    def _fail(self, job: _Job, error: Exception) -> None:
+        self.failed += 1
+        logging.warning(f"The message to <{job.chat_id}> isn't sent: {error}")
+        if not job.future.done():
+            job.future.set_exception(error)
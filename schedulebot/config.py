@@ -32,6 +32,69 @@ DB_CONNECT_SET = {
     'password': os.getenv('DB_PASSWORD'),
     'host': os.getenv('DB_HOST')
 }
+DB_POOL_SET = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'max_queries': int(os.getenv('DB_POOL_MAX_QUERIES', 50_000)),
+    'max_inactive_connection_lifetime': float(os.getenv('DB_POOL_MAX_INACTIVE_LIFETIME', 300)),
+    'statement_cache_size': int(os.getenv('DB_STATEMENT_CACHE_SIZE', 100)),
+}
+DB_ACQUIRE_TIMEOUT = float(os.getenv('DB_ACQUIRE_TIMEOUT', 10))
+
+# Run Mode Settings
+# 'polling' (getUpdates) or 'webhook' (Telegram pushes updates to the aiohttp server)
+RUN_MODE = os.getenv('RUN_MODE', 'polling')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST')  # e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_URL = f'{WEBHOOK_HOST}{WEBHOOK_PATH}' if WEBHOOK_HOST else None
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', 40))
+WEBAPP_HOST = os.getenv('WEBAPP_HOST', '0.0.0.0')
+WEBAPP_PORT = int(os.getenv('WEBAPP_PORT', 8080))
+# Worker processes sharing the port (SO_REUSEPORT), the background jobs run in the first one
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 1))
+
+# Update Processing Settings
+# Updates of different chats are processed in parallel up to this limit, updates of a chat - in order
+UPDATE_CONCURRENCY_LIMIT = int(os.getenv('UPDATE_CONCURRENCY_LIMIT', 32))
+
+# Redis (FSM Storage) Settings
+REDIS_CONNECT_SET = {
+    'host': os.getenv('REDIS_HOST', 'localhost'),
+    'port': int(os.getenv('REDIS_PORT', 6379)),
+    'db': int(os.getenv('REDIS_DB', 1)),
+    'password': os.getenv('REDIS_PASSWORD'),
+}
+
+# Google Drive Settings
+# The working Google folder, if it isn't set all files available to the service account are used
+GOOGLE_FOLDER_ID = os.getenv('GOOGLE_FOLDER_ID')
+GOOGLE_PAGE_SIZE = int(os.getenv('GOOGLE_PAGE_SIZE', 1000))
+GOOGLE_DISCOVERY_CACHE_DIR = Path(os.getenv('GOOGLE_DISCOVERY_CACHE_DIR', BASE_DIR / '.cache'))
+GOOGLE_DISCOVERY_MAX_AGE = float(os.getenv('GOOGLE_DISCOVERY_MAX_AGE', 7 * 24 * 60 * 60))
+
+# Schedule Cache Settings
+SCHEDULE_CACHE_MAX_BYTES = int(os.getenv('SCHEDULE_CACHE_MAX_BYTES', 64 * 2**20))
+SCHEDULE_CACHE_DIR = Path(os.getenv('SCHEDULE_CACHE_DIR', BASE_DIR / '.cache' / 'schedules'))
+
+# Schedule Change Alerts Settings
+# How often the working Google folder is checked for new document revisions
+SCHEDULE_POLL_INTERVAL = float(os.getenv('SCHEDULE_POLL_INTERVAL', 60))
+# Revisions saved within this period after each other make a single alert
+SCHEDULE_ALERT_DEBOUNCE = float(os.getenv('SCHEDULE_ALERT_DEBOUNCE', 300))
+
+# Broadcaster Settings (Telegram allows about 30 messages per second, 1 message per second to a chat)
+BROADCAST_WORKERS = int(os.getenv('BROADCAST_WORKERS', 8))
+BROADCAST_GLOBAL_RATE = float(os.getenv('BROADCAST_GLOBAL_RATE', 30))
+BROADCAST_CHAT_RATE = float(os.getenv('BROADCAST_CHAT_RATE', 1))
+BROADCAST_MAX_RETRIES = int(os.getenv('BROADCAST_MAX_RETRIES', 3))
+
+# Role Cache Settings
+ROLE_CACHE_SIZE = int(os.getenv('ROLE_CACHE_SIZE', 10_000))
+ROLE_CACHE_TTL = float(os.getenv('ROLE_CACHE_TTL', 300))
+
+# Blacklist Settings
+# Every process reloads the blacklist, so users banned by another webhook worker are dropped too
+BLACKLIST_RELOAD_INTERVAL = float(os.getenv('BLACKLIST_RELOAD_INTERVAL', 300))
 
 
 # Bot Role Settings
@@ -41,6 +104,33 @@ class Role(Enum):
     EMPLOYEE = bot_msg.EMPLOYEE.lower()
 
 
+# Badges shown before member names, keyed by the role value stored in the database
+ROLE_BADGES = {
+    Role.SUPERUSER.value: '',
+    Role.ADMIN.value: bot_msg.ADMIN_BADGE,
+    Role.EMPLOYEE.value: bot_msg.EMPLOYEE_BADGE,
+}
+
+# Staff View Settings
+STAFF_PAGE_SIZE = int(os.getenv('STAFF_PAGE_SIZE', 30))
+# The maximum size of a staff CSV document sent to the bot, in bytes
+STAFF_IMPORT_MAX_SIZE = int(os.getenv('STAFF_IMPORT_MAX_SIZE', 1024 * 1024))
+
+# Metrics Settings
+# Prometheus metrics are served on http://METRICS_HOST:METRICS_PORT/metrics, 0 disables the endpoint.
+# Webhook workers use consecutive ports starting from METRICS_PORT
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9100))
+
+# Profiler Settings
+# Updates are profiled with the probability PROFILER_SAMPLE_RATE, and the stack of any update
+# running longer than PROFILER_SLOW_THRESHOLD seconds is captured. Superuser toggles it by `/profile`
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', 0.0))
+PROFILER_SLOW_THRESHOLD = float(os.getenv('PROFILER_SLOW_THRESHOLD', 1.0))
+PROFILER_DUMP_DIR = Path(os.getenv('PROFILER_DUMP_DIR', BASE_DIR / '.cache' / 'profiles'))
+PROFILER_MAX_DUMPS = int(os.getenv('PROFILER_MAX_DUMPS', 50))
+
 # Logging Settings
 LOG_CONFIG = {
     'format': u'%(filename) -17s'
@@ -1,4 +1,13 @@
 from .db import create_pool
+from .cache import role_cache, blacklist_cache
+from .connection import LazyConnection
 from .crud import *
+from .staff_import import StaffImportError, import_staff_csv
 
-__all__ = ['create_pool', 'save_to_members', 'save_to_blacklist', 'get_file_ids']
+__all__ = ['create_pool', 'role_cache', 'blacklist_cache', 'LazyConnection',
+           'save_to_members', 'save_to_blacklist', 'load_blacklist', 'save_application',
+           'claim_next_application', 'close_application', 'reset_presented_application',
+           'count_pending_applications', 'get_member_role', 'get_file_ids',
+           'get_member_by_file_id', 'get_member_document', 'get_staff_page', 'save_drive_files',
+           'get_unreserved_files',
+           'StaffImportError', 'import_staff_csv']
@@ -0,0 +1,134 @@
+"""
+The module implements in-process caches for data that is read from the database
+on the hot path of every update.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Set, Union
+
+from schedulebot.config import ROLE_CACHE_SIZE, ROLE_CACHE_TTL, Role
+
+
+MISSING = object()
+
+
+class RoleCache:
+    """
+    This object represents a bounded LRU cache of member roles with a time-to-live.
+
+    Roles are keyed by the member's Telegram ID.
+    Unknown users are cached too (negative entries with the value `None`),
+    so repeated updates from applicants don't hit the database either.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        :param maxsize: The maximum quantity of entries, the least recently used entry is evicted first.
+        :type maxsize: :obj:`int`.
+        :param ttl: The entry lifetime in seconds.
+        :type ttl: :obj:`float`.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[float, Optional[Role]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, tg_id: int) -> Union[Optional[Role], Any]:
+        """
+        Returns a cached role of the member.
+
+        :param tg_id: Member’s Telegram ID.
+        :type tg_id: :obj:`int`.
+        :return: A cached role, `None` for a cached unknown user,
+            or the `MISSING` sentinel if there is no fresh entry.
+        """
+        entry = self._entries.get(tg_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[tg_id]
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(tg_id)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, tg_id: int, role: Optional[Role]) -> None:
+        """
+        Caches a role of the member (`None` for an unknown user).
+
+        :param tg_id: Member’s Telegram ID.
+        :type tg_id: :obj:`int`.
+        :param role: Member role.
+        :type role: :obj:`typing.Optional[schedulebot.config.Role]`.
+        :return:
+        """
+        self._entries[tg_id] = (time.monotonic() + self.ttl, role)
+        self._entries.move_to_end(tg_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tg_id: Union[int, str]) -> None:
+        """
+        Drops a cached role of the member. Must be called after any write concerning the member.
+
+        :param tg_id: Member’s Telegram ID.
+        :type tg_id: :obj:`typing.Union[int, str]`.
+        :return:
+        """
+        self._entries.pop(int(tg_id), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class BlacklistCache:
+    """
+    This object represents the in-memory set of blacklisted Telegram IDs.
+
+    The whole blacklist is kept in memory (it's loaded at the startup and updated on every insert),
+    so a banned user is recognized without a database query.
+    """
+
+    def __init__(self):
+        self.rejected = 0
+        self._ids: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, tg_id: int) -> bool:
+        return tg_id in self._ids
+
+    def replace(self, tg_ids: Iterable[int]) -> None:
+        """
+        Replaces the cached blacklist with the one loaded from the database.
+
+        :param tg_ids: Telegram IDs of all blacklisted users.
+        :type tg_ids: :obj:`typing.Iterable[int]`.
+        :return:
+        """
+        self._ids = set(tg_ids)
+
+    def add(self, tg_id: Union[int, str]) -> None:
+        self._ids.add(int(tg_id))
+
+    def discard(self, tg_id: Union[int, str]) -> None:
+        self._ids.discard(int(tg_id))
+
+    @property
+    def stats(self) -> dict:
+        return {'size': len(self._ids), 'rejected': self.rejected}
+
+
+role_cache = RoleCache(maxsize=ROLE_CACHE_SIZE, ttl=ROLE_CACHE_TTL)
+blacklist_cache = BlacklistCache()
@@ -0,0 +1,168 @@
+"""
+The module implements the database connection objects:
+a pool connection keeping prepared statements and a lazy connection that handlers
+receive instead of a connection acquired for the whole lifetime of an update.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Callable, Optional, AsyncIterator, List
+
+import asyncpg
+from asyncpg.pool import PoolConnectionProxy
+
+from schedulebot import metrics
+from schedulebot.config import DB_ACQUIRE_TIMEOUT
+
+
+class BotConnection(asyncpg.Connection):
+    """
+    This object represents a pool connection that counts the executed queries.
+    """
+
+    async def execute(self, query: str, *args, timeout: float = None) -> str:
+        # A query with arguments is counted by `_execute`
+        if not args:
+            metrics.DB_QUERIES.inc()
+        return await super().execute(query, *args, timeout=timeout)
+
+    async def _execute(self, *args, **kwargs):
+        # All `fetch*` methods and `execute` with arguments pass here
+        metrics.DB_QUERIES.inc()
+        return await super()._execute(*args, **kwargs)
+
+
+class LazyConnection:
+    """
+    This object represents a database session that acquires a connection from the pool
+    only on the first query and can return it to the pool early.
+
+    It provides the query methods of :obj:`asyncpg.Connection`, so it can be passed
+    everywhere a connection is expected. After :meth:`release` the next query
+    acquires a connection again.
+    """
+
+    def __init__(self, pool: asyncpg.pool.Pool, timeout: float = DB_ACQUIRE_TIMEOUT):
+        self.pool = pool
+        self.timeout = timeout
+        self._conn: Optional[PoolConnectionProxy] = None
+        self._lock = asyncio.Lock()
+        # Callbacks waiting for the commit of the current transaction, None outside a transaction
+        self._commit_callbacks: Optional[List[Callable[[], None]]] = None
+
+    @property
+    def is_acquired(self) -> bool:
+        return self._conn is not None
+
+    async def acquire(self) -> PoolConnectionProxy:
+        """
+        Returns the connection of the session, acquiring it from the pool if necessary.
+
+        :return: A connection from the pool.
+        :rtype: :obj:`asyncpg.pool.PoolConnectionProxy`.
+        """
+        if self._conn is None:
+            async with self._lock:
+                if self._conn is None:
+                    with metrics.DB_ACQUIRE_WAIT.time():
+                        self._conn = await self.pool.acquire(timeout=self.timeout)
+        return self._conn
+
+    async def release(self) -> None:
+        """
+        Returns the connection to the pool if it has been acquired.
+        Handlers should call it before slow Telegram API calls.
+
+        :return:
+        """
+        async with self._lock:
+            if self._conn is not None:
+                conn, self._conn = self._conn, None
+                await self.pool.release(conn)
+
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Calls the function when the current transaction of the session is committed,
+        or at once outside a transaction. Callbacks of a rolled back transaction are dropped.
+        It is intended for in-memory caches, so they don't see uncommitted writes.
+
+        :param callback: A function without arguments.
+        :type callback: :obj:`typing.Callable`.
+        :return:
+        """
+        if self._commit_callbacks is None:
+            callback()
+        else:
+            self._commit_callbacks.append(callback)
+
+    @asynccontextmanager
+    async def _transaction(self, conn: PoolConnectionProxy, **kwargs) -> AsyncIterator[PoolConnectionProxy]:
+        if self._commit_callbacks is not None:
+            # A nested transaction (a savepoint) is committed with the outer one
+            async with conn.transaction(**kwargs):
+                yield conn
+            return
+
+        callbacks = self._commit_callbacks = []
+        try:
+            async with conn.transaction(**kwargs):
+                yield conn
+        finally:
+            self._commit_callbacks = None
+        for callback in callbacks:
+            callback()
+
+    @asynccontextmanager
+    async def transaction(self, **kwargs) -> AsyncIterator[PoolConnectionProxy]:
+        """
+        Runs the enclosed queries in a single transaction, like :meth:`asyncpg.Connection.transaction`.
+        The connection stays acquired after the block.
+        """
+        conn = await self.acquire()
+        async with self._transaction(conn, **kwargs):
+            yield conn
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[PoolConnectionProxy]:
+        """
+        Runs the enclosed queries in a single transaction
+        and returns the connection to the pool when the block is done.
+
+        Usage:
+            async with db.unit_of_work() as conn:
+                await conn.execute(...)
+        """
+        conn = await self.acquire()
+        try:
+            async with self._transaction(conn):
+                yield conn
+        finally:
+            await self.release()
+
+    async def execute(self, query: str, *args, timeout: float = None) -> str:
+        conn = await self.acquire()
+        return await conn.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command: str, args, *, timeout: float = None):
+        conn = await self.acquire()
+        return await conn.executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: float = None, record_class=None) -> list:
+        conn = await self.acquire()
+        return await conn.fetch(query, *args, timeout=timeout, record_class=record_class)
+
+    async def fetchrow(self, query: str, *args, timeout: float = None, record_class=None):
+        conn = await self.acquire()
+        return await conn.fetchrow(query, *args, timeout=timeout, record_class=record_class)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: float = None):
+        conn = await self.acquire()
+        return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    async def prepare(self, query: str, *, timeout: float = None):
+        conn = await self.acquire()
+        return await conn.prepare(query, timeout=timeout)
+
+    async def copy_records_to_table(self, table_name: str, *, records, columns=None, timeout: float = None):
+        conn = await self.acquire()
+        return await conn.copy_records_to_table(table_name, records=records, columns=columns, timeout=timeout)
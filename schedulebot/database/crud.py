@@ -3,12 +3,189 @@ The module implements the functions of interaction between the bot and the datab
 """
 
 import logging
+from datetime import datetime
+from functools import partial
 
-from asyncpg import Connection, Record
-from typing import Union, Optional, List, AnyStr
+from asyncpg import Connection, Record, UniqueViolationError
+from typing import Callable, Union, Optional, List, Dict, Iterable, Iterator, Tuple, AnyStr
 
-from schedulebot.config import Role
-from schedulebot.models import Staff
+from schedulebot.config import Role, STAFF_PAGE_SIZE
+from schedulebot.database.cache import blacklist_cache, role_cache
+from schedulebot.database.connection import LazyConnection
+from schedulebot.models import Application, Staff, StaffPage
+
+
+class StatementRegistry:
+    """
+    This object represents a registry of the hot SQL statements.
+
+    A registered statement is executed by its query text, so asyncpg prepares it on the first use
+    and keeps it in the statement cache of the connection (`statement_cache_size`),
+    executing it again skips parsing and planning on the PostgreSQL server.
+    Unlike :obj:`asyncpg.prepared_stmt.PreparedStatement` objects, the cache stays valid
+    after the connection is released to the pool and acquired again.
+    """
+
+    def __init__(self):
+        self._queries: Dict[str, str] = {}
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._queries.values())
+
+    def register(self, name: str, query: str) -> str:
+        """
+        Registers a statement.
+
+        :param name: A unique statement name.
+        :type name: :obj:`str`.
+        :param query: SQL query text.
+        :type query: :obj:`str`.
+        :return: The statement name.
+        :rtype: :obj:`str`
+        """
+        if name in self._queries:
+            raise KeyError(f"The statement <{name}> is already registered")
+        self._queries[name] = query
+        return name
+
+    async def validate(self, conn: Connection) -> None:
+        """
+        Prepares all registered statements once, so a database without the tables they use
+        is found at the startup rather than by the first update.
+
+        :param conn: A database connection.
+        :type conn: :obj:`asyncpg.Connection`.
+        :return:
+        """
+        for query in self._queries.values():
+            await conn.prepare(query)
+
+    async def fetch(self, db_conn, name: str, *args) -> List[Record]:
+        return await db_conn.fetch(self._queries[name], *args)
+
+    async def fetchrow(self, db_conn, name: str, *args) -> Optional[Record]:
+        return await db_conn.fetchrow(self._queries[name], *args)
+
+    async def fetchval(self, db_conn, name: str, *args):
+        return await db_conn.fetchval(self._queries[name], *args)
+
+
+statements = StatementRegistry()
+
+GET_MEMBER_ROLE = statements.register(
+    'get_member_role',
+    """
+    SELECT role FROM members
+    INNER JOIN roles ON (members.role_id=roles.id)
+    WHERE tg_id=($1);
+    """
+)
+GET_FILE_IDS = statements.register(
+    'get_file_ids',
+    """
+    SELECT file_id FROM members WHERE file_id IS NOT NULL;
+    """
+)
+GET_UNRESERVED_FILES = statements.register(
+    'get_unreserved_files',
+    """
+    SELECT drive_files.file_id AS id, drive_files.name FROM drive_files
+    LEFT JOIN members ON (members.file_id=drive_files.file_id)
+    WHERE members.file_id IS NULL
+    ORDER BY drive_files.name ASC;
+    """
+)
+GET_MEMBER_BY_FILE_ID = statements.register(
+    'get_member_by_file_id',
+    """
+    SELECT tg_id, member_alias, role, file_id FROM members
+    JOIN roles ON (members.role_id=roles.id)
+    WHERE file_id=($1);
+    """
+)
+GET_MEMBER_DOCUMENT = statements.register(
+    'get_member_document',
+    """
+    SELECT members.file_id, drive_files.version FROM members
+    LEFT JOIN drive_files ON (drive_files.file_id=members.file_id)
+    WHERE tg_id=($1) AND members.file_id IS NOT NULL;
+    """
+)
+
+# Staff pages are read by the index on (role_id, member_alias, tg_id), the cursor is a member's tg_id
+_STAFF_PAGE_QUERY = """
+    SELECT tg_id, member_alias, role, file_id FROM members
+    JOIN roles ON (members.role_id=roles.id)
+    WHERE role_id != (SELECT id FROM roles WHERE role=$1) {keyset}
+    ORDER BY members.role_id {order}, members.member_alias {order}, members.tg_id {order}
+    LIMIT $2;
+"""
+_STAFF_CURSOR = "(SELECT role_id, member_alias, tg_id FROM members WHERE tg_id=$3)"
+GET_STAFF_FIRST_PAGE = statements.register(
+    'get_staff_first_page',
+    _STAFF_PAGE_QUERY.format(keyset='', order='ASC')
+)
+GET_STAFF_PAGE_AFTER = statements.register(
+    'get_staff_page_after',
+    _STAFF_PAGE_QUERY.format(keyset=f"AND (role_id, member_alias, tg_id) > {_STAFF_CURSOR}", order='ASC')
+)
+GET_STAFF_PAGE_BEFORE = statements.register(
+    'get_staff_page_before',
+    _STAFF_PAGE_QUERY.format(keyset=f"AND (role_id, member_alias, tg_id) < {_STAFF_CURSOR}", order='DESC')
+)
+
+# The partial unique index admits a single presented application, so only one claim succeeds
+CLAIM_NEXT_APPLICATION = statements.register(
+    'claim_next_application',
+    """
+    UPDATE applications SET status='presented'
+    WHERE id=(
+        SELECT id FROM applications WHERE status='pending'
+        ORDER BY id ASC LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, tg_id, tg_name, role, chat_id, message_id, phone, status, created_at, decided_at;
+    """
+)
+CLOSE_APPLICATION = statements.register(
+    'close_application',
+    """
+    UPDATE applications SET status=$2, decided_at=CURRENT_TIMESTAMP
+    WHERE id=$1 AND status='presented'
+    RETURNING id;
+    """
+)
+# The application presented before a restart goes back to the queue unless the manager still considers it
+RESET_PRESENTED_APPLICATION = statements.register(
+    'reset_presented_application',
+    """
+    UPDATE applications SET status='pending'
+    WHERE status='presented' AND id IS DISTINCT FROM $1
+    RETURNING id;
+    """
+)
+GET_BLACKLIST = statements.register(
+    'get_blacklist',
+    """
+    SELECT tg_id FROM blacklist;
+    """
+)
+COUNT_PENDING_APPLICATIONS = statements.register(
+    'count_pending_applications',
+    """
+    SELECT count(*) FROM applications WHERE status='pending';
+    """
+)
+
+
+def _on_commit(db_conn: Connection, callback: Callable[[], None]) -> None:
+    """
+    Calls the function when the transaction of a lazy session is committed, or at once otherwise.
+    """
+    if isinstance(db_conn, LazyConnection):
+        db_conn.on_commit(callback)
+    else:
+        callback()
 
 
 async def save_to_members(db_conn: Connection, *,
@@ -39,7 +216,7 @@ async def save_to_members(db_conn: Connection, *,
     if isinstance(tg_id, str):
         tg_id = int(tg_id)
     if isinstance(phone, int):
-        tg_id = str(phone)
+        phone = str(phone)
 
     sql_query = (
         """
@@ -49,6 +226,8 @@ async def save_to_members(db_conn: Connection, *,
         """, tg_id, member_alias, role, phone, file_id
     )
     await db_conn.execute(*sql_query)
+    # A role looked up before the commit would be cached as unknown otherwise
+    _on_commit(db_conn, partial(role_cache.invalidate, tg_id))
     logging.info(f"<{member_alias}> added to members")
 
 
@@ -74,7 +253,7 @@ async def save_to_blacklist(db_conn: Connection, *,
     if isinstance(tg_id, str):
         tg_id = int(tg_id)
     if isinstance(phone, int):
-        tg_id = str(phone)
+        phone = str(phone)
 
     sql_query = (
         f"""
@@ -84,9 +263,142 @@ async def save_to_blacklist(db_conn: Connection, *,
         """, tg_id, tg_name, phone
     )
     await db_conn.execute(*sql_query)
+    _on_commit(db_conn, partial(role_cache.invalidate, tg_id))
+    # A rolled back insert mustn't ban the user in memory
+    _on_commit(db_conn, partial(blacklist_cache.add, tg_id))
     logging.info(f"<{tg_name}> added to blacklist")
 
 
+async def load_blacklist(db_conn: Connection) -> int:
+    """
+    Loads Telegram IDs of all blacklisted users to the in-memory blacklist.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :return: The quantity of blacklisted users.
+    :rtype: :obj:`int`
+    """
+    records: List[Record] = await statements.fetch(db_conn, GET_BLACKLIST)
+    blacklist_cache.replace(record['tg_id'] for record in records)
+    return len(records)
+
+
+async def save_application(db_conn: Connection, *,
+                           tg_id: int,
+                           tg_name: str,
+                           role: str,
+                           chat_id: int,
+                           message_id: int,
+                           phone: Optional[str] = None) -> Optional[int]:
+    """
+    Records an application for membership to the database table `applications`.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param tg_id: Applicant’s Telegram ID.
+    :type tg_id: :obj:`int`.
+    :param tg_name: Applicant’s Telegram Username.
+    :type tg_name: :obj:`str`.
+    :param role: The requested role.
+    :type role: :obj:`str`.
+    :param chat_id: The chat of the message with the applicant's contact.
+    :type chat_id: :obj:`int`.
+    :param message_id: The message with the applicant's contact.
+    :type message_id: :obj:`int`.
+    :param phone: Applicant’s phone number.
+    :type phone: :obj:`typing.Optional[str]`.
+    :return: The application ID or None if the applicant already has an open application.
+    :rtype: :obj:`typing.Optional[int]`
+    """
+    application_id = await db_conn.fetchval(
+        """
+        INSERT INTO applications (tg_id, tg_name, role, chat_id, message_id, phone)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (tg_id) WHERE status IN ('pending', 'presented') DO NOTHING
+        RETURNING id;
+        """, tg_id, tg_name, role, chat_id, message_id, phone
+    )
+    if application_id:
+        logging.info(f"Application #{application_id} of <{tg_name}> is queued")
+    return application_id
+
+
+async def claim_next_application(db_conn: Connection) -> Optional[Application]:
+    """
+    Takes the oldest pending application to present it to the accepting manager.
+
+    Applications are presented one at a time: nothing is taken
+    while another application is presented and not decided yet.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :return: The application or None if the manager is busy or there are no pending applications.
+    :rtype: :obj:`typing.Optional[schedulebot.models.Application]`
+    """
+    try:
+        record: Optional[Record] = await statements.fetchrow(db_conn, CLAIM_NEXT_APPLICATION)
+    except UniqueViolationError:
+        return None
+    return Application(**record) if record else None
+
+
+async def close_application(db_conn: Connection, application_id: int, status: str) -> bool:
+    """
+    Records the decision on the presented application.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param application_id: The application ID.
+    :type application_id: :obj:`int`.
+    :param status: The decision, `accepted` or `rejected`.
+    :type status: :obj:`str`.
+    :return: False if the application isn't presented (e.g. it's already decided).
+    :rtype: :obj:`bool`
+    """
+    return await statements.fetchval(db_conn, CLOSE_APPLICATION, application_id, status) is not None
+
+
+async def reset_presented_application(db_conn: Connection, considered_id: Optional[int] = None) -> Optional[int]:
+    """
+    Returns the presented application to the queue if the accepting manager doesn't consider it,
+    e.g. the bot has stopped before the application got into the manager's FSM.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param considered_id: The application ID kept in the FSM of the manager.
+    :type considered_id: :obj:`typing.Optional[int]`.
+    :return: The ID of the application returned to the queue or None.
+    :rtype: :obj:`typing.Optional[int]`
+    """
+    return await statements.fetchval(db_conn, RESET_PRESENTED_APPLICATION, considered_id)
+
+
+async def count_pending_applications(db_conn: Connection) -> int:
+    """
+    Counts applications waiting for the accepting manager.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :return: The quantity of pending applications.
+    :rtype: :obj:`int`
+    """
+    return await statements.fetchval(db_conn, COUNT_PENDING_APPLICATIONS)
+
+
+async def get_member_role(db_conn: Connection, tg_id: int) -> Optional[str]:
+    """
+    Retrieves a role of the member from the database.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param tg_id: Member’s Telegram ID.
+    :type tg_id: :obj:`int`.
+    :return: A value of the member's role or None if the user isn't a member.
+    :rtype: :obj:`typing.Optional[str]`
+    """
+    return await statements.fetchval(db_conn, GET_MEMBER_ROLE, tg_id)
+
+
 async def get_file_ids(db_conn: Connection) -> List[str]:
     """
     Retrieves all Google Document IDs associated with members from the database.
@@ -96,29 +408,148 @@ async def get_file_ids(db_conn: Connection) -> List[str]:
     :return: A list of Google Document IDs or an empty list if there are none.
     :rtype: :obj:`typing.List[str]`
     """
-    sql_query = """
-        SELECT file_id FROM members WHERE file_id IS NOT NULL;
-        """
-    files: List[Record] = await db_conn.fetch(sql_query)
+    files: List[Record] = await statements.fetch(db_conn, GET_FILE_IDS)
     return [record['file_id'] for record in files]
 
 
-async def get_basic_staff_info(db: Connection) -> List[Staff]:
+async def get_member_by_file_id(db_conn: Connection, file_id: str) -> Optional[Staff]:
     """
-    Retrieves a basic staff's information from the database,
-    such us `tg_id`, `member_alias`, `role`, `file_id`
-    and returns it as Staff objects.
+    Retrieves a member associated with the Google Document.
 
-    :param db: A database session with an established connection to the PostgreSQL server.
-    :type db: :obj:`asyncpg.Connection`.
-    :return: A list of Staff objects with a basic info.
-    :rtype: :obj:`typing.List[schedulebot.models.Staff]`.
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param file_id: The Google Document ID.
+    :type file_id: :obj:`str`.
+    :return: A Staff object with a basic info or None if the document isn't reserved.
+    :rtype: :obj:`typing.Optional[schedulebot.models.Staff]`
+    """
+    record: Optional[Record] = await statements.fetchrow(db_conn, GET_MEMBER_BY_FILE_ID, file_id)
+    return Staff(**record) if record else None
+
+
+async def get_member_document(db_conn: Connection, tg_id: int) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Retrieves the Google Document associated with the member and its version from the folder mirror.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param tg_id: Member’s Telegram ID.
+    :type tg_id: :obj:`int`.
+    :return: The Google Document ID and its version (None if the document isn't in the Google folder)
+        or None if no document is associated with the member.
+    :rtype: :obj:`typing.Optional[typing.Tuple[str, typing.Optional[str]]]`
+    """
+    record: Optional[Record] = await statements.fetchrow(db_conn, GET_MEMBER_DOCUMENT, tg_id)
+    if not record:
+        return None
+    version = record['version']
+    return record['file_id'], str(version) if version is not None else None
+
+
+async def get_staff_page(db_conn: Connection, *,
+                         cursor: Optional[int] = None,
+                         backward: bool = False,
+                         limit: int = STAFF_PAGE_SIZE) -> StaffPage:
+    """
+    Retrieves a page of the staff (without Superuser) ordered by role and alias.
+
+    Pages are found by the keyset of the cursor member, so any page is loaded
+    by a single index range scan regardless of its position.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param cursor: Telegram ID of the member the page starts after (or ends before if `backward`),
+        if None the first page is retrieved.
+    :type cursor: :obj:`typing.Optional[int]`.
+    :param backward: If true, the page precedes the cursor.
+    :type backward: :obj:`bool`.
+    :param limit: The page size.
+    :type limit: :obj:`int`.
+    :return: A page of Staff objects with a basic info.
+    :rtype: :obj:`schedulebot.models.StaffPage`
     """
-    sql_query = """
-        SELECT tg_id, member_alias, role, file_id FROM members
-        JOIN roles ON (members.role_id=roles.id)
-        WHERE role != $1
-        ORDER BY members.member_alias ASC;
+    # One more row tells whether there is a page beyond this one
+    args = [Role.SUPERUSER.value, limit + 1]
+    if cursor is None:
+        name = GET_STAFF_FIRST_PAGE
+    else:
+        name = GET_STAFF_PAGE_BEFORE if backward else GET_STAFF_PAGE_AFTER
+        args.append(cursor)
+
+    records: List[Record] = await statements.fetch(db_conn, name, *args)
+    is_more = len(records) > limit
+    staff = [Staff(**record) for record in records[:limit]]
+    if backward:
+        staff.reverse()
+        return StaffPage(staff, has_previous=is_more, has_next=True)
+    return StaffPage(staff, has_previous=cursor is not None, has_next=is_more)
+
+
+async def save_drive_files(db_conn: Connection, *,
+                           changed: Iterable[Dict],
+                           removed: Iterable[str],
+                           full: bool = False,
+                           **kwargs):
+    """
+    Applies changes of the working Google folder to the database table `drive_files`.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param changed: Dicts containing the Document file data (`id`, `name`, `version`, `modifiedTime`).
+    :type changed: :obj:`typing.Iterable[typing.Dict]`.
+    :param removed: IDs of documents removed from the folder.
+    :type removed: :obj:`typing.Iterable[str]`.
+    :param full: If true, `changed` contains the whole folder, and all other rows are deleted.
+    :type full: :obj:`bool`.
+    :param kwargs: Necessary when receiving unwanted arguments.
+    :return:
+    """
+    records = [
+        (
+            file['id'],
+            file['name'],
+            int(file['version']) if file.get('version') else None,
+            datetime.fromisoformat(file['modifiedTime'].replace('Z', '+00:00'))
+            if file.get('modifiedTime') else None,
+        )
+        for file in changed
+    ]
+    removed = list(removed)
+
+    async with db_conn.transaction():
+        if full:
+            await db_conn.execute(
+                "DELETE FROM drive_files WHERE file_id <> ALL($1::varchar[]);",
+                [record[0] for record in records]
+            )
+        elif removed:
+            await db_conn.execute(
+                "DELETE FROM drive_files WHERE file_id = ANY($1::varchar[]);", removed
+            )
+        if records:
+            await db_conn.executemany(
+                """
+                INSERT INTO drive_files (file_id, name, version, modified_at) VALUES (
+                    ($1), ($2), ($3), ($4)
+                )
+                ON CONFLICT (file_id) DO UPDATE SET
+                    name=EXCLUDED.name,
+                    version=EXCLUDED.version,
+                    modified_at=EXCLUDED.modified_at,
+                    synced_at=CURRENT_TIMESTAMP;
+                """, records
+            )
+    logging.info(f"Google folder mirror updated: {len(records)} saved, {len(removed)} removed")
+
+
+async def get_unreserved_files(db_conn: Connection) -> List[Dict]:
+    """
+    Retrieves Google Documents of the working folder that aren't associated with any member.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :return: A list of dicts with `id` and `name` of documents or an empty list if there are none.
+    :rtype: :obj:`typing.List[typing.Dict]`
     """
-    staff_info: List[Record] = await db.fetch(sql_query, Role.SUPERUSER.value)
-    return [Staff(**record) for record in staff_info]
+    files: List[Record] = await statements.fetch(db_conn, GET_UNRESERVED_FILES)
+    return [dict(record) for record in files]
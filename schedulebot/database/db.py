@@ -1,10 +1,14 @@
+import argparse
 import logging
 import asyncio
+from pathlib import Path
 
 import asyncpg
 
-from schedulebot.config import DB_CONNECT_SET, SUPERUSER_ID, LOG_CONFIG, Role
-from schedulebot.database.crud import save_to_members
+from schedulebot.config import DB_CONNECT_SET, DB_POOL_SET, SUPERUSER_ID, LOG_CONFIG, Role
+from schedulebot.database.connection import BotConnection
+from schedulebot.database.crud import statements
+from schedulebot.database.staff_import import StaffImportError, import_staff_csv
 
 
 async def create_db():
@@ -13,31 +17,70 @@ async def create_db():
 
     conn: asyncpg.Connection = await asyncpg.connect(**DB_CONNECT_SET)
 
-    with open('db.sql', 'r') as sql:
+    with open(Path(__file__).with_name('db.sql'), 'r') as sql:
         sql_create_db = sql.read()
     await conn.execute(sql_create_db)
 
     logging.info('Initial insert data...')
 
-    sql_fill_role = (f"""
-        INSERT INTO roles (role) VALUES ($1), ($2), ($3);
+    # The script may be run again on an existing database, e.g. to add tables of a new version
+    await conn.execute("""
+        INSERT INTO roles (role) VALUES ($1), ($2), ($3)
+        ON CONFLICT (role) DO NOTHING;
         """, Role.SUPERUSER.value, Role.ADMIN.value, Role.EMPLOYEE.value)
-    await conn.execute(*sql_fill_role)
-
-    await save_to_members(conn,
-                          tg_id=SUPERUSER_ID,
-                          member_alias=Role.SUPERUSER.value.capitalize(),
-                          role=Role.SUPERUSER.value)
+    await conn.execute("""
+        INSERT INTO members (tg_id, member_alias, role_id) VALUES (
+            ($1), ($2), (SELECT id FROM roles WHERE role=($3))
+        )
+        ON CONFLICT (tg_id) DO NOTHING;
+        """, SUPERUSER_ID, Role.SUPERUSER.value.capitalize(), Role.SUPERUSER.value)
     await conn.close()
     logging.info("The Database and The Start Tables have been created!")
 
 
+async def import_staff_file(path: str):
+    logging.basicConfig(**LOG_CONFIG)
+    logging.info(f'Importing staff from {path}...')
+
+    with open(path, 'r', encoding='utf-8-sig', newline='') as csv_file:
+        text = csv_file.read()
+
+    conn: asyncpg.Connection = await asyncpg.connect(**DB_CONNECT_SET)
+    try:
+        imported = await import_staff_csv(conn, text)
+    except StaffImportError as error:
+        logging.error(f"The staff isn't imported:\n{error}")
+        raise SystemExit(1)
+    finally:
+        await conn.close()
+    logging.info(f"{imported} members have been imported!")
+
+
 async def create_pool() -> asyncpg.pool.Pool:
+    pool = await asyncpg.create_pool(**DB_CONNECT_SET, **DB_POOL_SET, connection_class=BotConnection)
+    try:
+        async with pool.acquire() as conn:
+            await statements.validate(conn)
+    except asyncpg.UndefinedTableError:
+        await pool.close()
+        logging.error("The database is outdated, upgrade it by `python -m schedulebot.database.db`")
+        raise
     logging.info('Database connection pool created')
-    return await asyncpg.create_pool(**DB_CONNECT_SET)
+    return pool
 
 
 if __name__ == '__main__':
-    # Creating the Initial Database and Start Tables
+    parser = argparse.ArgumentParser(description='Database management of the bot.')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('create', help='create the initial database and start tables or add missing ones (default)')
+    import_parser = commands.add_parser('import', help='import staff from a CSV document')
+    import_parser.add_argument('file', help='a CSV document with the columns: '
+                                            'tg_id, member_alias, role[, phone, file_id]')
+    args = parser.parse_args()
+
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(create_db())
+    if args.command == 'import':
+        loop.run_until_complete(import_staff_file(args.file))
+    else:
+        # Creating the Initial Database and Start Tables
+        loop.run_until_complete(create_db())
@@ -17,4 +17,41 @@ CREATE TABLE IF NOT EXISTS blacklist (
     tg_id BIGINT PRIMARY KEY,
     name VARCHAR(40) NOT NULL,
     phone VARCHAR(12)
-);
\ No newline at end of file
+);
+
+-- Applications for membership are decided one by one in the order of arrival:
+-- pending -> presented (to the accepting manager) -> accepted | rejected | failed (the contact can't be forwarded)
+CREATE TABLE IF NOT EXISTS applications (
+    id SERIAL PRIMARY KEY,
+    tg_id BIGINT NOT NULL,
+    tg_name VARCHAR(255) NOT NULL,
+    phone VARCHAR(20),
+    role VARCHAR(20) NOT NULL,
+    chat_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    status VARCHAR(10) DEFAULT 'pending' NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    decided_at TIMESTAMP
+);
+
+-- An applicant has at most one open application
+CREATE UNIQUE INDEX IF NOT EXISTS applications_open_tg_id_idx ON applications (tg_id)
+    WHERE status IN ('pending', 'presented');
+-- The manager considers one application at a time
+CREATE UNIQUE INDEX IF NOT EXISTS applications_presented_idx ON applications ((status))
+    WHERE status = 'presented';
+CREATE INDEX IF NOT EXISTS applications_pending_idx ON applications (id)
+    WHERE status = 'pending';
+
+CREATE TABLE IF NOT EXISTS drive_files (
+    file_id VARCHAR(60) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    version BIGINT,
+    modified_at TIMESTAMP WITH TIME ZONE,
+    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- `members.file_id` is UNIQUE, so the anti-join of unreserved files uses both indexes
+CREATE INDEX IF NOT EXISTS drive_files_name_idx ON drive_files (name);
+-- Keyset pagination of the staff list (`get_staff_page`) reads pages in this order
+CREATE INDEX IF NOT EXISTS members_staff_order_idx ON members (role_id, member_alias, tg_id);
@@ -0,0 +1,148 @@
+"""
+The module implements the bulk import of staff from a CSV document.
+
+The document has a header row with the columns `tg_id`, `member_alias`, `role`
+and optionally `phone` and `file_id`, e.g.:
+
+    tg_id,member_alias,role,phone,file_id
+    123456789,Olena,employee,380501234567,1AbCdEfGh
+    987654321,Ivan,адміністратор,,
+
+All rows are validated before anything is written, then they are loaded
+by a single COPY in a transaction, so the import either adds all members or none.
+"""
+
+import csv
+import io
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import asyncpg
+from asyncpg import Connection
+
+from schedulebot.config import Role
+from schedulebot.database.cache import role_cache
+
+
+REQUIRED_COLUMNS = ('tg_id', 'member_alias', 'role')
+OPTIONAL_COLUMNS = ('phone', 'file_id')
+# A role is given by its value or by its name, e.g. `admin`
+IMPORTED_ROLES = {key: role.value
+                  for role in (Role.ADMIN, Role.EMPLOYEE)
+                  for key in (role.value, role.name.lower())}
+
+# Limits of the `members` table columns
+MAX_ALIAS_LENGTH = 40
+MAX_PHONE_LENGTH = 12
+MAX_FILE_ID_LENGTH = 60
+
+StaffRow = Tuple[int, str, str, Optional[str], Optional[str]]
+
+
+class StaffImportError(ValueError):
+    """ This object represents an error of the staff import, it lists all invalid rows."""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__('\n'.join(errors))
+
+
+def parse_staff_csv(text: str) -> List[StaffRow]:
+    """
+    Parses and validates rows of the staff CSV document.
+
+    :param text: Content of the CSV document.
+    :type text: :obj:`str`.
+    :return: Tuples `(tg_id, member_alias, role, phone, file_id)`, empty optional values are None.
+    :rtype: :obj:`typing.List[typing.Tuple]`
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    columns = [name.strip() for name in reader.fieldnames or []]
+    if missing := [name for name in REQUIRED_COLUMNS if name not in columns]:
+        raise StaffImportError([f"Missing columns: {', '.join(missing)}"])
+    reader.fieldnames = columns
+
+    rows: List[StaffRow] = []
+    errors: List[str] = []
+    seen: Dict[str, set] = {'tg_id': set(), 'phone': set(), 'file_id': set()}
+
+    # The header is the line 1
+    for line, record in enumerate(reader, start=2):
+        values = {name: (record.get(name) or '').strip()
+                  for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+
+        if not values['tg_id'].isdigit():
+            errors.append(f"Line {line}: invalid tg_id '{values['tg_id']}'")
+            continue
+        tg_id = int(values['tg_id'])
+
+        if not 0 < len(values['member_alias']) <= MAX_ALIAS_LENGTH:
+            errors.append(f"Line {line}: member_alias must be 1-{MAX_ALIAS_LENGTH} characters")
+        role = IMPORTED_ROLES.get(values['role'].lower())
+        if role is None:
+            errors.append(f"Line {line}: role must be one of {', '.join(IMPORTED_ROLES)}")
+        phone = values['phone'].lstrip('+')
+        if phone and not (phone.isdigit() and len(phone) <= MAX_PHONE_LENGTH):
+            errors.append(f"Line {line}: invalid phone '{values['phone']}'")
+        if len(values['file_id']) > MAX_FILE_ID_LENGTH:
+            errors.append(f"Line {line}: file_id is longer than {MAX_FILE_ID_LENGTH} characters")
+
+        for name, value in (('tg_id', tg_id), ('phone', phone), ('file_id', values['file_id'])):
+            if value and value in seen[name]:
+                errors.append(f"Line {line}: duplicate {name} '{value}'")
+            seen[name].add(value)
+
+        rows.append((tg_id, values['member_alias'], role, phone or None, values['file_id'] or None))
+
+    if errors:
+        raise StaffImportError(errors)
+    if not rows:
+        raise StaffImportError(["The document has no rows"])
+    return rows
+
+
+async def import_staff(db_conn: Connection, rows: Iterable[StaffRow]) -> int:
+    """
+    Records members to the database table `members` by a single COPY in a transaction.
+    Role IDs are resolved by one query for all rows.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param rows: Validated rows returned by :func:`parse_staff_csv`.
+    :type rows: :obj:`typing.Iterable[typing.Tuple]`.
+    :return: The quantity of imported members.
+    :rtype: :obj:`int`
+    """
+    rows = list(rows)
+    async with db_conn.transaction():
+        role_ids = {record['role']: record['id']
+                    for record in await db_conn.fetch("SELECT id, role FROM roles;")}
+        records = [(tg_id, member_alias, role_ids[role], phone, file_id)
+                   for tg_id, member_alias, role, phone, file_id in rows]
+        try:
+            await db_conn.copy_records_to_table(
+                'members',
+                records=records,
+                columns=('tg_id', 'member_alias', 'role_id', 'phone', 'file_id')
+            )
+        except asyncpg.UniqueViolationError as error:
+            raise StaffImportError([f"Already in the database: {error.detail or error}"]) from error
+
+    for tg_id, *_ in rows:
+        role_cache.invalidate(tg_id)
+    logging.info(f"{len(records)} members imported")
+    return len(records)
+
+
+async def import_staff_csv(db_conn: Connection, text: str) -> int:
+    """
+    Validates the staff CSV document and imports it.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :param text: Content of the CSV document.
+    :type text: :obj:`str`.
+    :return: The quantity of imported members.
+    :rtype: :obj:`int`
+    """
+    return await import_staff(db_conn, parse_staff_csv(text))
@@ -2,6 +2,7 @@ from aiogram import Dispatcher
 
 from .test_filter import TestFilter
 from .role import SuperuserFilter, RoleFilter, FileSelectionMenuAccessFilter
+from .application import CurrentApplicationFilter
 
 
 def setup(dp: Dispatcher):
@@ -9,3 +10,4 @@ def setup(dp: Dispatcher):
     dp.filters_factory.bind(RoleFilter)
     dp.filters_factory.bind(SuperuserFilter)
     dp.filters_factory.bind(FileSelectionMenuAccessFilter)
+    dp.filters_factory.bind(CurrentApplicationFilter)
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.filters import BoundFilter
+from aiogram.types import CallbackQuery
+
+from ..keyboards import MembershipMenuMarkup
+
+
+class CurrentApplicationFilter(BoundFilter):
+    """
+    Checks whether a decision button belongs to the application presented to the manager,
+    the ID of which is kept in the state data.
+    """
+    key = 'is_current_application'
+
+    def __init__(self, is_current_application: Optional[bool] = None):
+        self.is_current_application = is_current_application
+
+    async def check(self, call: CallbackQuery):
+        if self.is_current_application is None:
+            return True
+        try:
+            callback_data = MembershipMenuMarkup.application_callback.parse(call.data)
+        except ValueError:
+            return False
+        state = Dispatcher.get_current().current_state()
+        state_data = await state.get_data()
+        is_current = str(state_data.get('application_id')) == callback_data['id']
+        return is_current == self.is_current_application
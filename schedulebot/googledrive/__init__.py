@@ -4,5 +4,9 @@ Serves to interact with Google working folder via Google APIs.
 """
 
 from .actions import get_list_files
+from .client import drive_client
+from .documents import iter_documents, get_document_version, export_document
+from .sync import drive_sync, SyncDelta
 
-__all__ = ['get_list_files']
+__all__ = ['get_list_files', 'iter_documents', 'get_document_version', 'export_document',
+           'drive_client', 'drive_sync', 'SyncDelta']
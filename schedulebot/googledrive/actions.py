@@ -8,9 +8,9 @@ import logging
 import asyncio
 from typing import Callable, Optional, Union, List, Dict
 
-from aiogoogle import Aiogoogle
-
-from schedulebot.googledrive.credentials import CREDS
+from schedulebot.googledrive.client import drive_client
+from schedulebot.googledrive.documents import iter_documents
+from schedulebot.googledrive.sync import drive_sync
 
 
 def only_id_and_name(func_doc_files) -> Callable:
@@ -26,42 +26,32 @@ def only_id_and_name(func_doc_files) -> Callable:
     return wrapper
 
 
-def only_document(func_list_files) -> Callable:
-    """
-    Decorator for func get_list_files().
-
-    Looks for Document files.
-    (from the results of get_list_files() separates files with the extension `.document`).
-
-    :return: If success, a list of dicts containing the Document file data.
-    """
-    async def wrapper() -> Union[List[Dict], List[None]]:
-        list_files = await func_list_files()
-        file_document = list(filter(lambda x: x['mimeType'].split('.')[-1] == 'document',
-                                    list_files))
-        return file_document if file_document else []
-    return wrapper
-
-
 @only_id_and_name
-@only_document
 async def get_list_files() -> Union[List[Dict], List[None]]:
     """
-    Getting a list of Google folder's files with their data.
+    Getting a list of Google folder's documents with their data.
+
+    The function is read-only: the files are taken from the local snapshot of the folder
+    if it has been synced, otherwise the folder is listed. The snapshot isn't refreshed here,
+    because only the folder watcher advances it together with the database mirror (`drive_files`).
 
     :return: If the folder is not empty, a list of dicts containing the file data.
     """
-    async with Aiogoogle(service_account_creds=CREDS) as aiogoogle:
-        drive = await aiogoogle.discover('drive', 'v3')
-        response: dict = await aiogoogle.as_service_account(
-            drive.files.list(),
-        )
-        lst_files = response.get('files')
-        return lst_files if lst_files else []
+    if drive_sync.page_token is not None:
+        return list(drive_sync.snapshot.values())
+    await drive_client.start()
+    return [document async for document in iter_documents(drive_sync.folder_id)]
 
 
 if __name__ == "__main__":
     import pprint
+
+    async def main():
+        try:
+            return await get_list_files()
+        finally:
+            await drive_client.close()
+
     pp = pprint.PrettyPrinter(indent=3)
-    files = asyncio.run(get_list_files())
+    files = asyncio.run(main())
     pp.pprint(files)
@@ -0,0 +1,151 @@
+"""
+The module client:
+Provides a long-lived Google Drive client shared by all Drive operations of the bot.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Dict
+from urllib.parse import urlsplit
+
+from aiogoogle import Aiogoogle
+from aiogoogle.resource import GoogleAPI
+from aiogoogle.sessions.abc import AbstractSession
+
+from schedulebot import metrics
+from schedulebot.config import GOOGLE_DISCOVERY_CACHE_DIR, GOOGLE_DISCOVERY_MAX_AGE
+from schedulebot.googledrive.credentials import get_creds
+
+
+# Segments of Drive API paths, the others are IDs
+DRIVE_PATH_SEGMENTS = {'files', 'export', 'copy', 'changes', 'startPageToken', 'watch', 'about',
+                       'permissions', 'revisions', 'comments', 'drives'}
+
+
+class DriveClient:
+    """
+    This object represents a Google Drive API client living as long as the bot.
+
+    It keeps one HTTP session, so TLS connections are reused between calls,
+    and one service account manager, so the access token is reused until it expires.
+    The Drive discovery document is cached on disk and downloaded again only
+    if the cached one is outdated or describes another API version.
+    """
+    API_NAME = 'drive'
+    API_VERSION = 'v3'
+
+    def __init__(self, discovery_cache_dir: Path, discovery_max_age: float):
+        """
+        :param discovery_cache_dir: A directory for the cached discovery document.
+        :type discovery_cache_dir: :obj:`pathlib.Path`.
+        :param discovery_max_age: The lifetime of the cached discovery document in seconds.
+        :type discovery_max_age: :obj:`float`.
+        """
+        self.discovery_cache = Path(discovery_cache_dir) / f'{self.API_NAME}_{self.API_VERSION}.json'
+        self.discovery_max_age = discovery_max_age
+        self.drive: Optional[GoogleAPI] = None
+        self._aiogoogle: Optional[Aiogoogle] = None
+        self._session: Optional[AbstractSession] = None
+
+    @property
+    def is_started(self) -> bool:
+        return self._aiogoogle is not None
+
+    async def start(self) -> None:
+        """
+        Opens the HTTP session and loads the Drive API discovery document.
+        It is called at the bot startup.
+
+        :return:
+        """
+        if self.is_started:
+            return
+        self._aiogoogle = Aiogoogle(service_account_creds=get_creds())
+        self._session = self._aiogoogle.session_factory()
+        self.drive = GoogleAPI(await self._load_discovery_document())
+        logging.info('Google Drive client started')
+
+    async def close(self) -> None:
+        """
+        Closes the HTTP session. It is called at the bot shutdown.
+
+        :return:
+        """
+        if not self.is_started:
+            return
+        await self._session.close()
+        self._aiogoogle = self._session = self.drive = None
+        logging.info('Google Drive client closed')
+
+    async def as_service_account(self, *requests, **kwargs):
+        """
+        Sends requests to the Google API on behalf of the service account.
+
+        :param requests: Requests created by methods of :attr:`drive`.
+        :param kwargs: Passed to :meth:`aiogoogle.Aiogoogle.as_service_account`.
+        :return: A response content.
+        """
+        if not self.is_started:
+            raise RuntimeError('The Google Drive client is not started')
+        self._bind_session()
+        operation = ','.join(self.operation(request) for request in requests)
+        started = time.perf_counter()
+        try:
+            return await self._aiogoogle.as_service_account(*requests, **kwargs)
+        except Exception:
+            metrics.DRIVE_ERRORS.inc(operation=operation)
+            raise
+        finally:
+            metrics.DRIVE_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+    @staticmethod
+    def operation(request) -> str:
+        """
+        Returns a name of the request for metrics, e.g. `GET files/{id}/export`.
+        IDs in the path are replaced, so the names don't depend on particular files.
+        """
+        path = urlsplit(request.url or '').path.split('/drive/v3/', 1)[-1]
+        segments = [segment if segment in DRIVE_PATH_SEGMENTS else '{id}' for segment in path.split('/')]
+        return f"{request.method} {'/'.join(segments)}"
+
+    def _bind_session(self) -> None:
+        # Aiogoogle keeps the active session in a context variable,
+        # so the shared session is bound to the context of the current task
+        if self._aiogoogle.session_context.get() is None:
+            self._aiogoogle.session_context.set(self._session)
+
+    async def _load_discovery_document(self) -> Dict:
+        if document := self._read_cached_discovery_document():
+            return document
+
+        self._bind_session()
+        api = await self._aiogoogle.discover(self.API_NAME, self.API_VERSION)
+        document = api.discovery_document
+
+        self.discovery_cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.discovery_cache.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps(document))
+        os.replace(tmp_file, self.discovery_cache)
+        logging.info(f"Discovery document <{self.API_NAME} {self.API_VERSION}> "
+                     f"revision {document.get('revision')} is cached")
+        return document
+
+    def _read_cached_discovery_document(self) -> Optional[Dict]:
+        try:
+            if time.time() - self.discovery_cache.stat().st_mtime > self.discovery_max_age:
+                return None
+            document = json.loads(self.discovery_cache.read_text())
+        except (OSError, ValueError):
+            return None
+
+        if document.get('name') != self.API_NAME or document.get('version') != self.API_VERSION:
+            logging.warning(f"Cached discovery document <{self.discovery_cache}> doesn't match "
+                            f"the API version and will be downloaded again")
+            return None
+        return document
+
+
+drive_client = DriveClient(GOOGLE_DISCOVERY_CACHE_DIR, GOOGLE_DISCOVERY_MAX_AGE)
@@ -7,6 +7,7 @@ This file must be named `service_account.json` and locate in the current package
 """
 
 import json
+from functools import lru_cache
 from pathlib import Path
 
 from aiogoogle.auth.creds import ServiceAccountCreds
@@ -14,12 +15,24 @@ from aiogoogle.auth.creds import ServiceAccountCreds
 
 BASE_DIR = Path(__file__).resolve().parent
 
-SERVICE_ACCOUNT_KEY = json.load(open(f'{BASE_DIR}/service_account.json'))
+SERVICE_ACCOUNT_KEY_FILE = BASE_DIR / 'service_account.json'
 
-CREDS = ServiceAccountCreds(
-    scopes=[
-        "https://www.googleapis.com/auth/drive",
-        "https://www.googleapis.com/auth/drive.file",
-    ],
-    **SERVICE_ACCOUNT_KEY
-)
+
+@lru_cache(maxsize=None)
+def get_creds() -> ServiceAccountCreds:
+    """
+    Loads the service account credentials once, when they are needed for the first time.
+
+    :return: Credentials of the Google service account.
+    :rtype: :obj:`aiogoogle.auth.creds.ServiceAccountCreds`
+    """
+    with open(SERVICE_ACCOUNT_KEY_FILE) as key_file:
+        service_account_key = json.load(key_file)
+
+    return ServiceAccountCreds(
+        scopes=[
+            "https://www.googleapis.com/auth/drive",
+            "https://www.googleapis.com/auth/drive.file",
+        ],
+        **service_account_key
+    )
@@ -0,0 +1,97 @@
+"""
+The module documents:
+Streams Google Documents of the working Google folder page by page
+and exports their content.
+"""
+
+from typing import AsyncIterator, Dict, Optional
+
+from schedulebot.config import GOOGLE_FOLDER_ID, GOOGLE_PAGE_SIZE
+from schedulebot.googledrive.client import DriveClient, drive_client
+
+
+DOCUMENT_MIME_TYPE = 'application/vnd.google-apps.document'
+DOCUMENT_FIELDS = 'id, name, modifiedTime, version'
+
+
+def documents_query(folder_id: Optional[str] = None) -> str:
+    """
+    Builds a Drive search query for Google Documents that aren't in the trash.
+
+    :param folder_id: The Google folder ID, if None documents of any folder are found.
+    :type folder_id: :obj:`typing.Optional[str]`.
+    :return: A value of the `q` parameter for `files.list`.
+    :rtype: :obj:`str`
+    """
+    query = f"mimeType = '{DOCUMENT_MIME_TYPE}' and trashed = false"
+    if folder_id:
+        query += f" and '{folder_id}' in parents"
+    return query
+
+
+async def iter_documents(folder_id: Optional[str] = GOOGLE_FOLDER_ID,
+                         page_size: int = GOOGLE_PAGE_SIZE,
+                         *,
+                         client: DriveClient = drive_client) -> AsyncIterator[Dict]:
+    """
+    Yields Google Documents of the folder following all pages of the listing.
+
+    Filtering is done by Google Drive, and only the fields `id`, `name`,
+    `modifiedTime` and `version` are requested, so only one page is kept in memory.
+
+    :param folder_id: The Google folder ID, if None documents of any folder are found.
+    :type folder_id: :obj:`typing.Optional[str]`.
+    :param page_size: The maximum quantity of documents per page (up to 1000).
+    :type page_size: :obj:`int`.
+    :param client: A started Google Drive client.
+    :type client: :obj:`schedulebot.googledrive.client.DriveClient`.
+    :return: An async iterator of dicts containing the document data.
+    """
+    params = dict(q=documents_query(folder_id),
+                  fields=f'nextPageToken, files({DOCUMENT_FIELDS})',
+                  pageSize=page_size)
+    while True:
+        response: dict = await client.as_service_account(
+            client.drive.files.list(**params),
+        )
+        for document in response.get('files', []):
+            yield document
+        if not (page_token := response.get('nextPageToken')):
+            break
+        params['pageToken'] = page_token
+
+
+async def get_document_version(file_id: str, *, client: DriveClient = drive_client) -> str:
+    """
+    Gets the current version of a Google Document from Drive metadata.
+    The version grows with every change of the document.
+
+    :param file_id: The Google Document ID.
+    :type file_id: :obj:`str`.
+    :param client: A started Google Drive client.
+    :type client: :obj:`schedulebot.googledrive.client.DriveClient`.
+    :return: The document version.
+    :rtype: :obj:`str`
+    """
+    response: dict = await client.as_service_account(
+        client.drive.files.get(fileId=file_id, fields='version'),
+    )
+    return response['version']
+
+
+async def export_document(file_id: str, *, client: DriveClient = drive_client) -> str:
+    """
+    Exports a Google Document as plain text.
+
+    :param file_id: The Google Document ID.
+    :type file_id: :obj:`str`.
+    :param client: A started Google Drive client.
+    :type client: :obj:`schedulebot.googledrive.client.DriveClient`.
+    :return: The text of the document.
+    :rtype: :obj:`str`
+    """
+    text = await client.as_service_account(
+        client.drive.files.export(fileId=file_id, mimeType='text/plain'),
+    )
+    # Google Docs prepend the exported text with the byte order mark
+    return text.lstrip('\ufeff') if text else ''
@@ -0,0 +1,162 @@
+"""
+The module sync:
+Keeps a local snapshot of the working Google folder up to date
+using the Google Drive changes feed, so each request pulls only deltas.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from schedulebot.config import GOOGLE_FOLDER_ID
+from schedulebot.googledrive.client import DriveClient, drive_client
+from schedulebot.googledrive.documents import DOCUMENT_FIELDS, DOCUMENT_MIME_TYPE, iter_documents
+
+
+FILE_FIELDS = f'{DOCUMENT_FIELDS}, mimeType, parents, trashed'
+
+
+@dataclass
+class SyncDelta:
+    """
+    An object representation of the snapshot changes made by one refresh.
+
+    If `full` is true, the snapshot has been created from scratch,
+    and `changed` contains all documents of the folder.
+    """
+    changed: List[Dict] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    full: bool = False
+
+    def __bool__(self) -> bool:
+        return self.full or bool(self.changed or self.removed)
+
+
+class DriveFolderSync:
+    """
+    This object represents a local snapshot of Google Documents in the working Google folder.
+
+    The first refresh lists the whole folder and remembers a start page token
+    of the Drive changes feed. Every next refresh applies only changes made since then
+    (`changes.list`), and moves the page token forward.
+
+    Listeners subscribed to the sync receive every non-empty delta,
+    whichever part of the bot has refreshed the snapshot.
+    """
+
+    def __init__(self, client: DriveClient, folder_id: Optional[str] = None):
+        """
+        :param client: A Google Drive client.
+        :type client: :obj:`schedulebot.googledrive.client.DriveClient`.
+        :param folder_id: The working Google folder ID, if None all available files are tracked.
+        :type folder_id: :obj:`typing.Optional[str]`.
+        """
+        self.client = client
+        self.folder_id = folder_id
+        self.page_token: Optional[str] = None
+        self.snapshot: Dict[str, Dict] = {}
+        self._listeners: List[Callable[[SyncDelta], Awaitable]] = []
+        self._lock = asyncio.Lock()
+
+    def subscribe(self, listener: Callable[[SyncDelta], Awaitable]) -> None:
+        """
+        Registers a coroutine function receiving the snapshot changes.
+
+        :param listener: A coroutine function accepting :obj:`SyncDelta`.
+        :type listener: :obj:`typing.Callable`.
+        :return:
+        """
+        self._listeners.append(listener)
+
+    def reset(self) -> None:
+        """
+        Drops the snapshot, so the next refresh lists the whole folder again.
+        """
+        self.page_token = None
+        self.snapshot = {}
+
+    async def refresh(self) -> SyncDelta:
+        """
+        Brings the snapshot up to date.
+
+        :return: The changes of the snapshot made by this refresh.
+        :rtype: :obj:`schedulebot.googledrive.sync.SyncDelta`
+        """
+        async with self._lock:
+            await self.client.start()
+            if self.page_token is None:
+                delta = await self._full_sync()
+            else:
+                delta = await self._pull_changes()
+
+        if delta:
+            for listener in self._listeners:
+                try:
+                    await listener(delta)
+                except Exception:
+                    logging.exception(f"Google folder listener {listener} failed")
+        return delta
+
+    async def _full_sync(self) -> SyncDelta:
+        client = self.client
+        # The token is taken before listing, so changes made during the listing aren't lost
+        response: dict = await client.as_service_account(
+            client.drive.changes.getStartPageToken(),
+        )
+        page_token = response['startPageToken']
+
+        self.snapshot = {document['id']: document
+                         async for document in iter_documents(self.folder_id, client=client)}
+        self.page_token = page_token
+        logging.info(f"Google folder snapshot is created: {len(self.snapshot)} files")
+        return SyncDelta(changed=list(self.snapshot.values()), full=True)
+
+    async def _pull_changes(self) -> SyncDelta:
+        client = self.client
+        page_token = self.page_token
+        changed: Dict[str, Dict] = {}
+        removed: Dict[str, None] = {}
+        while page_token:
+            response: dict = await client.as_service_account(
+                client.drive.changes.list(
+                    pageToken=page_token,
+                    includeRemoved=True,
+                    fields=f'nextPageToken, newStartPageToken, '
+                           f'changes(fileId, removed, file({FILE_FIELDS}))',
+                ),
+            )
+            for change in response.get('changes', []):
+                file_id = change['fileId']
+                was_tracked = file_id in self.snapshot
+                if file := self._apply_change(change):
+                    changed[file_id] = file
+                    removed.pop(file_id, None)
+                elif was_tracked:
+                    # Changes of files that have never been in the folder aren't reported
+                    removed[file_id] = None
+                    changed.pop(file_id, None)
+            if new_start_page_token := response.get('newStartPageToken'):
+                self.page_token = new_start_page_token
+            page_token = response.get('nextPageToken')
+
+        if changed or removed:
+            logging.info(f"Google folder snapshot is updated: "
+                         f"{len(changed)} changed, {len(removed)} removed")
+        return SyncDelta(changed=list(changed.values()), removed=list(removed))
+
+    def _apply_change(self, change: Dict) -> Optional[Dict]:
+        file: Optional[Dict] = change.get('file')
+        if change.get('removed') or not file or not self._is_tracked(file):
+            self.snapshot.pop(change['fileId'], None)
+            return None
+        self.snapshot[file['id']] = file
+        return file
+
+    def _is_tracked(self, file: Dict) -> bool:
+        if file.get('trashed') or file.get('mimeType') != DOCUMENT_MIME_TYPE:
+            return False
+        return not self.folder_id or self.folder_id in file.get('parents', [])
+
+
+drive_sync = DriveFolderSync(drive_client, GOOGLE_FOLDER_ID)
@@ -3,7 +3,7 @@ from aiogram import Dispatcher
 from .superuser import register_superuser_handlers
 from .membership import register_membership_handlers
 # from .admin import register_admin
-# from .employee import register_employee
+from .employee import register_employee_handlers
 from .debug import register_debug
 
 
@@ -23,5 +23,5 @@ def setup(dp: Dispatcher):
     register_superuser_handlers(dp)
     register_membership_handlers(dp)
     # register_admin(dp)
-    # register_employee(dp)
+    register_employee_handlers(dp)
     register_debug(dp)
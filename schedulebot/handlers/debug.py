@@ -1,6 +1,8 @@
 from aiogram import types, Dispatcher
 
+from .. import messages as bot_msg
 from ..filters.test_filter import TestFilter
+from ..middlewares import ProfilerMiddleware
 
 
 async def test(message: types.Message, middleware, from_filter):
@@ -12,9 +14,44 @@ async def test(message: types.Message, middleware, from_filter):
     return {'from_handler': 'This is data from handler'}
 
 
+async def toggle_profiler(message: types.Message):
+    """
+    This handler shows and changes the profiler settings at runtime:
+    `/profile` shows the status, `/profile on|off` toggles it,
+    `/profile rate 0.01` sets the sample rate, `/profile threshold 2` sets the slow threshold in seconds.
+
+    :param message: An incoming `/profile` command of Superuser.
+    :type message: :obj:`aiogram.types.Message`.
+    :return:
+    """
+    profiler: ProfilerMiddleware = Dispatcher.get_current()['profiler']
+    command, _, value = message.get_args().strip().lower().partition(' ')
+    try:
+        if command in ('on', 'off'):
+            profiler.enabled = command == 'on'
+        elif command == 'rate' and 0 <= float(value) <= 1:
+            profiler.sample_rate = float(value)
+        elif command == 'threshold' and float(value) >= 0:
+            profiler.slow_threshold = float(value)
+        elif command:
+            raise ValueError(command)
+    except ValueError:
+        await message.answer(bot_msg.PROFILER_USAGE, 'html')
+        return
+
+    await message.answer(bot_msg.PROFILER_STATUS % (
+        '✅' if profiler.enabled else '⛔️',
+        profiler.sample_rate,
+        profiler.slow_threshold,
+        profiler.dumps,
+        profiler.dump_dir,
+    ), 'html')
+
+
 # ************************************************************
 # ^^^ REGISTRATION OF ALL HANDLERS THAT EXPLAINED ABOVE ^^^
 # ************************************************************
 
 def register_debug(dp: Dispatcher):
     dp.register_message_handler(test, TestFilter(), commands=['test'])
+    dp.register_message_handler(toggle_profiler, is_superuser=True, commands=['profile'])
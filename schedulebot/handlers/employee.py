@@ -1,19 +1,78 @@
-from aiogram import types, Dispatcher
-
-import schedulebot.messages as msg
-
-
-# async def client_confirm(call: types.CallbackQuery):
-#     await call.answer(cache_time=20)
-#     name = call.message.chat.first_name
-#     await call.message.answer(
-#         msg.CONFIRM_ROLE % (name, 'адміністратору'),
-#         reply_markup=kb.mkp_confirm_admin
-#     )
-#
-#
-# def register_employee(dp: Dispatcher):
-#     dp.register_callback_query_handler(
-#         client_confirm,
-#         kb.cb_start.filter(role='employee')
-#     )
+"""
+The module represents handlers for Employee functionality.
+"""
+
+import logging
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.webhook import SendMessage
+from aiogram.types import Message
+
+from .helpers import format_schedule_entry
+from .. import messages as bot_msg
+from .. import database
+from .. import schedule
+from ..database import LazyConnection
+from ..config import Role
+
+
+# Commands of the employee's schedule, mapped to the period and its title
+SCHEDULE_COMMANDS = {
+    'today': (schedule.Period.TODAY, bot_msg.SCHEDULE_TODAY),
+    'tomorrow': (schedule.Period.TOMORROW, bot_msg.SCHEDULE_TOMORROW),
+    'week': (schedule.Period.THIS_WEEK, bot_msg.SCHEDULE_THIS_WEEK),
+    'next_week': (schedule.Period.NEXT_WEEK, bot_msg.SCHEDULE_NEXT_WEEK),
+}
+
+
+async def provide_schedule(message: Message, db: LazyConnection) -> SendMessage:
+    """
+    This handler sends the employee's schedule of the period to the employee.
+    The commands: `/today`, `/tomorrow`, `/week` and `/next_week`.
+
+    The document version is taken from the database mirror of the Google folder,
+    so any webhook worker answers without requests to Google Drive unless the document is changed.
+
+    :param message: An incoming message with a schedule command from Employee.
+    :type message: :obj:`aiogram.types.Message`.
+    :param db: A lazy database session, a connection is acquired on the first query.
+    :type db: :obj:`schedulebot.database.LazyConnection`.
+    :return: The reply, in the webhook mode it is sent in the webhook response.
+    :rtype: :obj:`aiogram.dispatcher.webhook.SendMessage`
+    """
+    period, title = SCHEDULE_COMMANDS[message.get_command(pure=True)]
+    document = await database.get_member_document(db, message.from_user.id)
+    # The document is exported and parsed without holding the connection
+    await db.release()
+
+    if not document:
+        return SendMessage(message.chat.id, bot_msg.NO_SCHEDULE_DOCUMENT, 'html')
+    file_id, version = document
+    if version is None:
+        # The document has been removed from the Google folder
+        await schedule.forget_schedule(file_id)
+        return SendMessage(message.chat.id, bot_msg.NO_SCHEDULE_DOCUMENT, 'html')
+
+    entries = await schedule.find_schedule(file_id, period, version=version)
+    rows = '\n'.join(map(format_schedule_entry, entries)) or bot_msg.SCHEDULE_EMPTY
+    return SendMessage(message.chat.id, bot_msg.SCHEDULE_PERIOD % (title, rows), 'html')
+
+
+# ************************************************************************************************
+#                 ^^^ REGISTRATION OF ALL HANDLERS THAT EXPLAINED ABOVE ^^^
+# ************************************************************************************************
+
+def register_employee_handlers(dp: Dispatcher):
+    """
+    This function registers handlers for the Employee actions.
+
+    :param dp: Current update dispatcher.
+    :type dp: :obj:`aiogram.Dispatcher`.
+    :return:
+    """
+    dp.register_message_handler(
+        provide_schedule,
+        role=Role.EMPLOYEE,
+        commands=list(SCHEDULE_COMMANDS)
+    )
+    logging.info("Registration of Employee handlers is completed.")
@@ -2,14 +2,30 @@
 Module provides helper functions for handlers.
 """
 
+import asyncio
+import html
+import logging
+from contextlib import suppress
 from typing import List, Dict
 
+import asyncpg
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.storage import BaseStorage
 from aiogram.types import CallbackQuery
+from aiogram.utils.exceptions import BadRequest, TelegramAPIError
+from aiogram.utils.parts import MAX_MESSAGE_LENGTH
 
+from . import rollback
 from .. import messages as bot_msg
 from .. import database
-from .. import googledrive
-from ..config import Role
+from .. import schedule
+from ..broadcaster import Broadcaster, Priority
+from ..config import Role, ROLE_BADGES, SUPERUSER_ID
+from ..states import MembershipState
+from ..models import Shift, ScheduleEntry
+
+# Descriptions are cut in alerts, so a row always fits into a message
+MAX_DESCRIPTION_LENGTH = 200
 
 
 class RoleException(ValueError):
@@ -42,14 +58,109 @@ def get_and_check_role(data: Dict) -> str:
 async def find_unreserved_files(db_conn) -> List[Dict]:
     """
     Looks for unreserved files (documents) in Google working folder.
-    :param db_conn: A database session with an established connection to the PostgreSQL server.
-    :type db_conn: :obj:`asyncpg.Connection`.
+
+    In the process running the background jobs, the mirror of the folder in the database is brought
+    up to date with changes from Google Drive first, the connection of the session is returned
+    to the pool meanwhile. Other webhook workers read the mirror kept by the folder watcher.
+    Then unreserved files are found by a single query.
+
+    :param db_conn: A lazy database session.
+    :type db_conn: :obj:`schedulebot.database.LazyConnection`.
     :return: A list of dict with data of Google files (documents) or an empty list if there are none.
     :rtype: :obj:`typing.List[typing.Dict]`
     """
-    lst_files_google = await googledrive.get_list_files()
-    lst_id_docs_in_db = await database.get_file_ids(db_conn)
-    return [file for file in lst_files_google if file['id'] not in lst_id_docs_in_db]
+    if Dispatcher.get_current()['background_jobs']:
+        await db_conn.release()
+        await schedule.sync_folder(db_conn)
+    return await database.get_unreserved_files(db_conn)
+
+
+async def present_next_application(bot: Bot, storage: BaseStorage, db_conn) -> None:
+    """
+    Presents the oldest pending application to the accepting manager if he isn't busy
+    with another application: forwards the applicant's contact and sends the APPLICANT CONSIDERATION MENU.
+
+    The FSM of the manager holds only the presented application, the others wait in the database.
+    If the applicant's contact can't be forwarded (e.g. the message is deleted), the application
+    is closed as failed and the next one is presented. If the menu isn't sent for another reason,
+    the application goes back to the queue.
+
+    :param bot: The bot instance.
+    :type bot: :obj:`aiogram.Bot`.
+    :param storage: The FSM storage.
+    :type storage: :obj:`aiogram.dispatcher.storage.BaseStorage`.
+    :param db_conn: A lazy database session, it's released before the messages are sent.
+    :type db_conn: :obj:`schedulebot.database.LazyConnection`.
+    :return:
+    """
+    while application := await database.claim_next_application(db_conn):
+        application_data = {
+            'application_id': application.id,
+            'tg_id': application.tg_id,
+            'tg_name': application.tg_name,
+            'role': application.role,
+            'phone': application.phone,
+        }
+
+        is_files = True
+        if application.role == Role.EMPLOYEE.value:
+            free_files = await find_unreserved_files(db_conn)
+            application_data.update(free_files=free_files)
+            is_files = bool(free_files)
+        queued = await database.count_pending_applications(db_conn)
+        await db_conn.release()
+
+        menu_params = (application.id, application.tg_name, application.role, is_files, queued)
+        membership_message = rollback.render_menu(rollback.APPLICANT_CONSIDERATION_MENU, application_data,
+                                                  *menu_params)
+        try:
+            await bot.forward_message(SUPERUSER_ID, application.chat_id, application.message_id,
+                                      protect_content=True)
+        except BadRequest as error:
+            logging.warning(f"Application #{application.id} isn't presented, the contact isn't forwarded: {error}")
+            await database.close_application(db_conn, application.id, 'failed')
+            await storage.finish(user=application.tg_id)
+            with suppress(TelegramAPIError):
+                await bot.send_message(application.chat_id, bot_msg.APPLICATION_FAILED)
+            continue
+
+        try:
+            await bot.send_message(SUPERUSER_ID, **membership_message)
+            set_state = MembershipState.applicant_consideration
+            rollback.push_rollback_point(application_data, rollback.APPLICANT_CONSIDERATION_MENU, set_state,
+                                         *menu_params)
+            await storage.set_state(chat=SUPERUSER_ID, state=set_state)
+            await storage.set_data(chat=SUPERUSER_ID, data=application_data)
+        except Exception:
+            # The manager doesn't know about the application, so it waits for the next presentation
+            await database.reset_presented_application(db_conn)
+            raise
+        finally:
+            await db_conn.release()
+        logging.info(f"Application #{application.id} is presented to the accepting manager")
+        return
+
+    await db_conn.release()
+
+
+async def restore_presented_application(bot: Bot, storage: BaseStorage, db_conn) -> None:
+    """
+    Brings the application queue to a consistent state at the startup:
+    the application presented before a restart stays presented only if the FSM of the accepting manager
+    still holds it, otherwise it goes back to the queue and the oldest pending application is presented.
+
+    :param bot: The bot instance.
+    :type bot: :obj:`aiogram.Bot`.
+    :param storage: The FSM storage.
+    :type storage: :obj:`aiogram.dispatcher.storage.BaseStorage`.
+    :param db_conn: A lazy database session.
+    :type db_conn: :obj:`schedulebot.database.LazyConnection`.
+    :return:
+    """
+    manager_data = await storage.get_data(chat=SUPERUSER_ID)
+    if application_id := await database.reset_presented_application(db_conn, manager_data.get('application_id')):
+        logging.warning(f"Application #{application_id} is lost by the accepting manager and queued again")
+    await present_next_application(bot, storage, db_conn)
 
 
 async def notify_application_results(call: CallbackQuery, state_data: Dict):
@@ -65,7 +176,7 @@ async def notify_application_results(call: CallbackQuery, state_data: Dict):
     """
     if member_alias := state_data.get('member_alias'):
         role = next(rl for rl in Role if rl.value == state_data['role'])
-        badge = bot_msg.__dict__[f'{role.name}_BADGE']
+        badge = ROLE_BADGES[role.value]
         notify_msg_text = bot_msg.ADDED_TO_MEMBERS % (badge, member_alias, role.value.capitalize())
         answer_msg_text = bot_msg.ACCESS_ALLOWED % role.value.capitalize()
         sticker = bot_msg.STICKER_CONGRATULATION
@@ -75,5 +186,77 @@ async def notify_application_results(call: CallbackQuery, state_data: Dict):
         sticker = bot_msg.STICKER_REGRET
 
     await call.message.answer(notify_msg_text, 'html')
-    await call.bot.send_message(state_data['tg_id'], answer_msg_text)
-    await call.bot.send_sticker(state_data['tg_id'], sticker)
+
+    # The applicant's chat is another one, so the messages go through the rate-limited queue
+    broadcaster: Broadcaster = Dispatcher.get_current()['broadcaster']
+    broadcaster.send_message(state_data['tg_id'], answer_msg_text, Priority.INTERACTIVE)
+    broadcaster.send_sticker(state_data['tg_id'], sticker, Priority.INTERACTIVE)
+
+
+def format_schedule_entry(entry: ScheduleEntry) -> str:
+    """
+    Returns a short text representation of the schedule record, escaped for the HTML parse mode.
+
+    :param entry: A schedule record.
+    :type entry: :obj:`schedulebot.models.ScheduleEntry`.
+    :return: A text like `25.12 09:00–18:00`.
+    :rtype: :obj:`str`
+    """
+    text = entry.start.strftime('%d.%m %H:%M')
+    if entry.end:
+        text += entry.end.strftime('–%H:%M')
+    if not isinstance(entry, Shift):
+        description = entry.description
+        if len(description) > MAX_DESCRIPTION_LENGTH:
+            description = description[:MAX_DESCRIPTION_LENGTH - 1] + '…'
+        text += f' {html.escape(description)}'
+    return text
+
+
+async def notify_schedule_changes(broadcaster: Broadcaster, pool: asyncpg.pool.Pool,
+                                  file_id: str, changes: List[schedule.ScheduleChange]):
+    """
+    Sends a single alert about changes of the schedule to the employee associated with the document.
+    An alert that doesn't fit into a Telegram message is split into several messages by rows.
+
+    :param broadcaster: The outbound message queue, alerts are sent as bulk messages.
+    :type broadcaster: :obj:`schedulebot.broadcaster.Broadcaster`.
+    :param pool: A database connection pool.
+    :type pool: :obj:`asyncpg.pool.Pool`.
+    :param file_id: The Google Document ID.
+    :type file_id: :obj:`str`.
+    :param changes: Changes of the schedule.
+    :type changes: :obj:`typing.List[schedulebot.schedule.ScheduleChange]`.
+    :return:
+    """
+    async with pool.acquire() as db_conn:
+        member = await database.get_member_by_file_id(db_conn, file_id)
+    if not member:
+        return
+
+    rows = []
+    for change in changes:
+        if change.kind is schedule.ChangeKind.ADDED:
+            rows.append(bot_msg.SCHEDULE_ADDED_ROW % format_schedule_entry(change.entry))
+        elif change.kind is schedule.ChangeKind.REMOVED:
+            rows.append(bot_msg.SCHEDULE_REMOVED_ROW % format_schedule_entry(change.entry))
+        else:
+            rows.append(bot_msg.SCHEDULE_MOVED_ROW % (format_schedule_entry(change.previous),
+                                                      format_schedule_entry(change.entry)))
+
+    member_alias = html.escape(member.member_alias)
+    chunks = [[]]
+    length = len(bot_msg.SCHEDULE_CHANGED % (member_alias, ''))
+    for row in rows:
+        if length + len(row) + 1 > MAX_MESSAGE_LENGTH:
+            chunks.append([])
+            length = 0
+        chunks[-1].append(row)
+        length += len(row) + 1
+    texts = [bot_msg.SCHEDULE_CHANGED % (member_alias, '\n'.join(chunks[0]))]
+    texts.extend('\n'.join(chunk) for chunk in chunks[1:])
+
+    # Messages to the same chat are sent in the submission order
+    await asyncio.gather(*(broadcaster.send_message(member.tg_id, text, Priority.BULK, parse_mode='html')
+                           for text in texts))
+    logging.info(f"<{member.member_alias}> is notified about {len(changes)} schedule changes")
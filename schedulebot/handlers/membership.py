@@ -4,20 +4,21 @@ It inclusions handlers for an applicant and handlers for acceptance managers.
 """
 
 import logging
-import pickle
 from typing import List, Dict
 
-from asyncpg import Connection
 from aiogram import Dispatcher
 from aiogram.dispatcher import FSMContext
+from aiogram.dispatcher.webhook import SendMessage
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove, ContentType
+from aiogram.utils.exceptions import MessageNotModified
 
-from . import helpers
+from . import helpers, rollback
 from .. import messages as bot_msg
 from .. import database
-from ..config import Role, SUPERUSER_ID
+from ..database import LazyConnection
+from ..config import Role
 from ..filters import FileSelectionMenuAccessFilter
-from ..keyboards import MembershipMenuMarkup
+from ..keyboards import MembershipMenuMarkup, PaginatedInlineMarkup
 from ..states import MemberRegisterState, MembershipState
 
 
@@ -39,16 +40,12 @@ async def applicants_start(message: Message, state: FSMContext):
     greeting_msg_text = bot_msg.MEMBERSHIP_START % message.from_user.first_name
     await message.answer(greeting_msg_text, 'html')
 
-    role_msg_text = bot_msg.ROLE_SELECTION
-    role_msg_markup = MembershipMenuMarkup.member_role_selection()
-    role_message = dict(text=role_msg_text, parse_mode='html', reply_markup=role_msg_markup)
-    await message.answer(**role_message)
+    await message.answer(**rollback.render_menu(rollback.ROLE_SELECTION_MENU, {}))
 
     set_state = MemberRegisterState.applicant_role_selection
     await state.set_state(set_state)
-
-    rollback_point = pickle.dumps((role_message, set_state)).hex()
-    await state.update_data(rollback=rollback_point)
+    # A new registration starts with a new rollback stack
+    await state.update_data(rollback.push_rollback_point({}, rollback.ROLE_SELECTION_MENU, set_state))
 
 
 async def confirm_applicant_role(call: CallbackQuery):
@@ -106,11 +103,12 @@ async def send_applicant_contact_to_verification(call: CallbackQuery, state: FSM
 
 async def forward_applicant_contact_to_accepting_manager(message: Message,
                                                          state: FSMContext,
-                                                         db: Connection):
+                                                         db: LazyConnection):
     """
-    This handler forwards an incoming applicant's contact to an accepting manager.
-    And sends to an accepting manager the message containing the APPLICANT CONSIDERATION MENU.
-    Also notifies the applicant that he needs to wait.
+    This handler queues an application with the incoming applicant's contact
+    and notifies the applicant that he needs to wait.
+    If the accepting manager isn't busy with another application, the oldest application is presented to him:
+    the applicant's contact is forwarded, and the APPLICANT CONSIDERATION MENU is sent.
 
     The handler is only used in FSM after the state:
         * MemberRegisterState:sending_contact.
@@ -119,51 +117,37 @@ async def forward_applicant_contact_to_accepting_manager(message: Message,
     :type message: :obj:`aiogram.types.Message`.
     :param state: Current state in the FSM of the applicant.
     :type state: :obj:`aiogram.dispatcher.FSMContext`.
-    :param db: A database session with an established connection to the PostgreSQL server.
-    :type db: :obj:`asyncpg.Connection`.
+    :param db: A lazy database session, a connection is acquired on the first query.
+    :type db: :obj:`schedulebot.database.LazyConnection`.
     :return:
     """
-    await message.answer(bot_msg.WAIT_FOR_ANSWER, reply_markup=ReplyKeyboardRemove())
-    await MemberRegisterState.wait_acceptance.set()
-
     state_data = await state.get_data()
     applicant_role: str = helpers.get_and_check_role(state_data)
 
-    applicant_data = {
-        'tg_id': message.contact.user_id,
-        'tg_name': message.contact.full_name,
-        'role': applicant_role,
-        'phone': message.contact.phone_number,
-    }
-
-    msg_text = bot_msg.MEMBERSHIP_REQUEST % (applicant_data['tg_name'], applicant_role.capitalize())
-    is_files = True
-
-    if applicant_role == Role.EMPLOYEE.value:
-        free_files = await helpers.find_unreserved_files(db)
-        applicant_data.update(free_files=free_files)
-        if not free_files:
-            msg_text += bot_msg.MISSING_FREE_FILES
-            is_files = False
-
-    msg_markup = MembershipMenuMarkup.applicant_consideration(is_files=is_files)
-    membership_message = dict(text=msg_text, parse_mode='html', reply_markup=msg_markup)
-    await message.forward(SUPERUSER_ID, protect_content=True)
-    await message.bot.send_message(SUPERUSER_ID, **membership_message)
+    application_id = await database.save_application(db,
+                                                     tg_id=message.contact.user_id,
+                                                     tg_name=message.contact.full_name,
+                                                     role=applicant_role,
+                                                     chat_id=message.chat.id,
+                                                     message_id=message.message_id,
+                                                     phone=message.contact.phone_number)
+    await MemberRegisterState.wait_acceptance.set()
 
-    set_state = MembershipState.applicant_consideration
-    await state.storage.set_state(chat=SUPERUSER_ID, state=set_state)
+    if application_id is None:
+        await db.release()
+        await message.answer(bot_msg.ALREADY_APPLIED, reply_markup=ReplyKeyboardRemove())
+        return
 
-    rollback_point = pickle.dumps((membership_message, set_state)).hex()
-    applicant_data.update(rollback=rollback_point)
-    await state.storage.set_data(chat=SUPERUSER_ID, data=applicant_data)
+    await message.answer(bot_msg.WAIT_FOR_ANSWER, reply_markup=ReplyKeyboardRemove())
+    await helpers.present_next_application(message.bot, state.storage, db)
 
 
 # ************************************************************************************************
 #                                     ACCEPTING MANAGER HANDLERS
 # ************************************************************************************************
 
-async def provide_member_file_selection_menu(call: CallbackQuery, state: FSMContext, files: List[Dict]):
+async def provide_member_file_selection_menu(call: CallbackQuery, state: FSMContext,
+                                             files: List[Dict], callback_data: Dict):
     """
     This handler provides the MEMBER FILE SELECTION MENU instead the APPLICANT CONSIDERATION MENU
     if an applicant is Employee, and the Google folder contains free documents
@@ -183,23 +167,51 @@ async def provide_member_file_selection_menu(call: CallbackQuery, state: FSMCont
     :param files: List of dicts containing data about Document files passed
         from the FileSelectionMenuAccessFilter.
     :type files: :obj:`base.List[base.Dict]`
+    :param callback_data: Parsed callback data containing the application `id`.
+    :type callback_data: :obj:`base.Dict`
     :return:
     """
     await call.answer()
 
-    msg_text = bot_msg.MEMBER_FILE_SELECTION
-    msg_markup = MembershipMenuMarkup.member_file_selection(files)
-    message = dict(text=msg_text, parse_mode='html', reply_markup=msg_markup)
+    state_data = {'free_files': files, 'application_id': int(callback_data['id'])}
+    message = rollback.render_menu(rollback.MEMBER_FILE_SELECTION_MENU, state_data)
     await call.message.edit_text(**message)
 
     set_state = MembershipState.member_file_selection
     await state.set_state(set_state)
+    await rollback.save_rollback_point(state, rollback.MEMBER_FILE_SELECTION_MENU, set_state)
+
+
+async def turn_member_file_selection_page(call: CallbackQuery, state: FSMContext, callback_data: Dict):
+    """
+    This handler shows another page of the MEMBER FILE SELECTION MENU.
+    Files of all pages are taken from the state data, so Google Drive isn't requested again.
 
-    rollback_point = pickle.dumps((message, set_state)).hex()
-    await state.update_data(rollback=rollback_point)
+    The handler is only used in the FSM after the state:
+        * MembershipState.member_file_selection.
+
+    :param call: An incoming callback query from the navigation buttons of the MEMBER FILE SELECTION MENU.
+    :type call: :obj:`aiogram.types.CallbackQuery`
+    :param state: Current state in FSM of the accepting manager.
+    :type state: :obj:`aiogram.dispatcher.FSMContext`.
+    :param callback_data: Parsed callback data containing the page `number`.
+    :type callback_data: :obj:`base.Dict`
+    :return:
+    """
+    await call.answer()
+
+    state_data: dict = await state.get_data()
+    markup = MembershipMenuMarkup.member_file_selection(state_data.get('free_files', []),
+                                                        state_data['application_id'],
+                                                        page=int(callback_data['number']))
+    try:
+        await call.message.edit_reply_markup(markup)
+    except MessageNotModified:
+        # The page counter button shows the current page
+        pass
 
 
-async def confirm_membership_decision(call: CallbackQuery, state: FSMContext):
+async def confirm_membership_decision(call: CallbackQuery, state: FSMContext, callback_data: Dict):
     """
     This handler requests confirmation of a membership decision.
     The previous APPLICANT CONSIDERATION MENU or the MEMBER FILE SELECTION MENU
@@ -215,14 +227,17 @@ async def confirm_membership_decision(call: CallbackQuery, state: FSMContext):
     :type call: :obj:`aiogram.types.CallbackQuery`.
     :param state: Current state in FSM of the accepting manager.
     :type state: :obj:`aiogram.dispatcher.FSMContext`.
+    :param callback_data: Parsed callback data containing the `decision` and the application `id`.
+    :type callback_data: :obj:`base.Dict`
     :return:
     """
     await call.answer()
 
     state_data: dict = await state.get_data()
     applicant_role = helpers.get_and_check_role(state_data)
+    decision: str = callback_data['decision']
 
-    if call.data == 'accepted':
+    if decision == 'accepted':
         if applicant_role == Role.EMPLOYEE.value:
             msg_text = bot_msg.EMPLOYEE_WITHOUT_FILE_ACCEPTANCE_CONFIRMATION
         elif applicant_role == Role.ADMIN.value:
@@ -231,16 +246,32 @@ async def confirm_membership_decision(call: CallbackQuery, state: FSMContext):
             raise helpers.RoleException(f"Got an invalid role for membership: {applicant_role}")
         await MembershipState.acceptance_confirmation.set()
 
-    elif call.data == 'rejected':
+    elif decision == 'rejected':
         msg_text = bot_msg.MEMBERSHIP_REJECTION_CONFIRMATION
         await MembershipState.rejection_confirmation.set()
     else:
         raise ValueError(f"Got an unknown callback_data: '{call.data}'")
 
-    markup = MembershipMenuMarkup.confirmation(call.data)
+    markup = MembershipMenuMarkup.confirmation(decision)
     await call.message.edit_text(msg_text, 'html', reply_markup=markup)
 
 
+async def reject_outdated_application(call: CallbackQuery):
+    """
+    This handler removes decision buttons of an application that isn't presented to the manager anymore
+    (e.g. it is already decided), so a decision can't be applied to another application.
+
+    The handler is used for all states of the accepting manager.
+
+    :param call: An incoming callback query from the callback buttons ACCEPT, ACCEPT_WITHOUT_FILE or REJECT
+        of the outdated APPLICANT CONSIDERATION MENU, or the MEMBER FILE SELECTION MENU.
+    :type call: :obj:`aiogram.types.CallbackQuery`.
+    :return:
+    """
+    await call.answer(bot_msg.APPLICATION_OUTDATED, show_alert=True)
+    await call.message.delete_reply_markup()
+
+
 async def confirm_choosing_in_member_file_selection_menu(call: CallbackQuery, state: FSMContext):
     """
     This handler requests confirmation of a selected file.
@@ -292,20 +323,18 @@ async def request_members_alias(call: CallbackQuery, state: FSMContext):
 
     async with state.proxy() as data:
         member_name = data.pop('filename', data['tg_name'])
-        data.pop('free_files')
+        data.pop('free_files', None)
 
-    msg_text = bot_msg.ASKING_MEMBERS_ALIAS % (member_name + ' ' + data['role'].capitalize())
-    message = dict(text=msg_text, parse_mode='html')
+    menu_params = (member_name, data['role'])
+    message = rollback.render_menu(rollback.MEMBERS_ALIAS_REQUEST_MENU, data, *menu_params)
     await call.message.edit_text(**message)
 
     set_state = MembershipState.input_members_alias
     await state.set_state(set_state)
-
-    rollback_point = pickle.dumps((message, set_state)).hex()
-    await state.update_data(rollback=rollback_point)
+    await rollback.save_rollback_point(state, rollback.MEMBERS_ALIAS_REQUEST_MENU, set_state, *menu_params)
 
 
-async def confirm_members_alias(message: Message, state: FSMContext):
+async def confirm_members_alias(message: Message, state: FSMContext) -> SendMessage:
     """
     This handler requests confirmation of a member's alias.
 
@@ -316,27 +345,29 @@ async def confirm_members_alias(message: Message, state: FSMContext):
     :type message: :obj:`aiogram.types.Message`.
     :param state: Current state in FSM of the accepting manager.
     :type state: :obj:`aiogram.dispatcher.FSMContext`.
-    :return:
+    :return: The reply, in the webhook mode it is sent in the webhook response.
+    :rtype: :obj:`aiogram.dispatcher.webhook.SendMessage`
     """
     await message.delete()
     await message.bot.delete_message(message.chat.id, message.message_id - 1)
 
     member_alias = message.text
-    msg_text = bot_msg.ALIAS_CONFIRMATION % member_alias
-    markup = MembershipMenuMarkup.confirmation()
-    await message.answer(msg_text, 'html', reply_markup=markup)
-
     await state.update_data(member_alias=member_alias)
     await MembershipState.member_alias_confirmation.set()
 
+    msg_text = bot_msg.ALIAS_CONFIRMATION % member_alias
+    markup = MembershipMenuMarkup.confirmation()
+    return SendMessage(message.chat.id, msg_text, 'html', reply_markup=markup)
+
 
-async def finish_acceptance_to_membership(call: CallbackQuery, state: FSMContext, db: Connection):
+async def finish_acceptance_to_membership(call: CallbackQuery, state: FSMContext, db: LazyConnection):
     """
     This handler adds an applicant to database.
     If the applicant has been rejected, he will be added to the `blacklist` table.
     If the applicant has been accepted, he will be added to the `members` table.
 
-    The applicant and acceptance managers are notified of the result.
+    The applicant and acceptance managers are notified of the result,
+    then the next pending application is presented to the manager.
 
     The handler is only used in the FSM after the states:
         * MembershipState:rejection_confirmation,
@@ -348,8 +379,8 @@ async def finish_acceptance_to_membership(call: CallbackQuery, state: FSMContext
     :type call: :obj:`aiogram.types.CallbackQuery`.
     :param state: Current state in the FSM of the accepting manager.
     :type state: :obj:`aiogram.dispatcher.FSMContext`.
-    :param db: A database session with an established connection to the PostgreSQL server.
-    :type db: :obj:`asyncpg.Connection`.
+    :param db: A lazy database session, a connection is acquired on the first query.
+    :type db: :obj:`schedulebot.database.LazyConnection`.
     :return:
     """
     await call.answer()
@@ -357,27 +388,23 @@ async def finish_acceptance_to_membership(call: CallbackQuery, state: FSMContext
 
     state_data: dict = await state.get_data()
 
-    if member_alias := state_data.get('member_alias'):
-        save_to_db = database.save_to_members
-        role = next(rl for rl in Role if rl.value == state_data['role'])
-        badge = bot_msg.__dict__[f'{role.name}_BADGE']
-        notify_msg_text = bot_msg.ADDED_TO_MEMBERS % (badge, member_alias, role.value.capitalize())
-        answer_msg_text = bot_msg.ACCESS_ALLOWED % role.value.capitalize()
-        sticker = bot_msg.STICKER_CONGRATULATION
+    if state_data.get('member_alias'):
+        save_to_db, status = database.save_to_members, 'accepted'
     else:
-        save_to_db = database.save_to_blacklist
-        notify_msg_text = bot_msg.ADDED_TO_BLACK_LIST % (state_data['tg_name'], state_data['phone'])
-        answer_msg_text = bot_msg.ACCESS_DENIED
-        sticker = bot_msg.STICKER_REGRET
+        save_to_db, status = database.save_to_blacklist, 'rejected'
 
-    await save_to_db(db, **state_data)
+    async with db.unit_of_work():
+        if is_decided := await database.close_application(db, state_data['application_id'], status):
+            await save_to_db(db, **state_data)
 
     await state.finish()
-    await state.storage.finish(user=state_data['tg_id'])
+    if is_decided:
+        await state.storage.finish(user=state_data['tg_id'])
+        await helpers.notify_application_results(call, state_data)
+    else:
+        logging.warning(f"Application #{state_data['application_id']} is already decided")
 
-    await call.message.answer(notify_msg_text, 'html')
-    await call.bot.send_message(state_data['tg_id'], answer_msg_text)
-    await call.bot.send_sticker(state_data['tg_id'], sticker)
+    await helpers.present_next_application(call.bot, state.storage, db)
 
 
 # ************************************************************************************************
@@ -387,6 +414,7 @@ async def finish_acceptance_to_membership(call: CallbackQuery, state: FSMContext
 async def rollback_to_menu_if_choosing_mistake(call: CallbackQuery, state: FSMContext):
     """
     This handler rolls back to a previous menu if any user decided that he made a mistake in the choice.
+    The menu is rebuilt from the latest rollback point in the state data.
 
     The handler is used for all states of a current user.
 
@@ -398,10 +426,11 @@ async def rollback_to_menu_if_choosing_mistake(call: CallbackQuery, state: FSMCo
     """
     await call.answer()
 
-    state_data = await state.get_data()
-    rollback_point = bytes.fromhex(state_data['rollback'])
-    message, set_state = pickle.loads(rollback_point)
+    if not (rollback_point := await rollback.pop_rollback_point(state)):
+        await call.message.delete_reply_markup()
+        return
 
+    message, set_state = rollback_point
     await call.message.edit_text(**message)
     await state.set_state(set_state)
 
@@ -445,15 +474,27 @@ def register_membership_handlers(dp: Dispatcher):
     )
     dp.register_callback_query_handler(
         provide_member_file_selection_menu,
+        MembershipMenuMarkup.application_callback.filter(decision='accepted'),
         FileSelectionMenuAccessFilter(),
         state=MembershipState.applicant_consideration,
-        text='accepted'
+        is_current_application=True
     )
     dp.register_callback_query_handler(
         confirm_membership_decision,
+        MembershipMenuMarkup.application_callback.filter(),
         state=[MembershipState.applicant_consideration,
                MembershipState.member_file_selection],
-        text=['accepted', 'rejected']
+        is_current_application=True
+    )
+    dp.register_callback_query_handler(
+        reject_outdated_application,
+        MembershipMenuMarkup.application_callback.filter(),
+        state='*'
+    )
+    dp.register_callback_query_handler(
+        turn_member_file_selection_page,
+        PaginatedInlineMarkup.page_callback.filter(menu=MembershipMenuMarkup.FILE_SELECTION_MENU),
+        state=MembershipState.member_file_selection
     )
     dp.register_callback_query_handler(
         confirm_choosing_in_member_file_selection_menu,
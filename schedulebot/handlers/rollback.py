@@ -0,0 +1,137 @@
+"""
+The module implements rollback points of menus for the BACK button.
+
+A rollback point is a small JSON-serializable list `[menu, params, state]`:
+an identifier of the menu, the parameters to render it again, and the FSM state to restore.
+Points are kept in the state data as a bounded stack, so several steps back are possible,
+and the menu markups are built from the keyboards only when the user goes back.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiogram.dispatcher import FSMContext
+from aiogram.dispatcher.filters.state import State
+
+from .. import messages as bot_msg
+from ..keyboards import MembershipMenuMarkup
+
+
+ROLLBACK_KEY = 'rollback'
+MAX_DEPTH = 5
+
+ROLE_SELECTION_MENU = 'role_selection'
+APPLICANT_CONSIDERATION_MENU = 'applicant_consideration'
+MEMBER_FILE_SELECTION_MENU = 'member_file_selection'
+MEMBERS_ALIAS_REQUEST_MENU = 'members_alias_request'
+
+
+def _role_selection(state_data: Dict) -> Dict:
+    return dict(text=bot_msg.ROLE_SELECTION, parse_mode='html',
+                reply_markup=MembershipMenuMarkup.member_role_selection())
+
+
+def _applicant_consideration(state_data: Dict, application_id: int, tg_name: str, role: str,
+                             is_files: bool, queued: int = 0) -> Dict:
+    text = bot_msg.MEMBERSHIP_REQUEST % (tg_name, role.capitalize())
+    if not is_files:
+        text += bot_msg.MISSING_FREE_FILES
+    if queued:
+        text += bot_msg.QUEUED_APPLICATIONS % queued
+    return dict(text=text, parse_mode='html',
+                reply_markup=MembershipMenuMarkup.applicant_consideration(application_id, is_files))
+
+
+def _member_file_selection(state_data: Dict) -> Dict:
+    markup = MembershipMenuMarkup.member_file_selection(state_data.get('free_files', []),
+                                                        state_data['application_id'])
+    return dict(text=bot_msg.MEMBER_FILE_SELECTION, parse_mode='html', reply_markup=markup)
+
+
+def _members_alias_request(state_data: Dict, member_name: str, role: str) -> Dict:
+    return dict(text=bot_msg.ASKING_MEMBERS_ALIAS % (member_name + ' ' + role.capitalize()), parse_mode='html')
+
+
+MENUS: Dict[str, Callable[..., Dict]] = {
+    ROLE_SELECTION_MENU: _role_selection,
+    APPLICANT_CONSIDERATION_MENU: _applicant_consideration,
+    MEMBER_FILE_SELECTION_MENU: _member_file_selection,
+    MEMBERS_ALIAS_REQUEST_MENU: _members_alias_request,
+}
+
+
+def render_menu(menu: str, state_data: Dict, *params) -> Dict:
+    """
+    Returns arguments of a message with the menu.
+
+    :param menu: The menu identifier.
+    :type menu: :obj:`str`.
+    :param state_data: Current state data, some menus are built from it (e.g. free files).
+    :type state_data: :obj:`typing.Dict`.
+    :param params: JSON-serializable parameters of the menu.
+    :return: Keyword arguments for `answer`, `send_message` or `edit_text`.
+    :rtype: :obj:`typing.Dict`
+    """
+    return MENUS[menu](state_data, *params)
+
+
+def push_rollback_point(state_data: Dict, menu: str, set_state: State, *params) -> Dict:
+    """
+    Pushes a rollback point to the stack in the state data (the oldest points are dropped).
+
+    :param state_data: State data to be saved, it's changed in place.
+    :type state_data: :obj:`typing.Dict`.
+    :param menu: The menu identifier.
+    :type menu: :obj:`str`.
+    :param set_state: The state set along with the menu.
+    :type set_state: :obj:`aiogram.dispatcher.filters.state.State`.
+    :param params: JSON-serializable parameters of the menu.
+    :return: The state data.
+    :rtype: :obj:`typing.Dict`
+    """
+    if menu not in MENUS:
+        raise KeyError(f"Unknown menu <{menu}>")
+    stack: List[list] = state_data.get(ROLLBACK_KEY) or []
+    stack.append([menu, list(params), set_state.state])
+    state_data[ROLLBACK_KEY] = stack[-MAX_DEPTH:]
+    return state_data
+
+
+async def save_rollback_point(state: FSMContext, menu: str, set_state: State, *params) -> None:
+    """
+    Pushes a rollback point to the stack in the FSM storage of the user.
+
+    :param state: Current state in the FSM of the user.
+    :type state: :obj:`aiogram.dispatcher.FSMContext`.
+    :param menu: The menu identifier.
+    :type menu: :obj:`str`.
+    :param set_state: The state set along with the menu.
+    :type set_state: :obj:`aiogram.dispatcher.filters.state.State`.
+    :param params: JSON-serializable parameters of the menu.
+    :return:
+    """
+    async with state.proxy() as data:
+        push_rollback_point(data, menu, set_state, *params)
+
+
+async def pop_rollback_point(state: FSMContext) -> Optional[Tuple[Dict, str]]:
+    """
+    Returns the menu and the state to roll back to.
+
+    The latest point is kept, so the user can return to it again from its sub-menus.
+    It's dropped only if the user is already in its state, then the previous point is used.
+
+    :param state: Current state in the FSM of the user.
+    :type state: :obj:`aiogram.dispatcher.FSMContext`.
+    :return: Arguments of the menu message and the state, or None if there is no rollback point.
+    :rtype: :obj:`typing.Optional[typing.Tuple[typing.Dict, str]]`
+    """
+    current_state = await state.get_state()
+    async with state.proxy() as data:
+        stack: List[list] = data.get(ROLLBACK_KEY) or []
+        if stack and stack[-1][2] == current_state and len(stack) > 1:
+            stack.pop()
+            data[ROLLBACK_KEY] = stack
+        if not stack:
+            return None
+        menu, params, set_state = stack[-1]
+        return render_menu(menu, data, *params), set_state
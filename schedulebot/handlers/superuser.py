@@ -2,19 +2,26 @@
 The module represents handlers for Superuser functionality.
 """
 
+import html
+import io
 import logging
+from typing import Dict, Tuple
 
 from aiogram import Dispatcher
-from asyncpg import Connection
-from aiogram.types import Message, CallbackQuery
+from aiogram.dispatcher.webhook import SendMessage
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, ContentType
+from aiogram.utils.exceptions import MessageNotModified
+from aiogram.utils.parts import MAX_MESSAGE_LENGTH
 
 from .. import messages as bot_msg
 from .. import database
-from ..config import Role
+from ..database import LazyConnection
+from ..config import Role, ROLE_BADGES, STAFF_IMPORT_MAX_SIZE
 from ..keyboards import ButtonText, ManagerMenuMarkup
+from ..models import StaffPage
 
 
-async def superuser_start_help(message: Message):
+async def superuser_start_help(message: Message) -> SendMessage:
     """
     This handler sends the first message to Superuser at the startup.
     Also sends this message when you enter commands: `/start` and `/help`.
@@ -23,34 +30,89 @@ async def superuser_start_help(message: Message):
 
     :param message: An incoming message with the `/start` or `/help` command from Superuser.
     :type message: :obj:`aiogram.types.Message`.
-    :return:
+    :return: The reply, in the webhook mode it is sent in the webhook response.
+    :rtype: :obj:`aiogram.dispatcher.webhook.SendMessage`
     """
     msg_txt = bot_msg.SUPERUSER_START_HELP % message.from_user.full_name
-    await message.answer(msg_txt, 'html', reply_markup=ManagerMenuMarkup.main())
+    return SendMessage(message.chat.id, msg_txt, 'html', reply_markup=ManagerMenuMarkup.main())
 
 
-async def provide_staff(message: Message, db: Connection):
+def render_staff_page(page: StaffPage) -> Tuple[str, InlineKeyboardMarkup]:
     """
-    This handler sends a message containing the list of staffs, and STAFF MENU.
+    Renders a page of the staff list and the STAFF MENU with the page navigation.
+
+    Rows that don't fit into a single Telegram message are moved to the next page.
+
+    :param page: A page of the staff list.
+    :type page: :obj:`schedulebot.models.StaffPage`.
+    :return: The message text and its markup.
+    :rtype: :obj:`typing.Tuple[str, aiogram.types.InlineKeyboardMarkup]`
+    """
+    if not page.staff:
+        return bot_msg.NO_STAFF_YET, ManagerMenuMarkup.staff()
+
+    rows = [bot_msg.STAFF_LIST_HEADER]
+    length = len(bot_msg.STAFF_LIST_HEADER)
+    shown = []
+    for staff in page.staff:
+        no_file = bot_msg.NO_FILE if staff.role == Role.EMPLOYEE.value and not staff.file_id else ''
+        row = bot_msg.STAFF_LIST_ROW % (ROLE_BADGES.get(staff.role, ''), html.escape(staff.member_alias), no_file)
+        if length + len(row) > MAX_MESSAGE_LENGTH:
+            break
+        rows.append(row)
+        length += len(row)
+        shown.append(staff)
+
+    has_next = page.has_next or len(shown) < len(page.staff)
+    markup = ManagerMenuMarkup.staff(shown[0].tg_id if page.has_previous else None,
+                                     shown[-1].tg_id if has_next else None)
+    return ''.join(rows), markup
+
+
+async def provide_staff(message: Message, db: LazyConnection) -> SendMessage:
+    """
+    This handler sends a message containing the first page of the staff list, and STAFF MENU.
 
     :param message: An incoming message with the text=ButtonText.STAFF.value.
     :type message: :obj:`aiogram.types.Message`.
-    :param db: A database session with an established connection to the PostgreSQL server.
-    :type db: :obj:`asyncpg.Connection`.
+    :param db: A lazy database session, a connection is acquired on the first query.
+    :type db: :obj:`schedulebot.database.LazyConnection`.
+    :return: The reply, in the webhook mode it is sent in the webhook response.
+    :rtype: :obj:`aiogram.dispatcher.webhook.SendMessage`
+    """
+    page = await database.get_staff_page(db)
+    await db.release()
+
+    msg_text, markup = render_staff_page(page)
+    return SendMessage(message.chat.id, msg_text, 'html', reply_markup=markup)
+
+
+async def turn_staff_page(call: CallbackQuery, db: LazyConnection, callback_data: Dict):
+    """
+    This handler replaces the staff list with the previous or the next page.
+
+    :param call: An incoming callback query from the navigation buttons of the STAFF MENU.
+    :type call: :obj:`aiogram.types.CallbackQuery`.
+    :param db: A lazy database session, a connection is acquired on the first query.
+    :type db: :obj:`schedulebot.database.LazyConnection`.
+    :param callback_data: Parsed callback data containing the `direction` and the `cursor` member.
+    :type callback_data: :obj:`typing.Dict`.
     :return:
     """
-    if staff_info := await database.get_basic_staff_info(db):
-        msg_text = bot_msg.STAFF_LIST_HEADER
-        staff_lst = sorted(staff_info, key=lambda stf: stf.role)
-        for staff in staff_lst:
-            role = next(rl for rl in Role if rl.value == staff.role)
-            badge = bot_msg.__dict__[f'{role.name}_BADGE']
-            no_file = bot_msg.NO_FILE if staff.role == Role.EMPLOYEE.value and not staff.file_id else ''
-            msg_text += bot_msg.STAFF_LIST_ROW % (badge, staff.member_alias, no_file)
-    else:
-        msg_text = bot_msg.NO_STAFF_YET
+    await call.answer()
+
+    page = await database.get_staff_page(db, cursor=int(callback_data['cursor']),
+                                         backward=callback_data['direction'] == 'prev')
+    if not page.staff:
+        # The cursor member has been removed meanwhile
+        page = await database.get_staff_page(db)
+    await db.release()
 
-    await message.answer(msg_text, 'html', reply_markup=ManagerMenuMarkup.staff())
+    msg_text, markup = render_staff_page(page)
+    try:
+        await call.message.edit_text(msg_text, 'html', reply_markup=markup)
+    except MessageNotModified:
+        pass
 
 
 async def invite_member(call: CallbackQuery):
@@ -69,6 +131,36 @@ async def invite_member(call: CallbackQuery):
     await call.message.answer(bot_msg.INVITE % promo_code, 'html')
 
 
+async def import_staff(message: Message, db: LazyConnection) -> SendMessage:
+    """
+    This handler imports staff from a CSV document sent by Superuser.
+    The document is validated as a whole, so either all members are added or none.
+
+    The columns of the document: `tg_id`, `member_alias`, `role`, and optional `phone`, `file_id`.
+
+    :param message: An incoming message with the CSV document.
+    :type message: :obj:`aiogram.types.Message`.
+    :param db: A lazy database session, a connection is acquired on the first query.
+    :type db: :obj:`schedulebot.database.LazyConnection`.
+    :return: The reply, in the webhook mode it is sent in the webhook response.
+    :rtype: :obj:`aiogram.dispatcher.webhook.SendMessage`
+    """
+    if message.document.file_size and message.document.file_size > STAFF_IMPORT_MAX_SIZE:
+        return SendMessage(message.chat.id, bot_msg.STAFF_IMPORT_TOO_LARGE, 'html')
+
+    content: io.BytesIO = await message.document.download(destination_file=io.BytesIO())
+    try:
+        imported = await database.import_staff_csv(db, content.getvalue().decode('utf-8-sig'))
+    except (database.StaffImportError, UnicodeDecodeError) as error:
+        # A long list of errors is cut to fit the message
+        errors = html.escape(str(error)[:MAX_MESSAGE_LENGTH // 2])
+        return SendMessage(message.chat.id, bot_msg.STAFF_IMPORT_FAILED % errors, 'html')
+    finally:
+        await db.release()
+
+    return SendMessage(message.chat.id, bot_msg.STAFF_IMPORTED % imported, 'html')
+
+
 # ************************************************************************************************
 #                 ^^^ REGISTRATION OF ALL HANDLERS THAT EXPLAINED ABOVE ^^^
 # ************************************************************************************************
@@ -93,9 +185,19 @@ def register_superuser_handlers(dp: Dispatcher):
         is_superuser=True,
         text=ButtonText.STAFF.value
     )
+    dp.register_callback_query_handler(
+        turn_staff_page,
+        ManagerMenuMarkup.staff_page_callback.filter(),
+        is_superuser=True
+    )
     dp.register_callback_query_handler(
         invite_member,
         is_superuser=True,
         text='invite'
     )
+    dp.register_message_handler(
+        import_staff,
+        is_superuser=True,
+        content_types=ContentType.DOCUMENT
+    )
     logging.info("Registration of Superuser handlers is completed.")
@@ -3,5 +3,6 @@ The package represents custom keyboard menus.
 """
 
 from .keyboards import MembershipMenuMarkup, ButtonText, ManagerMenuMarkup
+from .kbmaker import PaginatedInlineMarkup
 
-__all__ = ['MembershipMenuMarkup', 'ButtonText', 'ManagerMenuMarkup']
+__all__ = ['MembershipMenuMarkup', 'ButtonText', 'ManagerMenuMarkup', 'PaginatedInlineMarkup']
@@ -1,5 +1,7 @@
+import functools
+import math
 from abc import ABC, abstractmethod
-from typing import List, Dict, Union, Type, Tuple
+from typing import List, Dict, Union, Type, Tuple, Callable, Optional
 
 from aiogram.utils.callback_data import CallbackData
 from aiogram.types import (InlineKeyboardButton,
@@ -14,6 +16,92 @@ class InheritanceCreateMarkupError(Exception):
     pass
 
 
+class FrozenMarkupError(TypeError):
+    pass
+
+
+class _FrozenMarkupMixin:
+    """
+    Makes a keyboard markup immutable and caches its serialized form for the Bot API,
+    so a shared markup is never rebuilt or serialized again.
+    """
+    _frozen = False
+
+    def freeze(self):
+        self._python = super().to_python()
+        self._json = super().as_json()
+        self._frozen = True
+        return self
+
+    def to_python(self) -> Dict:
+        if self._frozen:
+            return self._python
+        return super().to_python()
+
+    def as_json(self) -> str:
+        if self._frozen:
+            return self._json
+        return super().as_json()
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise FrozenMarkupError(f"The markup is frozen, <{name}> can't be changed")
+        super().__setattr__(name, value)
+
+    def add(self, *args):
+        raise FrozenMarkupError("The markup is frozen, buttons can't be added")
+
+    row = insert = add
+
+
+class FrozenInlineKeyboardMarkup(_FrozenMarkupMixin, InlineKeyboardMarkup):
+    pass
+
+
+class FrozenReplyKeyboardMarkup(_FrozenMarkupMixin, ReplyKeyboardMarkup):
+    pass
+
+
+def freeze(markup: Union[InlineKeyboardMarkup, ReplyKeyboardMarkup]
+           ) -> Union[FrozenInlineKeyboardMarkup, FrozenReplyKeyboardMarkup]:
+    """
+    Returns an immutable copy of the keyboard markup.
+
+    :param markup: A keyboard markup.
+    :type markup: :obj:`typing.Union[aiogram.types.InlineKeyboardMarkup, aiogram.types.ReplyKeyboardMarkup]`.
+    :return: The frozen markup.
+    """
+    frozen_class = FrozenInlineKeyboardMarkup \
+        if isinstance(markup, InlineKeyboardMarkup) else FrozenReplyKeyboardMarkup
+    frozen = frozen_class(**markup.values)
+    frozen.row_width = markup.row_width
+    return frozen.freeze()
+
+
+def memoized_markup(maxsize: Optional[int] = 128) -> Callable:
+    """
+    Decorates a function building a markup from hashable arguments.
+    The markup is built, validated, and frozen once per arguments, the results are kept in an LRU cache.
+
+    :param maxsize: The maximum quantity of cached markups, if None the cache is unbounded.
+    :type maxsize: :obj:`typing.Optional[int]`.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.lru_cache(maxsize=maxsize)
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return freeze(func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def static_markup(func: Callable) -> Callable:
+    """
+    Decorates a function building a constant markup, it is built on the first call only.
+    """
+    return memoized_markup(maxsize=None)(func)
+
+
 class CreateMarkup(ABC):
     __Buttons = List[Union[InlineKeyboardButton, KeyboardButton]]
     __Buttons_list = List[List[Union[InlineKeyboardButton, KeyboardButton]]]
@@ -38,10 +126,10 @@ class CreateMarkup(ABC):
         if sum(self.schema) != len(buttons):
             raise ValueError("The quantity of buttons doesn't match the schema")
         markup = []
-        for btn in self.schema:
-            markup.append([])
-            for _ in range(btn):
-                markup[-1].append(buttons.pop(0))
+        start = 0
+        for row_size in self.schema:
+            markup.append(buttons[start:start + row_size])
+            start += row_size
         return markup
 
     @classmethod
@@ -113,6 +201,57 @@ class InlineMarkup(CreateMarkup):
                                f'{available_keys}')
 
 
+class PaginatedInlineMarkup(InlineMarkup):
+    """
+    This object represents an inline markup showing one page of buttons (a button per row)
+    with the navigation row [ ◀️ ] [ N/M ] [ ▶️ ] and optional buttons under it.
+
+    Navigation buttons generate `page_callback` data with the menu name and the page number,
+    the buttons of all pages are kept by the caller (e.g. in the FSM storage).
+    Only the buttons of the current page are validated and created.
+    """
+    page_callback = CallbackData('page', 'menu', 'number')
+
+    PAGE_SIZE = 10
+    # Telegram rejects inline keyboards with more than 100 buttons
+    MAX_BUTTONS = 100
+    PREVIOUS_TEXT = '◀️'
+    NEXT_TEXT = '▶️'
+    COUNTER_TEXT = '%s / %s'
+
+    def __init__(self, data_buttons: List[Dict], *,
+                 menu: str,
+                 page: int = 0,
+                 page_size: int = PAGE_SIZE,
+                 extra_buttons: List[Dict] = ()):
+        self.menu = menu
+        self.pages = max(1, math.ceil(len(data_buttons) / page_size))
+        self.page = min(max(page, 0), self.pages - 1)
+
+        start = self.page * page_size
+        page_buttons = data_buttons[start:start + page_size]
+        navigation = self._navigation() if self.pages > 1 else []
+        buttons = page_buttons + navigation + list(extra_buttons)
+        if len(buttons) > self.MAX_BUTTONS:
+            raise ValueError(f"An inline keyboard can't contain more than {self.MAX_BUTTONS} buttons")
+
+        schema = [1] * len(page_buttons) + ([len(navigation)] if navigation else []) + [1] * len(extra_buttons)
+        super().__init__(buttons, schema)
+
+    def _navigation(self) -> List[Dict]:
+        callback = self.page_callback
+        navigation = []
+        if self.page > 0:
+            navigation.append(dict(text=self.PREVIOUS_TEXT,
+                                   callback_data=callback.new(menu=self.menu, number=self.page - 1)))
+        navigation.append(dict(text=self.COUNTER_TEXT % (self.page + 1, self.pages),
+                               callback_data=callback.new(menu=self.menu, number=self.page)))
+        if self.page < self.pages - 1:
+            navigation.append(dict(text=self.NEXT_TEXT,
+                                   callback_data=callback.new(menu=self.menu, number=self.page + 1)))
+        return navigation
+
+
 class DefaultMarkup(CreateMarkup):
     __Buttons = List[Union[str, Dict[str, Union[str, bool, KeyboardButtonPollType]]]]
 
@@ -158,9 +297,8 @@ class DefaultMarkup(CreateMarkup):
 
     @classmethod
     def _check_input_data(cls, data_buttons: __Buttons) -> __Buttons:
-        for button in data_buttons:
+        for index, button in enumerate(data_buttons):
             if isinstance(button, str):
-                index = data_buttons.index(button)
                 data_buttons[index] = {'text': button}
                 continue
             if len(button) > 1:
@@ -3,10 +3,12 @@ The module represents custom keyboard menus.
 """
 
 from enum import Enum, unique
+from typing import Optional
 
 from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.utils.callback_data import CallbackData
 
-from .kbmaker import InlineMarkup, DefaultMarkup
+from .kbmaker import InlineMarkup, DefaultMarkup, PaginatedInlineMarkup, static_markup, memoized_markup
 from ..config import Role
 from .. import messages as bot_msg
 
@@ -37,12 +39,15 @@ class MembershipMenuMarkup:
     This object represents a set of custom keyboard markups for membership handlers.
 
     Each method implements a themed menu.
+    Constant menus are built once, and menus with parameters are memoized;
+    the returned markups are frozen and must not be changed.
     """
-    BTN_ACCEPT_WITHOUT_FILE = dict(text=ButtonText.ACCEPT_WITHOUT_FILE.value,
-                                   callback_data='accepted')
-    BTN_REJECT = dict(text=ButtonText.REJECT.value, callback_data='rejected')
+    # Decisions on an application carry its ID, so buttons of decided applications are recognized
+    application_callback = CallbackData('application', 'decision', 'id')
+    FILE_SELECTION_MENU = 'files'
 
     @classmethod
+    @memoized_markup(maxsize=256)
     def confirmation(cls, param='') -> InlineKeyboardMarkup:
         """
         CONFIRMATION MENU
@@ -62,6 +67,7 @@ class MembershipMenuMarkup:
         return InlineMarkup(buttons, schema).create()
 
     @staticmethod
+    @static_markup
     def member_role_selection() -> InlineKeyboardMarkup:
         """
         MEMBER ROLE SELECTION MENU
@@ -78,39 +84,62 @@ class MembershipMenuMarkup:
         return InlineMarkup(buttons, schema).create()
 
     @classmethod
-    def applicant_consideration(cls, is_files: bool = True) -> InlineKeyboardMarkup:
+    def decision_buttons(cls, application_id: int, is_files: bool = False) -> list[dict]:
+        """
+        Returns the ACCEPT (or ACCEPT_WITHOUT_FILE) and REJECT buttons of the application.
+
+        :param application_id: The application ID.
+        :type application_id: :obj:`base.Integer`.
+        :param is_files: If false, the ACCEPT button is replaced with ACCEPT_WITHOUT_FILE.
+        :type is_files: :obj:`base.Boolean`
+        :return: :obj:`base.List[base.Dict]`.
+        """
+        accept_text = ButtonText.ACCEPT.value if is_files else ButtonText.ACCEPT_WITHOUT_FILE.value
+        return [dict(text=accept_text,
+                     callback_data=cls.application_callback.new(decision='accepted', id=application_id)),
+                dict(text=ButtonText.REJECT.value,
+                     callback_data=cls.application_callback.new(decision='rejected', id=application_id))]
+
+    @classmethod
+    @memoized_markup(maxsize=256)
+    def applicant_consideration(cls, application_id: int, is_files: bool = True) -> InlineKeyboardMarkup:
         """
         APPLICANT CONSIDERATION MENU
 
         The inline keyboard markup consists of callback buttons:
-            * [ ACCEPT ] — generates callback_data='accepted',
-            * [ REJECT ] — generates callback_data='rejected'.
+            * [ ACCEPT ] — generates callback_data='application:accepted:{application_id}',
+            * [ REJECT ] — generates callback_data='application:rejected:{application_id}'.
 
+        :param application_id: The application ID.
+        :type application_id: :obj:`base.Integer`.
         :param is_files: Defaults to false, in which case the text ACCEPT button
             will be replaced with ACCEPT_WITHOUT_FILE.
         :type is_files: :obj:`base.Boolean`
         :return: :obj:`aiogram.types.InlineKeyboardMarkup`.
         """
-        btn_accept = cls.BTN_ACCEPT_WITHOUT_FILE.copy()
-        if is_files:
-            btn_accept['text'] = ButtonText.ACCEPT.value
-        buttons = [btn_accept, cls.BTN_REJECT]
+        buttons = cls.decision_buttons(application_id, is_files)
         schema = [1, 1]
         return InlineMarkup(buttons, schema).create()
 
     @classmethod
-    def member_file_selection(cls, files: list[dict]) -> InlineKeyboardMarkup:
+    def member_file_selection(cls, files: list[dict], application_id: int, page: int = 0) -> InlineKeyboardMarkup:
         """
         MEMBER FILE SELECTION MENU
 
         The inline keyboard markup consists of callback buttons:
             * [     FILENAME 1      ] — generates callback_data='some_google_file_id',
-            * [     FILENAME n      ] — n is an amount passed files,
-            * [ ACCEPT_WITHOUT_FILE ] — generates callback_data='accepted',
-            * [        REJECT       ] — generates callback_data='rejected'.
+            * [     FILENAME n      ] — n is an amount of files on the page,
+            * [ ◀️ ] [ N/M ] [ ▶️ ] — generates callback_data='page:files:{number}',
+              only if the files don't fit on a single page,
+            * [ ACCEPT_WITHOUT_FILE ] — generates callback_data='application:accepted:{application_id}',
+            * [        REJECT       ] — generates callback_data='application:rejected:{application_id}'.
 
         :param files: List of dicts containing data about Document files.
         :type files: :obj:`base.List[base.Dict]`.
+        :param application_id: The application ID.
+        :type application_id: :obj:`base.Integer`.
+        :param page: The page number, starting from 0.
+        :type page: :obj:`base.Integer`.
         :return: :obj:`aiogram.types.InlineKeyboardMarkup`.
         """
         buttons = []
@@ -120,11 +149,13 @@ class MembershipMenuMarkup:
                     "Incoming Document file data must contain keys: 'id' and 'name'")
             buttons.append(dict(text=ButtonText.FILENAME.value % file['name'],
                                 callback_data=file['id']))
-        buttons.extend([cls.BTN_ACCEPT_WITHOUT_FILE, cls.BTN_REJECT])
-        schema = [1 for _ in files] + [1, 1]
-        return InlineMarkup(buttons, schema).create()
+        return PaginatedInlineMarkup(buttons,
+                                     menu=cls.FILE_SELECTION_MENU,
+                                     page=page,
+                                     extra_buttons=cls.decision_buttons(application_id)).create()
 
     @staticmethod
+    @static_markup
     def send_contact() -> ReplyKeyboardMarkup:
         """
         CONTACT MENU
@@ -142,9 +173,12 @@ class ManagerMenuMarkup:
     """
     This object represents a set of custom keyboard markups for manager handlers.
 
-    Each method implements a themed menu.
+    Each method implements a themed menu, the markups are built once and frozen.
     """
+    staff_page_callback = CallbackData('staff', 'direction', 'cursor')
+
     @staticmethod
+    @static_markup
     def main() -> ReplyKeyboardMarkup:
         """
         MAIN MANAGER MENU
@@ -160,24 +194,41 @@ class ManagerMenuMarkup:
         schema = [2]
         return DefaultMarkup(buttons, schema).create()
 
-    @staticmethod
-    def staff() -> InlineKeyboardMarkup:
+    @classmethod
+    @memoized_markup(maxsize=256)
+    def staff(cls, previous_cursor: Optional[int] = None, next_cursor: Optional[int] = None) -> InlineKeyboardMarkup:
         """
         STAFF MENU
 
         The inline keyboard markup consists of callback buttons:
+            * [ ◀️ ] [ ▶️ ] — generates callback_data='staff:prev:{tg_id}' and 'staff:next:{tg_id}',
+              only if there are previous or next pages of the staff list,
             * [ INVITE ] — generates callback_data='invite',
             * [ UPDATE ] — generates callback_data='update'.
             * [ REMOVE ] — generates callback_data='remove'.
             * [ CLOSE  ] — generates callback_data='close'.
 
+        :param previous_cursor: Telegram ID of the first member on the page, if there is a previous page.
+        :type previous_cursor: :obj:`typing.Optional[int]`.
+        :param next_cursor: Telegram ID of the last member on the page, if there is a next page.
+        :type next_cursor: :obj:`typing.Optional[int]`.
         :return: :obj:`aiogram.types.InlineKeyboardMarkup`.
         """
+        navigation = []
+        if previous_cursor is not None:
+            navigation.append(dict(text=PaginatedInlineMarkup.PREVIOUS_TEXT,
+                                   callback_data=cls.staff_page_callback.new(direction='prev',
+                                                                             cursor=previous_cursor)))
+        if next_cursor is not None:
+            navigation.append(dict(text=PaginatedInlineMarkup.NEXT_TEXT,
+                                   callback_data=cls.staff_page_callback.new(direction='next',
+                                                                             cursor=next_cursor)))
+
         invite_btn = dict(text=ButtonText.INVITE.value, callback_data='invite')
         update_btn = dict(text=ButtonText.UPDATE.value, callback_data='update')
         remove_btn = dict(text=ButtonText.REJECT.value, callback_data='remove')
         close_btn = dict(text=ButtonText.CLOSE.value, callback_data='close')
 
-        buttons = [invite_btn, update_btn, remove_btn, close_btn]
-        schema = [1, 1, 1, 1]
+        buttons = navigation + [invite_btn, update_btn, remove_btn, close_btn]
+        schema = ([len(navigation)] if navigation else []) + [1, 1, 1, 1]
         return InlineMarkup(buttons, schema).create()
@@ -56,6 +56,17 @@ MEMBERSHIP_REQUEST = f'''
 👆 👆 👆 <b>%s</b>
 надсилає запит на приєднання до категорії <b>%s</b>.
 '''
+QUEUED_APPLICATIONS = '''
+📥 <i>Ще заявок у черзі: %s</i>
+'''
+APPLICATION_OUTDATED = 'Цю заявку вже розглянуто'
+APPLICATION_FAILED = '''
+Не вдалося передати твій контакт на перевірку, можливо, повідомлення з ним видалено.
+Надішли /start, щоб подати заявку ще раз.
+'''
+ALREADY_APPLIED = '''
+Твоя заявка вже на розгляді, чекай на відповідь...
+'''
 MISSING_FREE_FILES = '''
 <i>Але в Google папці відсутній файл з графіком його роботи!
 Ти можеш надати доступ зараз, а файл створити пізніше.</i>
@@ -121,6 +132,16 @@ SUPERUSER_START_HELP = '''
 STAFF_LIST_HEADER = f"{STAFF_BADGE} <i>{STAFF}, зареєстрований в боті:</i> \n\n"
 STAFF_LIST_ROW = '%s  <b>%s</b> %s \n'
 NO_FILE = '❗[без файлу]'
+STAFF_IMPORTED = '''
+✅ До персоналу додано: <b>%s</b>
+'''
+STAFF_IMPORT_FAILED = '''
+⚠️ Персонал не імпортовано, виправ файл і надішли знову:
+<code>%s</code>
+'''
+STAFF_IMPORT_TOO_LARGE = '''
+⚠️ Файл завеликий для імпорту персоналу
+'''
 NO_STAFF_YET = '''
 Персоналу ще немає 🤷‍♂️️
 Саме час когось запросити!
@@ -136,3 +157,46 @@ INVITE = '''
 Тисни сюди 👉🏻 @MyWorkScheduleBot та приєднуйся!
 Твій промокод: %s   
 '''
+
+# ************************************************************************************************
+#                                   THE DEBUG MESSAGES
+# ************************************************************************************************
+PROFILER_STATUS = '''
+🩺 Профайлер: %s
+Частка профільованих оновлень: <b>%s</b>
+Повільні оновлення, секунд: <b>%s</b>
+Записано звітів: <b>%s</b>
+Тека звітів: <code>%s</code>
+'''
+PROFILER_USAGE = '''
+⚠️ Використання:
+<code>/profile</code> — стан
+<code>/profile on</code> | <code>/profile off</code>
+<code>/profile rate 0.01</code> — частка від 0 до 1
+<code>/profile threshold 2</code> — секунд, 0 вимикає
+'''
+
+# ************************************************************************************************
+#                                   THE SCHEDULE MESSAGES
+# ************************************************************************************************
+SCHEDULE_CHANGED = '''
+🔔 <b>%s</b>, твій розклад змінено:
+
+%s
+'''
+SCHEDULE_ADDED_ROW = '➕ %s'
+SCHEDULE_REMOVED_ROW = '➖ <s>%s</s>'
+SCHEDULE_MOVED_ROW = '🔁 <s>%s</s> → %s'
+SCHEDULE_PERIOD = '''
+🗓 <b>%s</b>:
+
+%s
+'''
+SCHEDULE_TODAY = 'Сьогодні'
+SCHEDULE_TOMORROW = 'Завтра'
+SCHEDULE_THIS_WEEK = 'Цей тиждень'
+SCHEDULE_NEXT_WEEK = 'Наступний тиждень'
+SCHEDULE_EMPTY = 'Записів немає 🌴'
+NO_SCHEDULE_DOCUMENT = '''
+🤷 За тобою не закріплено документ з розкладом, звернись до адміністратора.
+'''
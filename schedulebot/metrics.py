@@ -0,0 +1,290 @@
+"""
+The module metrics:
+Collects counters, gauges and latency histograms of the bot in memory
+and exposes them in the Prometheus text format on a local HTTP endpoint.
+"""
+
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from aiogram import Bot
+from aiohttp import web
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    This object represents a named metric with a fixed set of labels.
+    Values of a label set are created on the first use.
+    """
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 registry: Optional['Registry'] = None):
+        """
+        :param name: The metric name, e.g. `schedulebot_updates_total`.
+        :type name: :obj:`str`.
+        :param documentation: The help text.
+        :type documentation: :obj:`str`.
+        :param labels: Names of the labels.
+        :type labels: :obj:`typing.Sequence[str]`.
+        :param registry: The registry to expose the metric, the default registry if None.
+        :type registry: :obj:`typing.Optional[schedulebot.metrics.Registry]`.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"The metric <{self.name}> expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """
+        Yields samples `(name, label names, label values, value)` of the metric.
+        """
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for name, labelnames, labelvalues, value in self.samples():
+            lines.append(f'{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    """
+    This object represents a monotonically increasing counter.
+    """
+    type = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, self.labelnames, key, value
+
+
+class Gauge(Metric):
+    """
+    This object represents a value that goes up and down.
+
+    An unlabelled gauge may read its value by a function on every collection,
+    e.g. the size of a connection pool.
+    """
+    type = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Optional[float]]] = None
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Optional[Callable[[], Optional[float]]]) -> None:
+        """
+        Sets a function returning the current value (None to skip the sample).
+
+        :param function: A function without arguments or None to reset.
+        :type function: :obj:`typing.Optional[typing.Callable]`.
+        :return:
+        """
+        if self.labelnames:
+            raise ValueError(f"The labelled gauge <{self.name}> can't read its value by a function")
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                logging.exception(f"The gauge <{self.name}> isn't collected")
+                value = None
+            if value is not None:
+                yield self.name, (), (), value
+            return
+        for key, value in self._values.items():
+            yield self.name, self.labelnames, key, value
+
+
+class Histogram(Metric):
+    """
+    This object represents a histogram of observed values (e.g. latencies in seconds)
+    with cumulative buckets, as Prometheus expects them.
+    """
+    type = 'histogram'
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [counts of the buckets (not cumulative) + the +Inf bucket, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        if (entry := self._values.get(key)) is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observes the time spent in the enclosed block.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        names = self.labelnames + ('le',)
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', names, key + (_format_value(bound),), cumulative
+            yield f'{self.name}_sum', self.labelnames, key, total
+            yield f'{self.name}_count', self.labelnames, key, cumulative
+
+
+class Registry:
+    """
+    This object represents a set of metrics exposed together.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise KeyError(f"The metric <{metric.name}> is already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+
+        :return: The metrics text.
+        :rtype: :obj:`str`
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+UPDATES_DROPPED = Counter('schedulebot_updates_dropped_total',
+                          'Updates dropped before the handlers.', ['reason'])
+HANDLER_LATENCY = Histogram('schedulebot_handler_seconds',
+                            'Processing time of updates by the handler.', ['event', 'handler'])
+STATE_LATENCY = Histogram('schedulebot_state_seconds',
+                          'Processing time of updates by the FSM state of the user.', ['state'])
+DB_ACQUIRE_WAIT = Histogram('schedulebot_db_acquire_seconds',
+                            'Time spent waiting for a connection of the pool.')
+DB_QUERIES = Counter('schedulebot_db_queries_total', 'Queries sent to the database.')
+DB_POOL_SIZE = Gauge('schedulebot_db_pool_size', 'Open connections of the pool.')
+DB_POOL_IN_USE = Gauge('schedulebot_db_pool_in_use', 'Connections of the pool acquired at the moment.')
+DRIVE_LATENCY = Histogram('schedulebot_drive_request_seconds',
+                          'Latency of Google Drive API requests.', ['operation'])
+DRIVE_ERRORS = Counter('schedulebot_drive_errors_total',
+                       'Failed Google Drive API requests.', ['operation'])
+BOT_API_LATENCY = Histogram('schedulebot_bot_api_seconds',
+                            'Latency of outbound Telegram Bot API requests.', ['method'])
+BOT_API_ERRORS = Counter('schedulebot_bot_api_errors_total',
+                         'Failed Telegram Bot API requests.', ['method'])
+BROADCAST_QUEUE_DEPTH = Gauge('schedulebot_broadcast_queue_depth', 'Messages waiting in the broadcaster.')
+
+
+class InstrumentedBot(Bot):
+    """
+    This object represents a bot that records the latency and errors of every Bot API request.
+    """
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().request(method, data, files, **kwargs)
+        except Exception:
+            BOT_API_ERRORS.inc(method=method)
+            raise
+        finally:
+            BOT_API_LATENCY.observe(time.perf_counter() - started, method=method)
+
+
+async def start_server(host: str, port: int, registry: Optional[Registry] = None) -> web.AppRunner:
+    """
+    Starts the HTTP endpoint `/metrics` for Prometheus.
+
+    :param host: The interface to listen on, keep it local.
+    :type host: :obj:`str`.
+    :param port: The port to listen on.
+    :type port: :obj:`int`.
+    :param registry: The registry to expose, the default registry if None.
+    :type registry: :obj:`typing.Optional[schedulebot.metrics.Registry]`.
+    :return: The runner of the server, to be cleaned up on shutdown.
+    :rtype: :obj:`aiohttp.web.AppRunner`
+    """
+    registry = registry or REGISTRY
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(body=registry.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Metrics are served on http://{host}:{port}/metrics")
+    return runner
@@ -3,8 +3,15 @@ from aiogram import Dispatcher
 from aiogram.contrib.middlewares.environment import EnvironmentMiddleware
 from aiogram.contrib.middlewares.logging import LoggingMiddleware
 
+from ..config import PROFILER_ENABLED, PROFILER_SAMPLE_RATE, PROFILER_SLOW_THRESHOLD, \
+    PROFILER_DUMP_DIR, PROFILER_MAX_DUMPS
+
 # from .data import DataMiddleware
+from .blacklist import BlacklistMiddleware, reload_blacklist
+from .classifier import UpdateClassifierMiddleware
 from .db import DatabaseMiddleware
+from .metrics import MetricsMiddleware
+from .profiler import ProfilerMiddleware
 from .role import RoleMiddleware
 from .test_middleware import TestMiddleware
 
@@ -13,6 +20,20 @@ def setup(dp: Dispatcher, pool: asyncpg.pool.Pool, config: dict = None):
     environment_data = {
         "config": config,
     }
+    # Banned users are dropped before anything else
+    dp.setup_middleware(BlacklistMiddleware())
+    # Updates no handler will use are dropped before the database middlewares
+    dp.setup_middleware(UpdateClassifierMiddleware())
+    # Latency includes waiting for a database connection and the role lookup
+    dp.setup_middleware(MetricsMiddleware())
+    # The superuser toggles the profiler by `/profile`
+    profiler = ProfilerMiddleware(PROFILER_DUMP_DIR,
+                                  enabled=PROFILER_ENABLED,
+                                  sample_rate=PROFILER_SAMPLE_RATE,
+                                  slow_threshold=PROFILER_SLOW_THRESHOLD,
+                                  max_dumps=PROFILER_MAX_DUMPS)
+    dp.setup_middleware(profiler)
+    dp['profiler'] = profiler
     # dp.setup_middleware(LoggingMiddleware())
     # dp.setup_middleware(EnvironmentMiddleware(context=environment_data))
     dp.setup_middleware(DatabaseMiddleware(pool))
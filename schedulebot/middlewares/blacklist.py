@@ -0,0 +1,46 @@
+import asyncio
+import logging
+
+import asyncpg
+from aiogram.dispatcher.handler import CancelHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.types import Update
+
+from .. import database, metrics
+from ..pipeline import update_user_id
+
+
+class BlacklistMiddleware(BaseMiddleware):
+    """
+    Drops updates of blacklisted users before any other middleware,
+    so they don't take a database connection.
+
+    The check is a lookup in the in-memory blacklist, it must be set up as the first middleware.
+    """
+
+    async def on_pre_process_update(self, update: Update, data: dict):
+        if (user_id := update_user_id(update)) in database.blacklist_cache:
+            database.blacklist_cache.rejected += 1
+            metrics.UPDATES_DROPPED.inc(reason='blacklist')
+            logging.debug(f"The update of the blacklisted user <{user_id}> is dropped")
+            raise CancelHandler()
+
+
+async def reload_blacklist(pool: asyncpg.pool.Pool, interval: float) -> None:
+    """
+    Reloads the in-memory blacklist from the database every `interval` seconds.
+
+    :param pool: A database connection pool.
+    :type pool: :obj:`asyncpg.pool.Pool`.
+    :param interval: Seconds between reloads.
+    :type interval: :obj:`float`.
+    :return:
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with pool.acquire() as db_conn:
+                await database.load_blacklist(db_conn)
+        except Exception:
+            # The reloader keeps running, whatever broke this reload
+            logging.exception("The blacklist isn't reloaded")
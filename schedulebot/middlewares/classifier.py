@@ -0,0 +1,132 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.dispatcher.filters import Command, ContentTypeFilter, Regexp, StateFilter, Text
+from aiogram.dispatcher.filters.filters import FilterObj, execute_filter
+from aiogram.dispatcher.handler import CancelHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.types import CallbackQuery, ContentType, Message, Update
+from aiogram.utils.callback_data import CallbackDataFilter
+
+from .. import metrics
+from ..filters import RoleFilter, SuperuserFilter
+
+
+# Filters that check only the update itself (and the FSM state), so they may be checked before the middlewares
+STATIC_FILTERS = (StateFilter, ContentTypeFilter, Command, Text, Regexp, CallbackDataFilter)
+ROLE_FILTERS = (RoleFilter, SuperuserFilter)
+DB_ARGUMENTS = ('db', 'pool')
+
+EVENTS = ('message', 'edited_message', 'channel_post', 'edited_channel_post', 'inline_query',
+          'chosen_inline_result', 'callback_query', 'shipping_query', 'pre_checkout_query',
+          'poll', 'poll_answer', 'my_chat_member', 'chat_member', 'chat_join_request')
+
+
+@dataclass
+class _HandlerInfo:
+    static_filters: List[FilterObj]
+    needs_role: bool
+    needs_db: bool
+
+
+class UpdateClassifierMiddleware(BaseMiddleware):
+    """
+    Classifies an update by the registered handlers before the database middlewares.
+
+    Updates of types without handlers are dropped at once. For other updates the FSM state is read
+    (and shared with the state filters, so it's read once), and the handlers whose state, content type,
+    command, text and callback data filters pass are found. If there are none, the update is dropped,
+    otherwise the flags `needs_role` and `needs_db` tell the next middlewares whether the handlers
+    may need the member's role or a database connection.
+
+    The table of handlers is built on the first update, because handlers are registered after middlewares.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.dropped = 0
+        # event -> (quantity of handlers when the table was built, the table)
+        self._tables: Dict[str, Tuple[int, List[_HandlerInfo]]] = {}
+
+    async def trigger(self, action: str, args):
+        if action == 'pre_process_update':
+            await self._check_update(*args)
+            return True
+        if action.startswith('pre_process_') and (event := action[len('pre_process_'):]) in EVENTS:
+            await self._classify(event, *args)
+            return True
+        return None
+
+    def _handlers(self, event: str):
+        return getattr(self.manager.dispatcher, f'{event}_handlers')
+
+    def _table(self, event: str) -> List[_HandlerInfo]:
+        handlers = self._handlers(event).handlers
+        count, table = self._tables.get(event, (-1, []))
+        if count != len(handlers):
+            table = [_HandlerInfo(
+                static_filters=[f for f in handler_obj.filters if isinstance(f.filter, STATIC_FILTERS)],
+                needs_role=(any(isinstance(f.filter, ROLE_FILTERS) for f in handler_obj.filters)
+                            or 'role' in handler_obj.spec.args),
+                needs_db=any(arg in handler_obj.spec.args for arg in DB_ARGUMENTS),
+            ) for handler_obj in handlers]
+            self._tables[event] = (len(handlers), table)
+        return table
+
+    def _drop(self, reason: str) -> None:
+        self.dropped += 1
+        metrics.UPDATES_DROPPED.inc(reason='no_handler')
+        logging.debug(f"The update is dropped: {reason}")
+        raise CancelHandler()
+
+    async def _check_update(self, update: Update, data: dict) -> None:
+        event = next((name for name in EVENTS if getattr(update, name) is not None), None)
+        if event is None or not self._handlers(event).handlers:
+            self._drop(f"no handlers for <{event}>")
+
+    async def _read_state(self, obj) -> Optional[str]:
+        if isinstance(obj, CallbackQuery):
+            chat = getattr(getattr(obj.message, 'chat', None), 'id', None)
+        else:
+            chat = getattr(getattr(obj, 'chat', None), 'id', None)
+        user = getattr(getattr(obj, 'from_user', None), 'id', None)
+        if not (chat or user):
+            return None
+        state = await self.manager.dispatcher.storage.get_state(chat=chat, user=user)
+        # The state filters of the handlers take the state from here instead of the storage
+        StateFilter.ctx_state.set(state)
+        return state
+
+    @staticmethod
+    async def _passes(info: _HandlerInfo, obj, state: Optional[str], content_type: Optional[str]) -> bool:
+        for filter_obj in info.static_filters:
+            # The most common filters are checked inline with the state and the content type found once
+            if isinstance(filter_obj.filter, StateFilter):
+                states = filter_obj.filter.states
+                if not ('*' in states or state in states):
+                    return False
+                continue
+            if isinstance(filter_obj.filter, ContentTypeFilter) and content_type is not None:
+                content_types = filter_obj.filter.content_types
+                if not (ContentType.ANY in content_types or content_type in content_types):
+                    return False
+                continue
+            try:
+                if not await execute_filter(filter_obj, (obj,)):
+                    return False
+            except Exception:
+                # The filter will be checked by the dispatcher anyway
+                logging.debug(f"The filter {filter_obj.filter!r} can't be checked in advance", exc_info=True)
+        return True
+
+    async def _classify(self, event: str, obj, data: dict) -> None:
+        state = await self._read_state(obj)
+        content_type = obj.content_type if isinstance(obj, Message) else None
+        candidates = [info for info in self._table(event) if await self._passes(info, obj, state, content_type)]
+        if not candidates:
+            self._drop(f"no handlers match the <{event}>")
+
+        # The role is looked up in the database on a cache miss
+        data['needs_role'] = any(info.needs_role for info in candidates)
+        data['needs_db'] = data['needs_role'] or any(info.needs_db for info in candidates)
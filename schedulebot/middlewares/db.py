@@ -2,17 +2,23 @@ import asyncpg
 from aiogram.dispatcher.middlewares import LifetimeControllerMiddleware
 from aiogram.types.base import TelegramObject
 
+from ..database import LazyConnection
+
 
 class DatabaseMiddleware(LifetimeControllerMiddleware):
+    skip_patterns = ['update']
 
     def __init__(self, pool):
         super().__init__()
         self.pool: asyncpg.pool.Pool = pool
 
     async def pre_process(self, obj: TelegramObject, data: dict, *args):
-        data['db'] = await self.pool.acquire()
+        # No handler of the update needs the database (see UpdateClassifierMiddleware)
+        if not data.get('needs_db', True):
+            return
+        data['db'] = LazyConnection(self.pool)
         data['pool'] = self.pool
 
     async def post_process(self, obj, data, *args):
         if db := data.get("db"):
-            await self.pool.release(db)
+            await db.release()
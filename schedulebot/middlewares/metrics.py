@@ -0,0 +1,34 @@
+import time
+
+from aiogram.dispatcher.filters import StateFilter
+from aiogram.dispatcher.handler import current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from .. import metrics
+from .classifier import EVENTS
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Records the processing time of updates by the handler and by the FSM state of the user.
+
+    The time is measured from the event middlewares to the end of the handler,
+    so waiting for a database connection is included. Updates without a matching handler
+    are recorded with the handler `unhandled`.
+    """
+
+    async def trigger(self, action: str, args):
+        stage, _, event = action.partition('process_')
+        if event not in EVENTS:
+            return None
+        *_, data = args
+        if stage == 'pre_':
+            data['metrics_started'] = time.perf_counter()
+        elif stage == '':
+            # `process_<event>` is triggered right before the handler
+            data['metrics_handler'] = current_handler.get().__name__
+        elif stage == 'post_' and (started := data.get('metrics_started')) is not None:
+            elapsed = time.perf_counter() - started
+            metrics.HANDLER_LATENCY.observe(elapsed, event=event, handler=data.get('metrics_handler', 'unhandled'))
+            metrics.STATE_LATENCY.observe(elapsed, state=StateFilter.ctx_state.get(None) or 'none')
+        return True
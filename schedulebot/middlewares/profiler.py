@@ -0,0 +1,157 @@
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from aiogram.dispatcher.filters import StateFilter
+from aiogram.dispatcher.handler import current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from .classifier import EVENTS
+
+
+class ProfilerMiddleware(BaseMiddleware):
+    """
+    Profiles the processing of updates and writes dumps of slow or sampled updates.
+
+    * A sampled update (with the probability `sample_rate`) is profiled by cProfile.
+      The profiler sees the whole thread, so frames of updates processed at the same time
+      get into the profile too; only one update is profiled at a time.
+    * For any update running longer than `slow_threshold` seconds, the stack of its task
+      is captured at the moment the threshold is exceeded.
+
+    A dump consists of a text report (the handler, the FSM state, the time, the stack and
+    the top of the profile) and a `.prof` file for `pstats` or snakeviz. Only the latest
+    `max_dumps` reports are kept in the directory.
+    """
+
+    def __init__(self, dump_dir: Path, *,
+                 enabled: bool = False,
+                 sample_rate: float = 0.0,
+                 slow_threshold: float = 1.0,
+                 max_dumps: int = 50):
+        """
+        :param dump_dir: The directory of dumps.
+        :type dump_dir: :obj:`pathlib.Path`.
+        :param enabled: If false, updates aren't watched.
+        :type enabled: :obj:`bool`.
+        :param sample_rate: A share of updates to be profiled, from 0 to 1.
+        :type sample_rate: :obj:`float`.
+        :param slow_threshold: Seconds after which an update is slow, 0 disables capturing of slow updates.
+        :type slow_threshold: :obj:`float`.
+        :param max_dumps: The quantity of dumps kept in the directory.
+        :type max_dumps: :obj:`int`.
+        """
+        super().__init__()
+        self.dump_dir = dump_dir
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.max_dumps = max_dumps
+        self.dumps = 0
+        self._profiling = False
+
+    @property
+    def status(self) -> dict:
+        return {'enabled': self.enabled, 'sample_rate': self.sample_rate,
+                'slow_threshold': self.slow_threshold, 'dumps': self.dumps, 'dump_dir': str(self.dump_dir)}
+
+    async def trigger(self, action: str, args):
+        stage, _, event = action.partition('process_')
+        if event not in EVENTS:
+            return None
+        *_, data = args
+        if stage == 'pre_':
+            self._start(data)
+        elif stage == '' and 'profiler_started' in data:
+            data['profiler_handler'] = current_handler.get().__name__
+        elif stage == 'post_':
+            await self._finish(event, data)
+        return True
+
+    def _start(self, data: dict) -> None:
+        if not self.enabled or (task := asyncio.current_task()) is None:
+            return
+        data['profiler_started'] = time.perf_counter()
+
+        if not self._profiling and self.sample_rate and random.random() < self.sample_rate:
+            self._profiling = True
+            profile = data['profiler_profile'] = cProfile.Profile()
+            profile.enable()
+
+        if self.slow_threshold:
+            data['profiler_timer'] = asyncio.get_running_loop().call_later(
+                self.slow_threshold, self._capture_stack, task, data)
+
+        # `post_process` is skipped when a later middleware cancels the update or fails,
+        # so the profiling is stopped when the task of the update is done anyway
+        if 'profiler_profile' in data or 'profiler_timer' in data:
+            task.add_done_callback(lambda _: self._stop(data))
+
+    def _stop(self, data: dict) -> Optional[cProfile.Profile]:
+        if timer := data.pop('profiler_timer', None):
+            timer.cancel()
+        profile: Optional[cProfile.Profile] = data.pop('profiler_profile', None)
+        if profile is not None:
+            profile.disable()
+            self._profiling = False
+        return profile
+
+    @staticmethod
+    def _capture_stack(task: asyncio.Task, data: dict) -> None:
+        stack = io.StringIO()
+        task.print_stack(file=stack)
+        data['profiler_stack'] = stack.getvalue()
+
+    async def _finish(self, event: str, data: dict) -> None:
+        if (started := data.pop('profiler_started', None)) is None:
+            return
+        elapsed = time.perf_counter() - started
+        profile = self._stop(data)
+
+        stack = data.pop('profiler_stack', None)
+        if profile is None and stack is None:
+            return
+
+        report = {
+            'event': event,
+            'handler': data.get('profiler_handler', 'unhandled'),
+            'state': StateFilter.ctx_state.get(None),
+            'elapsed': elapsed,
+            'reason': 'slow' if stack is not None else 'sampled',
+        }
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, report, stack, profile)
+        except OSError:
+            logging.exception("The profile isn't written")
+        else:
+            self.dumps += 1
+
+    def _write(self, report: dict, stack: Optional[str], profile: Optional[cProfile.Profile]) -> None:
+        self.dump_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{report['reason']}-{report['handler']}"
+
+        lines = [f'{key}: {value}' for key, value in report.items()]
+        if stack:
+            lines += ['', f"Stack after {self.slow_threshold} s:", stack]
+        if profile is not None:
+            profile.dump_stats(self.dump_dir / f'{name}.prof')
+            stats = io.StringIO()
+            pstats.Stats(profile, stream=stats).sort_stats('cumulative').print_stats(30)
+            lines += ['', stats.getvalue()]
+        (self.dump_dir / f'{name}.txt').write_text('\n'.join(lines))
+        logging.warning(f"Profiler: the {report['reason']} update of <{report['handler']}> "
+                        f"took {report['elapsed']:.3f} s, see {name}.txt")
+        self._rotate()
+
+    def _rotate(self) -> None:
+        reports = sorted(self.dump_dir.glob('*.txt'))
+        for report in reports[:max(0, len(reports) - self.max_dumps)]:
+            report.unlink(missing_ok=True)
+            report.with_suffix('.prof').unlink(missing_ok=True)
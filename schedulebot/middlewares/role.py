@@ -1,30 +1,34 @@
 import logging
 
-import asyncpg
 from aiogram.dispatcher.middlewares import LifetimeControllerMiddleware, BaseMiddleware
 from aiogram.dispatcher.handler import CancelHandler
 from aiogram.types.base import TelegramObject
 
+from .. import database
 from ..config import Role
+from ..database.cache import MISSING
 
 
 class RoleMiddleware(LifetimeControllerMiddleware):
-    skip_patterns = ['update']
+    skip_patterns = ['update', 'error']
 
     async def pre_process(self, obj: TelegramObject, data: dict, *args):
-        db: asyncpg.pool.Pool = data['db']
-
-        get_role_sql = '''
-            SELECT role FROM members 
-            INNER JOIN roles ON (members.role_id=roles.id) 
-            WHERE tg_id=($1);
-        '''
+        # No handler of the update checks the role (see UpdateClassifierMiddleware)
+        if not data.get('needs_role', True):
+            return
         user_id = obj['from']['id']
-        if role_str := await db.fetchval(get_role_sql, user_id):
-            role = Role(role_str)
-        else:
-            role = None
+
+        role = database.role_cache.get(user_id)
+        if role is MISSING:
+            db: database.LazyConnection = data['db']
+            if role_str := await database.get_member_role(db, user_id):
+                role = Role(role_str)
+            else:
+                role = None
+            database.role_cache.set(user_id, role)
+            # The handler will acquire a connection again only if it needs one
+            await db.release()
         data['role'] = role
 
     async def post_process(self, obj: TelegramObject, data: dict, *args):
-        del data['role']
+        data.pop('role', None)
@@ -1,10 +1,11 @@
 """
-The module represents models for simplified mapping database records.
+The module represents models for simplified mapping database records
+and records of parsed schedule documents.
 """
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Union
 
 
 @dataclass
@@ -18,3 +19,54 @@ class Staff:
     phone: Optional[str] = None
     file_id: Optional[str] = None
     created_at: Optional[datetime] = None
+
+
+@dataclass
+class Application:
+    """
+    An object representation of a record in the `applications` database table.
+
+    `chat_id` and `message_id` identify the applicant's contact message to be forwarded to the manager.
+    """
+    id: int
+    tg_id: int
+    tg_name: str
+    role: str
+    chat_id: int
+    message_id: int
+    phone: Optional[str] = None
+    status: str = 'pending'
+    created_at: Optional[datetime] = None
+    decided_at: Optional[datetime] = None
+
+
+@dataclass
+class StaffPage:
+    """
+    An object representation of a page of the staff list ordered by role and alias.
+    """
+    staff: List[Staff]
+    has_previous: bool = False
+    has_next: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class Shift:
+    """
+    An object representation of a working shift parsed from a schedule document.
+    """
+    start: datetime
+    end: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class Appointment:
+    """
+    An object representation of an appointment parsed from a schedule document.
+    """
+    start: datetime
+    end: Optional[datetime]
+    description: str
+
+
+ScheduleEntry = Union[Shift, Appointment]
@@ -0,0 +1,145 @@
+"""
+The module pipeline:
+Schedules incoming updates, so updates of different chats are processed in parallel
+with bounded concurrency and updates of the same chat are processed strictly in order.
+
+The order is kept within a single process only. Webhook workers sharing the port
+(`WEBHOOK_WORKERS` > 1) receive updates of the same chat in any of the processes,
+so FSM transitions of a chat may still race between the workers.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from aiogram import Dispatcher, types
+
+
+def update_chat_key(update: types.Update) -> Optional[Hashable]:
+    """
+    Returns the key of the chat the update belongs to.
+
+    :param update: An incoming update.
+    :type update: :obj:`aiogram.types.Update`.
+    :return: The chat ID (the user ID for updates without a chat) or None if there is neither.
+    :rtype: :obj:`typing.Optional[typing.Hashable]`
+    """
+    for obj in (update.message, update.edited_message, update.channel_post, update.edited_channel_post,
+                update.my_chat_member, update.chat_member, update.chat_join_request):
+        if obj is not None:
+            return obj.chat.id
+    if update.callback_query is not None:
+        if update.callback_query.message is not None:
+            return update.callback_query.message.chat.id
+        return update.callback_query.from_user.id
+    for obj in (update.inline_query, update.chosen_inline_result, update.shipping_query,
+                update.pre_checkout_query, update.poll_answer):
+        if obj is not None:
+            return obj.user.id if isinstance(obj, types.PollAnswer) else obj.from_user.id
+    return None
+
+
+def update_user_id(update: types.Update) -> Optional[int]:
+    """
+    Returns the ID of the user who sent the update.
+
+    :param update: An incoming update.
+    :type update: :obj:`aiogram.types.Update`.
+    :return: The user ID or None for updates without a user (e.g. channel posts).
+    :rtype: :obj:`typing.Optional[int]`
+    """
+    for obj in (update.message, update.edited_message, update.callback_query, update.inline_query,
+                update.chosen_inline_result, update.shipping_query, update.pre_checkout_query,
+                update.my_chat_member, update.chat_member, update.chat_join_request):
+        if obj is not None:
+            return obj.from_user.id if obj.from_user else None
+    if update.poll_answer is not None:
+        return update.poll_answer.user.id
+    return None
+
+
+class UpdateScheduler:
+    """
+    This object represents a scheduler of update processing.
+
+    Every chat has a chain of its updates: an update waits for the previous update
+    of the same chat before it takes a slot of the shared limit,
+    so waiting updates don't occupy slots, and a busy chat doesn't block the others.
+    """
+
+    def __init__(self, limit: int):
+        """
+        :param limit: The maximum quantity of updates processed at the same time.
+        :type limit: :obj:`int`.
+        """
+        self.limit = limit
+        self.running = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+        # chat key -> the completion future of the latest scheduled update of the chat
+        self._tails: Dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'limit': self.limit, 'running': self.running,
+                'waiting': self.waiting, 'chats': len(self._tails)}
+
+    async def run(self, key: Optional[Hashable], func: Callable[..., Awaitable], *args) -> Any:
+        """
+        Runs the coroutine function after the previous calls with the same key.
+
+        :param key: The chat key, if None the call isn't ordered with other calls.
+        :type key: :obj:`typing.Optional[typing.Hashable]`.
+        :param func: A coroutine function.
+        :type func: :obj:`typing.Callable`.
+        :param args: Arguments of the function.
+        :return: The result of the function.
+        """
+        previous = self._tails.get(key) if key is not None else None
+        done = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self._tails[key] = done
+
+        self.waiting += 1
+        started = False
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            async with self._semaphore:
+                self.waiting -= 1
+                started = True
+                self.running += 1
+                try:
+                    return await func(*args)
+                finally:
+                    self.running -= 1
+        finally:
+            if not started:
+                self.waiting -= 1
+            if previous is not None and not previous.done():
+                # Cancelled while waiting: the next update of the chat still waits for the previous one
+                previous.add_done_callback(lambda _: self._complete(key, done))
+            else:
+                self._complete(key, done)
+
+    def _complete(self, key: Optional[Hashable], done: asyncio.Future) -> None:
+        if not done.done():
+            done.set_result(None)
+        if key is not None and self._tails.get(key) is done:
+            del self._tails[key]
+
+
+class OrderedDispatcher(Dispatcher):
+    """
+    This object represents a dispatcher passing every update through :obj:`UpdateScheduler`.
+
+    It works the same way for polling and for webhooks,
+    because both of them process updates by :meth:`process_update`.
+    Updates are ordered only among those received by this process.
+    """
+
+    def __init__(self, *args, concurrency_limit: int = 32, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = UpdateScheduler(concurrency_limit)
+
+    async def process_update(self, update: types.Update):
+        return await self.scheduler.run(update_chat_key(update), super().process_update, update)
@@ -0,0 +1,17 @@
+"""
+The package schedule:
+Gets work schedules from Google Documents and turns them into records.
+"""
+
+from .parser import parse_schedule, parse_schedule_text
+from .cache import schedule_cache
+from .store import Period, period_bounds, shift_store
+from .loader import load_schedule, find_schedule, forget_schedule, removed_files_listener
+from .changes import ChangeKind, ScheduleChange, ScheduleChangeDetector, diff_schedules
+from .watcher import sync_folder, watch_folder
+
+__all__ = ['parse_schedule', 'parse_schedule_text', 'schedule_cache',
+           'Period', 'period_bounds', 'shift_store', 'load_schedule', 'find_schedule',
+           'forget_schedule', 'removed_files_listener',
+           'ChangeKind', 'ScheduleChange', 'ScheduleChangeDetector', 'diff_schedules',
+           'sync_folder', 'watch_folder']
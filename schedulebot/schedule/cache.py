@@ -0,0 +1,220 @@
+"""
+The module cache:
+Keeps parsed schedules keyed by the document revision and the parse year,
+so an unchanged document is never exported and parsed again.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from schedulebot.config import SCHEDULE_CACHE_DIR, SCHEDULE_CACHE_MAX_BYTES
+from schedulebot.models import Shift, Appointment, ScheduleEntry
+
+
+def dump_entries(entries: Sequence[ScheduleEntry]) -> bytes:
+    """
+    Serializes schedule records to compact JSON.
+    """
+    rows = []
+    for entry in entries:
+        if isinstance(entry, Shift):
+            rows.append(('s', entry.start.isoformat(), entry.end.isoformat()))
+        else:
+            rows.append(('a', entry.start.isoformat(),
+                         entry.end.isoformat() if entry.end else None, entry.description))
+    return json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def load_entries(raw: bytes) -> Tuple[ScheduleEntry, ...]:
+    """
+    Deserializes schedule records dumped by :func:`dump_entries`.
+    """
+    parse = datetime.fromisoformat
+    entries = []
+    for row in json.loads(raw):
+        if row[0] == 's':
+            entries.append(Shift(parse(row[1]), parse(row[2])))
+        else:
+            entries.append(Appointment(parse(row[1]), parse(row[2]) if row[2] else None, row[3]))
+    return tuple(entries)
+
+
+class ScheduleCache:
+    """
+    This object represents a two-tier cache of parsed schedules.
+
+    Entries are keyed by the Google Document ID, its version from Drive metadata
+    and the year the document is parsed for (day headers without a year depend on it),
+    so a new revision of a document is never served from the cache.
+
+    The memory tier is an LRU bounded by the total size of the serialized entries.
+    The disk tier keeps the latest version of each document in a JSON file
+    and survives restarts of the bot.
+    """
+
+    def __init__(self, max_bytes: int, cache_dir: Optional[Path] = None):
+        """
+        :param max_bytes: The memory tier limit in bytes of serialized schedules.
+        :type max_bytes: :obj:`int`.
+        :param cache_dir: A directory of the disk tier, if None the disk tier isn't used.
+        :type cache_dir: :obj:`typing.Optional[pathlib.Path]`.
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.size_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Only the latest known version of each document is kept, keyed by "version/year"
+        self._entries: OrderedDict[str, Tuple[str, Tuple[ScheduleEntry, ...], int]] = OrderedDict()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'size_bytes': self.size_bytes,
+                'hits': self.hits, 'disk_hits': self.disk_hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+    async def get(self, file_id: str, version: str, year: int) -> Optional[Tuple[ScheduleEntry, ...]]:
+        """
+        Returns a parsed schedule of the document version.
+
+        :param file_id: The Google Document ID.
+        :type file_id: :obj:`str`.
+        :param version: The document version from Drive metadata.
+        :type version: :obj:`str`.
+        :param year: The year the document has been parsed for.
+        :type year: :obj:`int`.
+        :return: Schedule records or None if the version isn't cached.
+        :rtype: :obj:`typing.Optional[typing.Tuple[schedulebot.models.ScheduleEntry, ...]]`
+        """
+        key = self._key(version, year)
+        cached = self._entries.get(file_id)
+        if cached and cached[0] == key:
+            self._entries.move_to_end(file_id)
+            self.hits += 1
+            return cached[1]
+
+        if self.cache_dir:
+            cached_key, raw = await asyncio.to_thread(self._read, file_id)
+            if raw and cached_key == key:
+                entries = load_entries(raw)
+                self._remember(file_id, key, entries, len(raw))
+                self.disk_hits += 1
+                return entries
+
+        self.misses += 1
+        return None
+
+    async def latest(self, file_id: str) -> Optional[Tuple[str, Tuple[ScheduleEntry, ...]]]:
+        """
+        Returns the latest cached version of the document and its parsed schedule.
+        The statistics aren't affected.
+
+        :param file_id: The Google Document ID.
+        :type file_id: :obj:`str`.
+        :return: The version and schedule records or None if the document has never been cached.
+        :rtype: :obj:`typing.Optional[typing.Tuple[str, typing.Tuple[schedulebot.models.ScheduleEntry, ...]]]`
+        """
+        if cached := self._entries.get(file_id):
+            return self._version(cached[0]), cached[1]
+        if self.cache_dir:
+            key, raw = await asyncio.to_thread(self._read, file_id)
+            if raw:
+                return self._version(key), load_entries(raw)
+        return None
+
+    async def put(self, file_id: str, version: str, year: int,
+                  entries: List[ScheduleEntry]) -> Tuple[ScheduleEntry, ...]:
+        """
+        Caches a parsed schedule of the document version.
+
+        :param file_id: The Google Document ID.
+        :type file_id: :obj:`str`.
+        :param version: The document version from Drive metadata.
+        :type version: :obj:`str`.
+        :param year: The year the document has been parsed for.
+        :type year: :obj:`int`.
+        :param entries: Schedule records.
+        :type entries: :obj:`typing.List[schedulebot.models.ScheduleEntry]`.
+        :return: The cached (immutable) schedule records.
+        :rtype: :obj:`typing.Tuple[schedulebot.models.ScheduleEntry, ...]`
+        """
+        key = self._key(version, year)
+        entries = tuple(entries)
+        raw = dump_entries(entries)
+        self._remember(file_id, key, entries, len(raw))
+        if self.cache_dir:
+            await asyncio.to_thread(self._write, file_id, key, raw)
+        return entries
+
+    async def remove(self, file_id: str) -> None:
+        """
+        Drops the cached schedule of the document from both tiers, e.g. if the document is removed from Drive.
+
+        :param file_id: The Google Document ID.
+        :type file_id: :obj:`str`.
+        :return:
+        """
+        if file_id in self._entries:
+            self._forget(file_id)
+        if self.cache_dir:
+            await asyncio.to_thread(self._unlink, file_id)
+
+    @staticmethod
+    def _key(version: str, year: int) -> str:
+        return f'{version}/{year}'
+
+    @staticmethod
+    def _version(key: str) -> str:
+        return key.partition('/')[0]
+
+    def _remember(self, file_id: str, key: str, entries: Tuple[ScheduleEntry, ...], size: int) -> None:
+        if file_id in self._entries:
+            self._forget(file_id)
+        self._entries[file_id] = (key, entries, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes and len(self._entries) > 1:
+            self._forget(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _forget(self, file_id: str) -> None:
+        *_, size = self._entries.pop(file_id)
+        self.size_bytes -= size
+
+    def _path(self, file_id: str) -> Path:
+        return self.cache_dir / f'{file_id}.json'
+
+    def _read(self, file_id: str) -> Tuple[Optional[str], Optional[bytes]]:
+        try:
+            with open(self._path(file_id), 'rb') as cache_file:
+                key = cache_file.readline().strip().decode()
+                return key, cache_file.read()
+        except OSError:
+            return None, None
+
+    def _write(self, file_id: str, key: str, raw: bytes) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(file_id)
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as cache_file:
+                cache_file.write(key.encode() + b'\n' + raw)
+            os.replace(tmp_path, path)
+        except OSError as error:
+            logging.warning(f"The schedule of <{file_id}> isn't saved to the disk cache: {error}")
+
+    def _unlink(self, file_id: str) -> None:
+        try:
+            self._path(file_id).unlink(missing_ok=True)
+        except OSError as error:
+            logging.warning(f"The schedule of <{file_id}> isn't removed from the disk cache: {error}")
+
+
+schedule_cache = ScheduleCache(SCHEDULE_CACHE_MAX_BYTES, SCHEDULE_CACHE_DIR)
@@ -0,0 +1,231 @@
+"""
+The module changes:
+Detects changes of the employees' schedules between document revisions.
+
+Admins edit schedule documents in many small saves, so revisions of a document
+that arrive within the debounce window are coalesced: the schedule is parsed once
+and the employee gets a single alert with the difference against
+the schedule before the first of these revisions.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from schedulebot.models import Shift, ScheduleEntry
+from schedulebot.schedule.cache import ScheduleCache, schedule_cache
+
+
+class ChangeKind(Enum):
+    ADDED = 'added'
+    REMOVED = 'removed'
+    MOVED = 'moved'
+
+
+@dataclass(frozen=True)
+class ScheduleChange:
+    """
+    An object representation of a single change of the employee's schedule.
+
+    For the `MOVED` kind, `previous` is the record replaced by `entry`.
+    """
+    kind: ChangeKind
+    entry: ScheduleEntry
+    previous: Optional[ScheduleEntry] = None
+
+
+def _sort_key(entry: ScheduleEntry) -> Tuple:
+    if isinstance(entry, Shift):
+        return entry.start, entry.end, 0, ''
+    return entry.start, entry.end or entry.start, 1, entry.description
+
+
+def _identity(entry: ScheduleEntry) -> Tuple:
+    # A shift is moved if another shift of the same day replaces it,
+    # an appointment is moved if its description is kept
+    if isinstance(entry, Shift):
+        return 0, entry.start.date()
+    return 1, entry.description
+
+
+def diff_schedules(old: Sequence[ScheduleEntry], new: Sequence[ScheduleEntry]) -> List[ScheduleChange]:
+    """
+    Returns changes turning the old schedule into the new one.
+
+    Both schedules are sorted and merged in a single pass, so only records
+    present in one of them are compared further. A removed record and an added one
+    of the same identity (a shift of the same day, an appointment with the same description)
+    are reported as one moved record.
+
+    :param old: Schedule records of the previous document revision.
+    :type old: :obj:`typing.Sequence[schedulebot.models.ScheduleEntry]`.
+    :param new: Schedule records of the current document revision.
+    :type new: :obj:`typing.Sequence[schedulebot.models.ScheduleEntry]`.
+    :return: Changes ordered by the start of the record.
+    :rtype: :obj:`typing.List[schedulebot.schedule.changes.ScheduleChange]`
+    """
+    old = sorted(old, key=_sort_key)
+    new = sorted(new, key=_sort_key)
+    removed: List[ScheduleEntry] = []
+    added: List[ScheduleEntry] = []
+
+    i = j = 0
+    while i < len(old) and j < len(new):
+        old_key, new_key = _sort_key(old[i]), _sort_key(new[j])
+        if old_key == new_key:
+            i += 1
+            j += 1
+        elif old_key < new_key:
+            removed.append(old[i])
+            i += 1
+        else:
+            added.append(new[j])
+            j += 1
+    removed.extend(old[i:])
+    added.extend(new[j:])
+
+    unmatched: Dict[Tuple, deque] = {}
+    for entry in removed:
+        unmatched.setdefault(_identity(entry), deque()).append(entry)
+
+    changes: List[ScheduleChange] = []
+    for entry in added:
+        if candidates := unmatched.get(_identity(entry)):
+            changes.append(ScheduleChange(ChangeKind.MOVED, entry, candidates.popleft()))
+        else:
+            changes.append(ScheduleChange(ChangeKind.ADDED, entry))
+    changes.extend(ScheduleChange(ChangeKind.REMOVED, entry)
+                   for candidates in unmatched.values() for entry in candidates)
+    changes.sort(key=lambda change: _sort_key(change.entry))
+    return changes
+
+
+class ScheduleChangeDetector:
+    """
+    This object represents a detector of schedule changes with coalesced alerts.
+
+    Each new document revision restarts the debounce timer of the document.
+    When the timer fires, the latest revision is loaded (and parsed once),
+    compared with the schedule known before the first revision of the burst,
+    and the changes are passed to the `notify` callback.
+
+    A document that has never been parsed has nothing to compare with: its revision is loaded
+    in the background to become the baseline (e.g. all documents of the folder on the first start),
+    and the next revision is compared with it.
+    """
+
+    def __init__(self,
+                 load: Callable[..., Awaitable[Sequence[ScheduleEntry]]],
+                 notify: Callable[[str, List[ScheduleChange]], Awaitable],
+                 debounce: float,
+                 cache: ScheduleCache = schedule_cache):
+        """
+        :param load: A coroutine function returning a parsed schedule by `file_id` and `version`,
+            the schedule must get into the `cache`.
+        :type load: :obj:`typing.Callable`.
+        :param notify: A coroutine function receiving the Google Document ID and its changes.
+        :type notify: :obj:`typing.Callable`.
+        :param debounce: The quiet period in seconds after the last revision before an alert.
+        :type debounce: :obj:`float`.
+        :param cache: The cache of parsed schedules keeping the baselines.
+        :type cache: :obj:`schedulebot.schedule.cache.ScheduleCache`.
+        """
+        self.load = load
+        self.notify = notify
+        self.debounce = debounce
+        self.cache = cache
+        # file_id -> the task loading the first known revision as the baseline
+        self._baselines: Dict[str, asyncio.Task] = {}
+        # file_id -> (baseline schedule, the latest version, debounce timer)
+        self._pending: Dict[str, Tuple[Sequence[ScheduleEntry], str, asyncio.TimerHandle]] = {}
+        self._tasks: set = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def touch(self, file_id: str, version) -> None:
+        """
+        Registers a new revision of the document.
+
+        :param file_id: The Google Document ID.
+        :type file_id: :obj:`str`.
+        :param version: The document version from Drive metadata.
+        :type version: :obj:`typing.Union[str, int]`.
+        :return:
+        """
+        version = str(version)
+        if pending := self._pending.get(file_id):
+            baseline, _, timer = pending
+            timer.cancel()
+        else:
+            if loading := self._baselines.get(file_id):
+                await asyncio.wait({loading})
+            if not (latest := await self.cache.latest(file_id)):
+                self._load_baseline(file_id, version)
+                return
+            baseline_version, baseline = latest
+            if baseline_version == version:
+                return
+
+        timer = asyncio.get_running_loop().call_later(self.debounce, self._flush, file_id)
+        self._pending[file_id] = (baseline, version, timer)
+
+    async def changes_listener(self, delta) -> None:
+        """
+        Registers revisions of the documents changed in the Google folder.
+        It is intended to be subscribed to :obj:`schedulebot.googledrive.DriveFolderSync`.
+
+        :param delta: Changes of the Google folder snapshot.
+        :type delta: :obj:`schedulebot.googledrive.SyncDelta`.
+        :return:
+        """
+        for file in delta.changed:
+            if file.get('version'):
+                await self.touch(file['id'], file['version'])
+        for file_id in delta.removed:
+            if pending := self._pending.pop(file_id, None):
+                pending[2].cancel()
+
+    def _load_baseline(self, file_id: str, version: str) -> None:
+        task = asyncio.create_task(self._baseline(file_id, version))
+        self._baselines[file_id] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._baselines.pop(file_id, None))
+
+    async def _baseline(self, file_id: str, version: str) -> None:
+        try:
+            await self.load(file_id, version=version)
+        except Exception:
+            logging.exception(f"The baseline of the schedule <{file_id}> isn't loaded")
+
+    def _flush(self, file_id: str) -> None:
+        baseline, version, _ = self._pending.pop(file_id)
+        task = asyncio.create_task(self._detect(file_id, baseline, version))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _detect(self, file_id: str, baseline: Sequence[ScheduleEntry], version: str) -> None:
+        try:
+            entries = await self.load(file_id, version=version)
+            if changes := diff_schedules(baseline, entries):
+                logging.info(f"The schedule of <{file_id}> is changed: {len(changes)} changes")
+                await self.notify(file_id, changes)
+        except Exception:
+            logging.exception(f"Changes of the schedule <{file_id}> aren't detected")
+
+    async def close(self) -> None:
+        """
+        Cancels pending alerts and waits for alerts being sent.
+
+        :return:
+        """
+        for *_, timer in self._pending.values():
+            timer.cancel()
+        self._pending.clear()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
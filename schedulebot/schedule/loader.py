@@ -0,0 +1,107 @@
+"""
+The module loader:
+Gets schedule documents from Google Drive and parses them.
+"""
+
+from datetime import date
+from typing import List, Optional, Tuple
+
+from schedulebot import googledrive
+from schedulebot.models import ScheduleEntry
+from schedulebot.schedule.cache import schedule_cache
+from schedulebot.schedule.parser import parse_schedule_text
+from schedulebot.schedule.store import Period, shift_store
+
+
+async def load_schedule(file_id: str, *,
+                        version: Optional[str] = None,
+                        year: Optional[int] = None) -> Tuple[ScheduleEntry, ...]:
+    """
+    Returns a parsed schedule of the document.
+
+    The schedule is taken from the cache if this version of the document has been parsed
+    for the year before, otherwise the document is exported as plain text and parsed.
+
+    :param file_id: The Google Document ID.
+    :type file_id: :obj:`str`.
+    :param version: The document version if it is already known from Drive metadata,
+        otherwise it is requested from Google Drive.
+    :type version: :obj:`typing.Optional[str]`.
+    :param year: A year for the day headers without a year, defaults to the current year.
+    :type year: :obj:`typing.Optional[int]`.
+    :return: Shift and appointment records in the document order.
+    :rtype: :obj:`typing.Tuple[schedulebot.models.ScheduleEntry, ...]`
+    """
+    if version is None:
+        version = await googledrive.get_document_version(file_id)
+    # Day headers without a year are parsed for this year, so it is a part of the cache key
+    year = year or date.today().year
+
+    if (entries := await schedule_cache.get(file_id, version, year)) is not None:
+        return entries
+
+    text = await googledrive.export_document(file_id)
+    return await schedule_cache.put(file_id, version, year, parse_schedule_text(text, year=year))
+
+
+async def find_schedule(file_id: str, period: Period, *,
+                        version: Optional[str] = None,
+                        today: Optional[date] = None) -> List[ScheduleEntry]:
+    """
+    Returns the employee's schedule records of the period.
+
+    The employee's index in the shift store is rebuilt only when the document version
+    or the current year changes. The version is taken from the folder sync (the database mirror
+    or the Google folder snapshot), so changes made after the latest folder sync aren't seen yet.
+
+    :param file_id: The Google Document ID of the employee.
+    :type file_id: :obj:`str`.
+    :param period: A period of the schedule.
+    :type period: :obj:`schedulebot.schedule.store.Period`.
+    :param version: The document version from the database mirror of the folder,
+        if None it is taken from the folder snapshot or requested from Google Drive.
+    :type version: :obj:`typing.Optional[str]`.
+    :param today: The current date, defaults to today.
+    :type today: :obj:`typing.Optional[datetime.date]`.
+    :return: A list of schedule records ordered by the start.
+    :rtype: :obj:`typing.List[schedulebot.models.ScheduleEntry]`
+    """
+    if version is None:
+        # The folder snapshot knows versions of all documents, Drive is asked only about unknown ones
+        if document := googledrive.drive_sync.snapshot.get(file_id):
+            version = document['version']
+        else:
+            version = await googledrive.get_document_version(file_id)
+    year = (today or date.today()).year
+    # The store is tagged with the parse year as well as the cache
+    tag = f'{version}/{year}'
+    if shift_store.version(file_id) != tag:
+        entries = await load_schedule(file_id, version=version, year=year)
+        shift_store.rebuild(file_id, entries, tag)
+    return shift_store.for_period(file_id, period, today)
+
+
+async def forget_schedule(file_id: str) -> None:
+    """
+    Drops the schedule of the document from the shift store and the cache,
+    e.g. if the document is removed from the Google folder.
+
+    :param file_id: The Google Document ID.
+    :type file_id: :obj:`str`.
+    :return:
+    """
+    shift_store.remove(file_id)
+    await schedule_cache.remove(file_id)
+
+
+async def removed_files_listener(delta) -> None:
+    """
+    Forgets schedules of the documents removed from the Google folder.
+    It is intended to be subscribed to :obj:`schedulebot.googledrive.DriveFolderSync`.
+
+    :param delta: Changes of the Google folder snapshot.
+    :type delta: :obj:`schedulebot.googledrive.SyncDelta`.
+    :return:
+    """
+    for file_id in delta.removed:
+        await forget_schedule(file_id)
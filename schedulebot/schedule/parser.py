@@ -0,0 +1,112 @@
+"""
+The module parser:
+Turns the text of a schedule document into shift and appointment records.
+
+A document is read line by line in a single pass, only the current day is kept in memory.
+The expected layout of a document:
+
+    Понеділок 15.05.2023             — a day header, the weekday and the year are optional;
+    Зміна 09:00 - 18:00              — a working shift of the day;
+    10:00 - 11:30 Олена, манікюр     — an appointment with the end time;
+    12:00 Ірина, стрижка             — an appointment without the end time.
+
+Dates are written with dots or slashes, times with colons.
+All other lines (notes, days off, empty lines) are skipped.
+"""
+
+import io
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Iterator, Optional
+
+from schedulebot.models import Shift, Appointment, ScheduleEntry
+
+
+DATE_RE = re.compile(r'(?<!\d)(\d{1,2})[./](\d{1,2})(?:[./](\d{4}|\d{2}))?(?!\d)')
+TIME_RANGE_RE = re.compile(r'(\d{1,2}):(\d{2})(?:\s*[-–—]\s*(\d{1,2}):(\d{2}))?')
+SHIFT_KEYWORDS = ('зміна', 'робота', 'shift')
+
+# A header without a year that goes back more than this is considered as the next year
+YEAR_ROLLOVER = timedelta(days=180)
+
+
+def parse_schedule(lines: Iterable[str], *, year: Optional[int] = None) -> Iterator[ScheduleEntry]:
+    """
+    Parses lines of a schedule document lazily.
+
+    :param lines: Lines of a document, e.g. an opened text file or :obj:`io.StringIO`.
+    :type lines: :obj:`typing.Iterable[str]`.
+    :param year: A year for the day headers without a year, defaults to the current year.
+    :type year: :obj:`typing.Optional[int]`.
+    :return: An iterator of shift and appointment records in the document order.
+    :rtype: :obj:`typing.Iterator[schedulebot.models.ScheduleEntry]`
+    """
+    current_year = year or date.today().year
+    day: Optional[date] = None
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line[0].isdigit() and (match := TIME_RANGE_RE.match(line)):
+            if day is not None and (time_range := _time_range(day, *match.groups())):
+                yield Appointment(*time_range, line[match.end():].strip(' ,;-–—'))
+            continue
+
+        if line.lower().startswith(SHIFT_KEYWORDS):
+            match = TIME_RANGE_RE.search(line)
+            if day is not None and match and match.group(3) is not None \
+                    and (time_range := _time_range(day, *match.groups())):
+                yield Shift(*time_range)
+            continue
+
+        if match := DATE_RE.search(line):
+            header_day = _header_date(match, current_year, day)
+            if header_day is not None:
+                day = header_day
+                current_year = day.year
+
+
+def parse_schedule_text(text: str, *, year: Optional[int] = None) -> Iterator[ScheduleEntry]:
+    """
+    Parses the exported text of a schedule document lazily.
+
+    :param text: A plain text of a document.
+    :type text: :obj:`str`.
+    :param year: A year for the day headers without a year, defaults to the current year.
+    :type year: :obj:`typing.Optional[int]`.
+    :return: An iterator of shift and appointment records in the document order.
+    :rtype: :obj:`typing.Iterator[schedulebot.models.ScheduleEntry]`
+    """
+    return parse_schedule(io.StringIO(text), year=year)
+
+
+def _header_date(match: re.Match, current_year: int, previous_day: Optional[date]) -> Optional[date]:
+    day, month, year = match.groups()
+    if year is not None:
+        year = int(year) if len(year) == 4 else 2000 + int(year)
+    try:
+        header_day = date(year or current_year, int(month), int(day))
+        if year is None and previous_day is not None and header_day < previous_day - YEAR_ROLLOVER:
+            header_day = header_day.replace(year=header_day.year + 1)
+    except ValueError:
+        return None
+    return header_day
+
+
+def _time_range(day: date,
+                start_hour: str, start_minute: str,
+                end_hour: Optional[str], end_minute: Optional[str]) -> Optional[tuple[datetime, Optional[datetime]]]:
+    # An invalid time (e.g. 25:00 or 10:75) means the line isn't a time range
+    try:
+        start = datetime.combine(day, time(int(start_hour), int(start_minute)))
+        if end_hour is None:
+            return start, None
+        end = datetime.combine(day, time(int(end_hour), int(end_minute)))
+    except ValueError:
+        return None
+    if end <= start:
+        # The range goes over midnight
+        end += timedelta(days=1)
+    return start, end
@@ -0,0 +1,187 @@
+"""
+The module store:
+Keeps schedules of all employees in a compact array-backed form
+with a sorted index for period lookups.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from schedulebot.models import Shift, Appointment, ScheduleEntry
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class Period(Enum):
+    TODAY = 'today'
+    TOMORROW = 'tomorrow'
+    THIS_WEEK = 'this_week'
+    NEXT_WEEK = 'next_week'
+
+
+def period_bounds(period: Period, today: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """
+    Returns the half-open datetime interval [start, end) of the period.
+    Weeks start on Monday.
+
+    :param period: A period of the schedule.
+    :type period: :obj:`schedulebot.schedule.store.Period`.
+    :param today: The current date, defaults to today.
+    :type today: :obj:`typing.Optional[datetime.date]`.
+    :return: The start and the end of the period.
+    :rtype: :obj:`typing.Tuple[datetime.datetime, datetime.datetime]`
+    """
+    today = today or date.today()
+    if period is Period.TODAY:
+        first_day, days = today, 1
+    elif period is Period.TOMORROW:
+        first_day, days = today + timedelta(days=1), 1
+    elif period is Period.THIS_WEEK:
+        first_day, days = today - timedelta(days=today.weekday()), 7
+    elif period is Period.NEXT_WEEK:
+        first_day, days = today + timedelta(days=7 - today.weekday()), 7
+    else:
+        raise ValueError(f"Got an unknown period: {period}")
+    start = datetime.combine(first_day, time())
+    return start, start + timedelta(days=days)
+
+
+def _seconds(moment: datetime) -> int:
+    return int((moment - EPOCH).total_seconds())
+
+
+def _moment(seconds: int) -> datetime:
+    return EPOCH + timedelta(seconds=seconds)
+
+
+# Kinds of records in the `kinds` column
+SHIFT, APPOINTMENT, POINT_APPOINTMENT = 0, 1, 2
+
+
+class EmployeeSchedule:
+    """
+    This object represents a schedule of one employee.
+
+    Start and end times are kept in parallel arrays of seconds sorted by the start,
+    so a period lookup is a binary search. A record without the end time
+    is stored as a point (the end is equal to the start).
+
+    The parsed records aren't referenced: only the arrays and the appointment descriptions
+    are kept, and records of a period are rebuilt on lookup.
+    """
+    __slots__ = ('version', 'starts', 'ends', 'kinds', 'descriptions', 'max_span')
+
+    def __init__(self, entries: Sequence[ScheduleEntry], version: Optional[str] = None):
+        entries = sorted(entries, key=lambda entry: entry.start)
+
+        self.version = version
+        self.starts = array('q', (_seconds(entry.start) for entry in entries))
+        self.ends = array('q', (_seconds(entry.end) if entry.end else start
+                                for entry, start in zip(entries, self.starts)))
+        self.kinds = array('b', (SHIFT if isinstance(entry, Shift)
+                                 else APPOINTMENT if entry.end else POINT_APPOINTMENT
+                                 for entry in entries))
+        self.descriptions = tuple(getattr(entry, 'description', '') for entry in entries)
+        self.max_span = max((end - start for start, end in zip(self.starts, self.ends)), default=0)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def between(self, start: datetime, end: datetime) -> List[ScheduleEntry]:
+        """
+        Returns records that intersect the half-open interval [start, end) ordered by the start.
+
+        :param start: The interval start.
+        :type start: :obj:`datetime.datetime`.
+        :param end: The interval end.
+        :type end: :obj:`datetime.datetime`.
+        :return: A list of schedule records.
+        :rtype: :obj:`typing.List[schedulebot.models.ScheduleEntry]`
+        """
+        low, high = _seconds(start), _seconds(end)
+        starts, ends = self.starts, self.ends
+        # No record started before `low - max_span` can reach the interval
+        first = bisect_left(starts, low - self.max_span)
+        last = bisect_left(starts, high, first)
+        return [self._entry(i) for i in range(first, last)
+                if ends[i] > low or starts[i] >= low]
+
+    def _entry(self, i: int) -> ScheduleEntry:
+        kind, start = self.kinds[i], _moment(self.starts[i])
+        if kind == SHIFT:
+            return Shift(start, _moment(self.ends[i]))
+        end = _moment(self.ends[i]) if kind == APPOINTMENT else None
+        return Appointment(start, end, self.descriptions[i])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = sum(column.itemsize * len(column) for column in (self.starts, self.ends, self.kinds))
+        return arrays + sys.getsizeof(self.descriptions) + sum(map(sys.getsizeof, set(self.descriptions)))
+
+
+class ShiftStore:
+    """
+    This object represents schedules of all employees keyed by their Google Document IDs.
+    """
+
+    def __init__(self):
+        self._schedules: Dict[str, EmployeeSchedule] = {}
+
+    def __contains__(self, file_id: str) -> bool:
+        return file_id in self._schedules
+
+    def version(self, file_id: str) -> Optional[str]:
+        """
+        Returns the document version the employee's schedule has been built from.
+        """
+        schedule = self._schedules.get(file_id)
+        return schedule.version if schedule else None
+
+    def rebuild(self, file_id: str, entries: Sequence[ScheduleEntry], version: Optional[str] = None) -> None:
+        """
+        Replaces the employee's schedule with records of a freshly parsed document.
+
+        :param file_id: The Google Document ID of the employee.
+        :type file_id: :obj:`str`.
+        :param entries: Schedule records of the document.
+        :type entries: :obj:`typing.Sequence[schedulebot.models.ScheduleEntry]`.
+        :param version: The document version.
+        :type version: :obj:`typing.Optional[str]`.
+        :return:
+        """
+        self._schedules[file_id] = EmployeeSchedule(entries, version)
+
+    def remove(self, file_id: str) -> None:
+        self._schedules.pop(file_id, None)
+
+    def between(self, file_id: str, start: datetime, end: datetime) -> List[ScheduleEntry]:
+        if schedule := self._schedules.get(file_id):
+            return schedule.between(start, end)
+        return []
+
+    def for_period(self, file_id: str, period: Period, today: Optional[date] = None) -> List[ScheduleEntry]:
+        """
+        Returns the employee's records of the period ordered by the start.
+
+        :param file_id: The Google Document ID of the employee.
+        :type file_id: :obj:`str`.
+        :param period: A period of the schedule.
+        :type period: :obj:`schedulebot.schedule.store.Period`.
+        :param today: The current date, defaults to today.
+        :type today: :obj:`typing.Optional[datetime.date]`.
+        :return: A list of schedule records.
+        :rtype: :obj:`typing.List[schedulebot.models.ScheduleEntry]`
+        """
+        return self.between(file_id, *period_bounds(period, today))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(schedule.nbytes for schedule in self._schedules.values())
+
+
+shift_store = ShiftStore()
@@ -0,0 +1,64 @@
+"""
+The module watcher:
+Keeps the database mirror of the working Google folder up to date
+and polls the folder for new document revisions.
+"""
+
+import asyncio
+import logging
+
+import asyncpg
+
+from schedulebot import database, googledrive
+
+
+# Deltas are applied to the database in the order they are pulled, and a sync doesn't return
+# before the delta pulled by a concurrent one is saved
+_sync_lock = asyncio.Lock()
+
+
+async def sync_folder(db_conn) -> googledrive.SyncDelta:
+    """
+    Pulls changes of the working Google folder and applies them to the database mirror.
+    Listeners of the folder sync (e.g. the schedule change detector) receive the changes too.
+
+    Syncs of the process (the folder watcher and handlers) are serialized,
+    so the mirror is up to date when the function returns.
+
+    :param db_conn: A database session with an established connection to the PostgreSQL server.
+    :type db_conn: :obj:`asyncpg.Connection`.
+    :return: The changes of the folder.
+    :rtype: :obj:`schedulebot.googledrive.SyncDelta`
+    """
+    async with _sync_lock:
+        if delta := await googledrive.drive_sync.refresh():
+            try:
+                await database.save_drive_files(db_conn, **vars(delta))
+            except Exception:
+                # The lost delta can't be pulled again, so the mirror will be rebuilt from scratch
+                googledrive.drive_sync.reset()
+                raise
+    return delta
+
+
+async def watch_folder(pool: asyncpg.pool.Pool, interval: float) -> None:
+    """
+    Syncs the working Google folder periodically until the task is cancelled.
+
+    :param pool: A database connection pool.
+    :type pool: :obj:`asyncpg.pool.Pool`.
+    :param interval: A pause between syncs in seconds.
+    :type interval: :obj:`float`.
+    :return:
+    """
+    while True:
+        db = database.LazyConnection(pool)
+        try:
+            await sync_folder(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.exception("Google folder sync failed")
+        finally:
+            await db.release()
+        await asyncio.sleep(interval)
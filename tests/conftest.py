@@ -0,0 +1,4 @@
+import os
+
+# The config reads the required settings at import time
+os.environ.setdefault('SUPERUSER_ID', '1')
@@ -0,0 +1,33 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+from schedulebot.middlewares import blacklist
+
+
+class FakePool:
+    @asynccontextmanager
+    async def acquire(self):
+        yield None
+
+
+def test_reloader_survives_errors(monkeypatch):
+    errors = [asyncpg.InterfaceError('the connection has been released'), RuntimeError('unexpected')]
+    reloads = []
+
+    async def load_blacklist(db_conn):
+        if errors:
+            raise errors.pop(0)
+        reloads.append(db_conn)
+
+    monkeypatch.setattr(blacklist.database, 'load_blacklist', load_blacklist)
+
+    async def main():
+        task = asyncio.create_task(blacklist.reload_blacklist(FakePool(), 0))
+        while not reloads:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(main(), 1))
+    assert not errors
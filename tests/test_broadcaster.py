@@ -0,0 +1,147 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.utils.exceptions import RetryAfter
+
+from schedulebot import broadcaster
+from schedulebot.broadcaster import Broadcaster, Priority, TokenBucket
+
+
+class FakeClockLoop(asyncio.SelectorEventLoop):
+    """
+    An event loop with a fake clock: instead of waiting for the next timer, the clock jumps to it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+        select = self._selector.select
+
+        def jump(timeout=None):
+            if timeout is None:
+                raise RuntimeError("Nothing is scheduled, the test would wait forever")
+            self.now += timeout
+            return select(0)
+
+        self._selector.select = jump
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    loop = FakeClockLoop()
+    monkeypatch.setattr(broadcaster, 'time', SimpleNamespace(monotonic=loop.time))
+    yield loop
+    loop.close()
+
+
+class FakeBot:
+    """
+    Records sent messages with the time of sending, flood control errors are raised for the given texts.
+    """
+
+    def __init__(self, loop: FakeClockLoop, flood: dict = None):
+        self.loop = loop
+        self.flood = dict(flood or {})
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        if timeout := self.flood.pop(text, None):
+            raise RetryAfter(timeout)
+        self.sent.append((self.loop.time(), chat_id, text))
+        return text
+
+
+def run(loop: FakeClockLoop, bot: FakeBot, messages, **settings) -> Broadcaster:
+    async def main():
+        sender = Broadcaster(bot, **settings)
+        sender.start()
+        futures = [sender.send_message(chat_id, text, priority) for chat_id, text, priority in messages]
+        await sender.close(timeout=None)
+        assert [future.result() for future in futures] == [text for _, text, _ in messages]
+        return sender
+
+    return loop.run_until_complete(main())
+
+
+def test_token_bucket(loop):
+    bucket = TokenBucket(rate=2)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.5, 1.0]
+    assert not bucket.is_idle
+    loop.now += 1
+    assert bucket.reserve() == 0.5
+    loop.now += 1.5
+    assert bucket.is_idle
+
+
+def test_chat_and_global_rates(loop):
+    bot = FakeBot(loop)
+    messages = [(1, 'a1', Priority.BULK), (1, 'a2', Priority.BULK), (1, 'a3', Priority.BULK),
+                (2, 'b1', Priority.BULK), (3, 'c1', Priority.BULK)]
+    run(loop, bot, messages, workers=4, global_rate=2, chat_rate=1)
+
+    times = {text: moment for moment, _, text in bot.sent}
+    # Tokens of a chat are reserved one per second
+    assert times['a2'] >= 1 and times['a3'] >= 2
+    # Two messages per second overall
+    moments = sorted(times.values())
+    assert all(later - earlier >= 0.5 for earlier, later in zip(moments, moments[1:]))
+    assert [text for _, chat_id, text in bot.sent if chat_id == 1] == ['a1', 'a2', 'a3']
+
+
+def test_priority_order(loop):
+    bot = FakeBot(loop)
+    messages = [(1, 'bulk1', Priority.BULK), (2, 'bulk2', Priority.BULK),
+                (3, 'reply', Priority.INTERACTIVE), (4, 'bulk3', Priority.BULK)]
+    run(loop, bot, messages, workers=1)
+    assert [text for *_, text in bot.sent] == ['reply', 'bulk1', 'bulk2', 'bulk3']
+
+
+def test_flood_control_pauses_and_keeps_chat_order(loop):
+    bot = FakeBot(loop, flood={'a1': 5})
+
+    async def main():
+        sender = Broadcaster(bot, workers=2, global_rate=100, chat_rate=100)
+        sender.start()
+        futures = [sender.send_message(1, 'a1'), sender.send_message(1, 'a2'), sender.send_message(2, 'b1')]
+        await asyncio.sleep(1)
+        # An urgent message submitted during the pause doesn't overtake the retried one
+        futures.append(sender.send_message(1, 'a3', Priority.INTERACTIVE))
+        await sender.close(timeout=None)
+        assert [future.result() for future in futures] == ['a1', 'a2', 'b1', 'a3']
+        return sender
+
+    sender = loop.run_until_complete(main())
+
+    times = {text: moment for moment, _, text in bot.sent}
+    # All workers pause for the requested time
+    assert min(times.values()) >= 5
+    # Messages held back by the retried one are sent after it in the priority order
+    assert [text for _, chat_id, text in bot.sent if chat_id == 1] == ['a1', 'a3', 'a2']
+    assert sender.retried == 1 and sender.sent == 4 and sender.failed == 0
+    assert sender.queue_depth == 0
+
+
+def test_flood_control_gives_up_after_retries(loop):
+    bot = FakeBot(loop)
+    attempts = []
+
+    async def send_message(chat_id, text):
+        attempts.append(loop.time())
+        raise RetryAfter(1)
+
+    bot.send_message = send_message
+
+    async def main():
+        sender = Broadcaster(bot, workers=1, max_retries=2)
+        sender.start()
+        future = sender.send_message(1, 'a1')
+        await sender.close(timeout=None)
+        return sender, future
+
+    sender, future = loop.run_until_complete(main())
+    assert isinstance(future.exception(), RetryAfter)
+    assert len(attempts) == 3 and sender.failed == 1 and sender.retried == 2
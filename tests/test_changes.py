@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+
+from schedulebot.googledrive import SyncDelta
+from schedulebot.models import Appointment
+from schedulebot.schedule.cache import ScheduleCache
+from schedulebot.schedule.changes import ChangeKind, ScheduleChangeDetector
+
+
+REVISIONS = {
+    '1': [Appointment(datetime(2023, 5, 15, 10), None, 'Олена')],
+    '2': [Appointment(datetime(2023, 5, 15, 10), None, 'Олена'),
+          Appointment(datetime(2023, 5, 15, 12), None, 'Ірина')],
+}
+
+
+def make_detector(alerts: list) -> ScheduleChangeDetector:
+    cache = ScheduleCache(10 ** 6)
+
+    async def load(file_id, *, version):
+        return await cache.put(file_id, version, 2023, REVISIONS[version])
+
+    async def notify(file_id, changes):
+        alerts.append((file_id, changes))
+
+    return ScheduleChangeDetector(load, notify, debounce=0.01, cache=cache)
+
+
+def test_two_revisions_give_one_alert():
+    alerts = []
+
+    async def main():
+        detector = make_detector(alerts)
+        # The first revision of the document only becomes the baseline
+        await detector.changes_listener(SyncDelta(changed=[{'id': 'doc', 'version': '1'}], full=True))
+        await detector.changes_listener(SyncDelta(changed=[{'id': 'doc', 'version': '2'}]))
+        assert detector.pending == 1
+        await asyncio.sleep(0.05)
+        await detector.close()
+
+    asyncio.run(main())
+    assert len(alerts) == 1
+    file_id, changes = alerts[0]
+    assert file_id == 'doc'
+    assert [(change.kind, change.entry) for change in changes] == [(ChangeKind.ADDED, REVISIONS['2'][1])]
+
+
+def test_same_revision_gives_no_alert():
+    alerts = []
+
+    async def main():
+        detector = make_detector(alerts)
+        await detector.touch('doc', '1')
+        await detector.touch('doc', '1')
+        assert detector.pending == 0
+        await detector.close()
+
+    asyncio.run(main())
+    assert alerts == []
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+
+from schedulebot.models import Shift, Appointment
+from schedulebot.schedule.parser import parse_schedule_text
+
+
+def parse(text: str, year: int = 2023) -> list:
+    return list(parse_schedule_text(text, year=year))
+
+
+def test_shift_and_appointments():
+    text = """
+    Понеділок 15.05.2023
+    Зміна 09:00 - 18:00
+    10:00 - 11:30 Олена, манікюр
+    12:00 Ірина, стрижка
+    Нотатка без часу
+    """
+    assert parse(text) == [
+        Shift(datetime(2023, 5, 15, 9), datetime(2023, 5, 15, 18)),
+        Appointment(datetime(2023, 5, 15, 10), datetime(2023, 5, 15, 11, 30), 'Олена, манікюр'),
+        Appointment(datetime(2023, 5, 15, 12), None, 'Ірина, стрижка'),
+    ]
+
+
+@pytest.mark.parametrize('separator', ['-', '–', '—'])
+def test_time_range_separators(separator):
+    entries = parse(f'15.05\n10:00 {separator} 11:00 Олена')
+    assert entries == [Appointment(datetime(2023, 5, 15, 10), datetime(2023, 5, 15, 11), 'Олена')]
+
+
+def test_range_over_midnight():
+    entries = parse('15.05\nShift 22:00-06:00')
+    assert entries == [Shift(datetime(2023, 5, 15, 22), datetime(2023, 5, 16, 6))]
+
+
+@pytest.mark.parametrize('line', [
+    '25:00 - 26:00 Олена',
+    '10:75 Олена',
+    '10:00 - 24:00 Олена',
+    'Зміна 09:00 - 18:60',
+])
+def test_invalid_time_is_skipped(line):
+    assert parse(f'15.05\n{line}\n12:00 Ірина') == [Appointment(datetime(2023, 5, 15, 12), None, 'Ірина')]
+
+
+def test_entries_before_header_are_skipped():
+    assert parse('10:00 Олена\nЗміна 09:00-18:00') == []
+
+
+def test_shift_without_end_is_skipped():
+    assert parse('15.05\nЗміна 09:00') == []
+
+
+@pytest.mark.parametrize('header, day', [
+    ('Понеділок 15.05.2023', datetime(2023, 5, 15)),
+    ('15/05/24', datetime(2024, 5, 15)),
+    ('15.5', datetime(2023, 5, 15)),
+])
+def test_header_formats(header, day):
+    entries = parse(f'{header}\n10:00 Олена')
+    assert entries[0].start == day.replace(hour=10)
+
+
+def test_invalid_header_keeps_previous_day():
+    entries = parse('15.05\n31.02\n10:00 Олена')
+    assert entries[0].start == datetime(2023, 5, 15, 10)
+
+
+def test_year_rollover():
+    entries = parse('28.12\n10:00 Олена\n02.01\n11:00 Ірина\n15.01\n12:00 Марія')
+    assert [entry.start for entry in entries] == [
+        datetime(2023, 12, 28, 10), datetime(2024, 1, 2, 11), datetime(2024, 1, 15, 12)]
+
+
+def test_no_rollover_for_short_step_back():
+    entries = parse('15.05\n10:00 Олена\n10.05\n11:00 Ірина')
+    assert [entry.start for entry in entries] == [datetime(2023, 5, 15, 10), datetime(2023, 5, 10, 11)]
+
+
+def test_explicit_year_is_not_rolled_over():
+    entries = parse('28.12.2023\n10:00 Олена\n02.01.2023\n11:00 Ірина')
+    assert entries[1].start == datetime(2023, 1, 2, 11)
@@ -0,0 +1,101 @@
+import asyncio
+
+from schedulebot.pipeline import UpdateScheduler
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_order_within_chat():
+    log = []
+
+    async def handle(name, delay):
+        log.append(f'{name} started')
+        await asyncio.sleep(delay)
+        log.append(f'{name} done')
+
+    async def main():
+        scheduler = UpdateScheduler(10)
+        await asyncio.gather(scheduler.run(1, handle, 'first', 0.03),
+                             scheduler.run(1, handle, 'second', 0))
+
+    run(main())
+    assert log == ['first started', 'first done', 'second started', 'second done']
+
+
+def test_chats_run_concurrently():
+    running, peak = 0, 0
+
+    async def handle():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def main():
+        scheduler = UpdateScheduler(10)
+        await asyncio.gather(*(scheduler.run(chat, handle) for chat in range(5)))
+
+    run(main())
+    assert peak == 5
+
+
+def test_limit():
+    running, peak = 0, 0
+
+    async def handle():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def main():
+        scheduler = UpdateScheduler(2)
+        await asyncio.gather(*(scheduler.run(chat, handle) for chat in range(6)),
+                             *(scheduler.run(None, handle) for _ in range(3)))
+
+    run(main())
+    assert peak == 2
+
+
+def test_tails_are_cleaned_up():
+    async def handle(fail):
+        await asyncio.sleep(0)
+        if fail:
+            raise ValueError
+
+    async def main():
+        scheduler = UpdateScheduler(2)
+        results = await asyncio.gather(*(scheduler.run(chat % 3, handle, chat == 4) for chat in range(9)),
+                                       return_exceptions=True)
+        assert sum(isinstance(result, ValueError) for result in results) == 1
+        return scheduler.stats
+
+    assert run(main()) == {'limit': 2, 'running': 0, 'waiting': 0, 'chats': 0}
+
+
+def test_cancelled_update_keeps_order():
+    log = []
+
+    async def handle(name, delay):
+        await asyncio.sleep(delay)
+        log.append(name)
+
+    async def main():
+        scheduler = UpdateScheduler(10)
+        first = asyncio.create_task(scheduler.run(1, handle, 'first', 0.03))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(scheduler.run(1, handle, 'second', 0))
+        await asyncio.sleep(0)
+        third = asyncio.create_task(scheduler.run(1, handle, 'third', 0))
+        await asyncio.sleep(0)
+        # The cancelled update was waiting for the first one, the third still waits for it too
+        second.cancel()
+        await asyncio.gather(first, second, third, return_exceptions=True)
+        return scheduler.stats
+
+    assert run(main())['chats'] == 0
+    assert log == ['first', 'third']
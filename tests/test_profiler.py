@@ -0,0 +1,42 @@
+import asyncio
+from pathlib import Path
+
+from schedulebot.middlewares.profiler import ProfilerMiddleware
+
+
+def process(profiler: ProfilerMiddleware, data: dict) -> dict:
+    async def update():
+        await profiler.trigger('pre_process_message', (None, data))
+        await asyncio.sleep(0)
+        await profiler.trigger('post_process_message', (None, [], data))
+
+    asyncio.run(update())
+    return data
+
+
+def test_only_written_dumps_are_counted(tmp_path):
+    # The dump directory can't be created inside a file
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    profiler = ProfilerMiddleware(blocker / 'profiles', enabled=True, sample_rate=1.0, slow_threshold=0)
+
+    process(profiler, {})
+    assert profiler.dumps == 0 and not profiler._profiling
+
+    profiler.dump_dir = tmp_path / 'profiles'
+    process(profiler, {})
+    assert profiler.dumps == 1
+    assert len(list(profiler.dump_dir.glob('*.txt'))) == 1
+
+
+def test_unwatched_update_leaves_no_callback(monkeypatch):
+    profiler = ProfilerMiddleware(Path('unused'), enabled=True, sample_rate=0.0, slow_threshold=0)
+    callbacks = []
+
+    async def update():
+        task = asyncio.current_task()
+        monkeypatch.setattr(task, 'add_done_callback', callbacks.append, raising=False)
+        await profiler.trigger('pre_process_message', (None, {}))
+
+    asyncio.run(update())
+    assert callbacks == []
@@ -0,0 +1,158 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import asyncpg
+import pytest
+
+from schedulebot.config import DB_CONNECT_SET, Role
+from schedulebot.database import crud, get_staff_page
+from schedulebot.handlers import superuser
+from schedulebot.models import Staff, StaffPage
+
+
+ROLE_IDS = {Role.SUPERUSER.value: 1, Role.ADMIN.value: 2, Role.EMPLOYEE.value: 3}
+
+# Members sharing the role and the alias are ordered by tg_id
+MEMBERS = [
+    (1, 'Boss', Role.SUPERUSER.value),
+    (10, 'Anna', Role.ADMIN.value),
+    (30, 'Olena', Role.EMPLOYEE.value),
+    (21, 'Olena', Role.EMPLOYEE.value),
+    (22, 'Olena', Role.EMPLOYEE.value),
+    (40, 'Petro', Role.EMPLOYEE.value),
+]
+ORDER = [10, 21, 22, 30, 40]
+
+
+def staff_key(member):
+    tg_id, alias, role = member
+    return ROLE_IDS[role], alias, tg_id
+
+
+class FakeMembers:
+    """
+    Executes the staff page statements over a list of members with the semantics of the SQL keyset.
+    """
+
+    def __init__(self, members):
+        self.members = list(members)
+
+    async def fetch(self, db_conn, name, superuser_role, limit, cursor=None):
+        rows = sorted((member for member in self.members if member[2] != superuser_role), key=staff_key)
+        if name != crud.GET_STAFF_FIRST_PAGE:
+            cursor_row = next((member for member in self.members if member[0] == cursor), None)
+            if cursor_row is None:
+                # The row comparison with the NULL subselect is never true
+                return []
+            if name == crud.GET_STAFF_PAGE_AFTER:
+                rows = [row for row in rows if staff_key(row) > staff_key(cursor_row)]
+            else:
+                rows = [row for row in reversed(rows) if staff_key(row) < staff_key(cursor_row)]
+        return [dict(tg_id=tg_id, member_alias=alias, role=role, file_id=None)
+                for tg_id, alias, role in rows[:limit]]
+
+
+@pytest.fixture
+def members(monkeypatch):
+    fake = FakeMembers(MEMBERS)
+    monkeypatch.setattr(crud.statements, 'fetch', fake.fetch)
+    return fake
+
+
+def ids(page: StaffPage):
+    return [staff.tg_id for staff in page.staff]
+
+
+async def walk_pages(db_conn, limit):
+    """ Walks the staff list forward to the end and backward to the start. """
+    forward = [await get_staff_page(db_conn, limit=limit)]
+    while forward[-1].has_next:
+        forward.append(await get_staff_page(db_conn, cursor=forward[-1].staff[-1].tg_id, limit=limit))
+    backward = [forward[-1]]
+    while backward[-1].has_previous:
+        backward.append(await get_staff_page(db_conn, cursor=backward[-1].staff[0].tg_id,
+                                             backward=True, limit=limit))
+    return forward, backward
+
+
+def check_walk(forward, backward):
+    assert [ids(page) for page in forward] == [[10, 21], [22, 30], [40]]
+    assert [(page.has_previous, page.has_next) for page in forward] == [(False, True), (True, True), (True, False)]
+    assert [ids(page) for page in backward] == [[40], [22, 30], [10, 21]]
+    assert not backward[-1].has_previous and backward[-1].has_next
+
+
+def test_page_boundaries_and_ties(members):
+    check_walk(*asyncio.run(walk_pages(None, limit=2)))
+
+
+def test_last_page_of_exact_size(members):
+    async def main():
+        first = await get_staff_page(None, limit=5)
+        return first, await get_staff_page(None, cursor=40, limit=5)
+
+    first, beyond = asyncio.run(main())
+    assert ids(first) == ORDER and not first.has_next
+    assert beyond.staff == [] and not beyond.has_next
+
+
+def test_deleted_cursor_falls_back_to_first_page(members):
+    members.members = [member for member in members.members if member[0] != 21]
+    edited = []
+
+    async def answer(*args, **kwargs):
+        pass
+
+    async def edit_text(text, *args, reply_markup=None, **kwargs):
+        edited.append(text)
+
+    async def release():
+        pass
+
+    call = SimpleNamespace(answer=answer, message=SimpleNamespace(edit_text=edit_text))
+    db = SimpleNamespace(release=release)
+
+    async def main():
+        assert (await get_staff_page(db, cursor=21, limit=2)).staff == []
+        await superuser.turn_staff_page(call, db, {'direction': 'next', 'cursor': '21'})
+        return await get_staff_page(db)
+
+    first_page = asyncio.run(main())
+    assert ids(first_page) == [10, 22, 30, 40]
+    assert edited == [superuser.render_staff_page(first_page)[0]]
+
+
+def test_alias_is_escaped():
+    page = StaffPage([Staff(10, '<b>Anna</b> & Co', Role.ADMIN.value)])
+    text, _ = superuser.render_staff_page(page)
+    assert '&lt;b&gt;Anna&lt;/b&gt; &amp; Co' in text
+    assert '<b>Anna</b>' not in text
+
+
+@pytest.mark.skipif(not os.getenv('DATABASE'), reason='needs a PostgreSQL database configured in .env')
+def test_keyset_pages_postgres():
+    async def main():
+        conn = await asyncpg.connect(**DB_CONNECT_SET)
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            # Temporary tables shadow the tables of the bot and are dropped by the rollback
+            await conn.execute("""
+                CREATE TEMP TABLE roles (id INTEGER PRIMARY KEY, role VARCHAR(20) NOT NULL UNIQUE);
+                CREATE TEMP TABLE members (tg_id BIGINT PRIMARY KEY, member_alias VARCHAR(40) NOT NULL,
+                                           role_id INTEGER NOT NULL, file_id VARCHAR(60));
+            """)
+            await conn.executemany("INSERT INTO roles VALUES ($1, $2);",
+                                   [(role_id, role) for role, role_id in ROLE_IDS.items()])
+            await conn.executemany("INSERT INTO members VALUES ($1, $2, $3);",
+                                   [(tg_id, alias, ROLE_IDS[role]) for tg_id, alias, role in MEMBERS])
+
+            check_walk(*await walk_pages(conn, limit=2))
+            await conn.execute("DELETE FROM members WHERE tg_id=21;")
+            assert (await get_staff_page(conn, cursor=21, limit=2)).staff == []
+        finally:
+            await transaction.rollback()
+            await conn.close()
+
+    asyncio.run(main())
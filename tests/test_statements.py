@@ -0,0 +1,64 @@
+import asyncio
+import os
+
+import asyncpg
+import pytest
+
+from schedulebot.config import DB_CONNECT_SET, DB_POOL_SET
+from schedulebot.database import LazyConnection, get_member_role
+from schedulebot.database.connection import BotConnection
+from schedulebot.database.crud import statements, GET_MEMBER_ROLE
+
+
+class FakeConnection:
+    """ Executes only query texts, like a pool connection whose prepared statements are stale. """
+
+    def __init__(self):
+        self.queries = []
+
+    async def fetchval(self, query, *args, **kwargs):
+        assert isinstance(query, str)
+        self.queries.append(query)
+        return 'admin'
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.acquired = self.released = 0
+
+    async def acquire(self, timeout=None):
+        self.acquired += 1
+        return self.conn
+
+    async def release(self, conn):
+        self.released += 1
+
+
+def test_statement_after_release():
+    async def main():
+        pool = FakePool()
+        db = LazyConnection(pool)
+        for _ in range(2):
+            assert await statements.fetchval(db, GET_MEMBER_ROLE, 1) == 'admin'
+            await db.release()
+        return pool
+
+    pool = asyncio.run(main())
+    assert pool.acquired == pool.released == 2
+    assert len(set(pool.conn.queries)) == 1
+
+
+@pytest.mark.skipif(not os.getenv('DATABASE'), reason='needs a PostgreSQL database configured in .env')
+def test_statement_after_release_postgres():
+    async def main():
+        pool = await asyncpg.create_pool(**DB_CONNECT_SET, **{**DB_POOL_SET, 'min_size': 1, 'max_size': 1},
+                                         connection_class=BotConnection)
+        try:
+            for _ in range(2):
+                async with pool.acquire() as conn:
+                    await get_member_role(conn, 0)
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import date, datetime
+
+from schedulebot.googledrive import SyncDelta
+from schedulebot.models import Shift, Appointment
+from schedulebot.schedule import loader
+from schedulebot.schedule.cache import ScheduleCache
+from schedulebot.schedule.store import Period, ShiftStore
+
+
+ENTRIES = [
+    Appointment(datetime(2023, 5, 16, 12), None, 'Ірина'),
+    Shift(datetime(2023, 5, 15, 22), datetime(2023, 5, 16, 6)),
+    Appointment(datetime(2023, 5, 15, 10), datetime(2023, 5, 15, 11), 'Олена'),
+    Shift(datetime(2023, 5, 22, 9), datetime(2023, 5, 22, 18)),
+]
+
+
+def make_store() -> ShiftStore:
+    store = ShiftStore()
+    store.rebuild('doc', ENTRIES, '1/2023')
+    return store
+
+
+def test_period_lookup_rebuilds_records():
+    store = make_store()
+    assert store.version('doc') == '1/2023'
+    assert store.for_period('doc', Period.TODAY, date(2023, 5, 15)) == [ENTRIES[2], ENTRIES[1]]
+    # The overnight shift reaches the next day
+    assert store.for_period('doc', Period.TOMORROW, date(2023, 5, 15)) == [ENTRIES[1], ENTRIES[0]]
+    assert store.for_period('doc', Period.NEXT_WEEK, date(2023, 5, 15)) == [ENTRIES[3]]
+
+
+def test_unknown_document():
+    assert make_store().for_period('other', Period.THIS_WEEK, date(2023, 5, 15)) == []
+
+
+def test_removed_document_is_forgotten(monkeypatch, tmp_path):
+    store, cache = ShiftStore(), ScheduleCache(10**6, tmp_path)
+    monkeypatch.setattr(loader, 'shift_store', store)
+    monkeypatch.setattr(loader, 'schedule_cache', cache)
+
+    async def scenario():
+        await cache.put('doc', '3', 2023, ENTRIES)
+        # The version of the database mirror is used, Drive isn't asked
+        found = await loader.find_schedule('doc', Period.TODAY, version='3', today=date(2023, 5, 15))
+        assert found == [ENTRIES[2], ENTRIES[1]]
+        assert store.version('doc') == '3/2023'
+
+        await loader.removed_files_listener(SyncDelta(removed=['doc']))
+        assert 'doc' not in store
+        assert await cache.latest('doc') is None
+        assert cache.stats['size_bytes'] == 0
+
+    asyncio.run(scenario())
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from schedulebot.googledrive.documents import DOCUMENT_MIME_TYPE
+from schedulebot.googledrive.sync import DriveFolderSync
+
+
+def document(file_id: str, folder: str = 'folder', **fields) -> dict:
+    return dict(id=file_id, name=file_id, version='1', mimeType=DOCUMENT_MIME_TYPE,
+                parents=[folder], trashed=False, **fields)
+
+
+class FakeClient:
+    """
+    Returns the prepared pages of the changes feed instead of Drive requests.
+    """
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.drive = SimpleNamespace(changes=SimpleNamespace(list=lambda **params: params))
+
+    async def start(self):
+        pass
+
+    async def as_service_account(self, params):
+        return self.pages.pop(0)
+
+
+def test_untracked_files_are_not_reported_as_removed():
+    client = FakeClient([{
+        'newStartPageToken': '2',
+        'changes': [
+            {'fileId': 'tracked', 'removed': True},
+            {'fileId': 'alien', 'file': document('alien', folder='other')},
+            {'fileId': 'deleted', 'removed': True},
+            {'fileId': 'new', 'file': document('new')},
+        ],
+    }])
+    sync = DriveFolderSync(client, 'folder')
+    sync.snapshot = {'tracked': document('tracked')}
+    sync.page_token = '1'
+
+    delta = asyncio.run(sync.refresh())
+
+    assert delta.removed == ['tracked']
+    assert [file['id'] for file in delta.changed] == ['new']
+    assert set(sync.snapshot) == {'new'}
+    assert sync.page_token == '2'